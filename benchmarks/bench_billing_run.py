@@ -0,0 +1,87 @@
+"""Billing run benchmark: bill N customers for a closed period, then compare invoice reads with live billing.
+
+    python -m benchmarks.bench_billing_run --customers 100000 --days 3
+"""
+import argparse
+import os
+import random
+import tempfile
+import time
+from datetime import date, datetime, timedelta
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--customers", type=int, default=100_000)
+    parser.add_argument("--days", type=int, default=3, help="Hourly readings per customer for this many days")
+    parser.add_argument("--chunk-size", type=int, default=1000)
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--samples", type=int, default=200, help="GET requests timed per path")
+    args = parser.parse_args(argv)
+
+    db_path = os.path.join(tempfile.mkdtemp(), "bench.db")
+    os.environ["DATABASE_URL"] = f"sqlite:///{db_path}"
+
+    # Imported after DATABASE_URL is set so the engine points at the scratch database
+    from sqlalchemy import insert
+    from greenvolt_api.billing import bill_summary, find_invoice, hourly_line_items, load_rates
+    from greenvolt_api.readings_source import load_readings
+    from greenvolt_api.billing_run import run_billing
+    from greenvolt_api.database import SessionLocal, engine
+    from greenvolt_api.migrate import upgrade
+    from greenvolt_api.models import Pricing, SmartMeter, SmartMeterReading, User
+
+    upgrade(log=lambda _: None)
+    rng = random.Random(42)
+    start = date(2025, 8, 1)
+    end = start + timedelta(days=args.days)
+    hours = [datetime.combine(start, datetime.min.time()) + timedelta(hours=h) for h in range(args.days * 24)]
+
+    t0 = time.perf_counter()
+    with engine.begin() as conn:
+        conn.execute(insert(User), [
+            {"id": i, "name": f"Customer {i}", "email": f"customer{i}@example.com", "password": "x"}
+            for i in range(1, args.customers + 1)
+        ])
+        conn.execute(insert(SmartMeter), [
+            {"id": i, "serial_number": f"SM-{i:07d}", "location": "Berlin", "user_id": i}
+            for i in range(1, args.customers + 1)
+        ])
+        conn.execute(insert(Pricing), [{"date": h, "price_per_kwh": round(rng.uniform(0.2, 0.4), 4)} for h in hours])
+        batch = []
+        for meter_id in range(1, args.customers + 1):
+            batch.extend({"meter_id": meter_id, "timestamp": h, "energy_kwh": rng.uniform(0.1, 2.0)} for h in hours)
+            if len(batch) >= 100_000:
+                conn.execute(insert(SmartMeterReading), batch)
+                batch = []
+        if batch:
+            conn.execute(insert(SmartMeterReading), batch)
+    print(f"Loaded {args.customers} customers x {len(hours)} readings in {time.perf_counter() - t0:.1f}s")
+
+    t0 = time.perf_counter()
+    count = run_billing(start, end, chunk_size=args.chunk_size, workers=args.workers)
+    elapsed = time.perf_counter() - t0
+    print(f"Billing run: {count} invoices in {elapsed:.1f}s ({count / elapsed:.0f} customers/s)")
+
+    sample = rng.sample(range(1, args.customers + 1), min(args.samples, args.customers))
+    db = SessionLocal()
+    try:
+        t0 = time.perf_counter()
+        for user_id in sample:
+            bill_summary(user_id, start, end, find_invoice(db, user_id, start, end).line_items)
+        stored = (time.perf_counter() - t0) / len(sample)
+
+        t0 = time.perf_counter()
+        for user_id in sample:
+            readings = load_readings(db, [user_id], start, end)
+            rates = load_rates(db, start, end)
+            bill_summary(user_id, start, end, hourly_line_items(readings, rates))
+        live = (time.perf_counter() - t0) / len(sample)
+    finally:
+        db.close()
+
+    print(f"GET closed period: invoice {stored * 1000:.2f} ms vs live {live * 1000:.2f} ms per request")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,112 @@
+"""Cold archive benchmark: bytes per reading and full-month scan speed, SQL table vs archive file.
+
+    python -m benchmarks.bench_cold_archive --meters 1000 --days 30
+"""
+import argparse
+import math
+import os
+import random
+import statistics
+import tempfile
+import time
+from datetime import date, datetime, timedelta
+
+
+def timed(fn, repeat: int):
+    result, samples = None, []
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        result = fn()
+        samples.append(time.perf_counter() - t0)
+    return result, statistics.median(samples)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--meters", type=int, default=1000)
+    parser.add_argument("--days", type=int, default=30, help="Days of readings, starting 2025-06-01")
+    parser.add_argument("--interval-minutes", type=int, default=15)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args(argv)
+
+    scratch = tempfile.mkdtemp()
+    db_path = os.path.join(scratch, "bench.db")
+    os.environ["DATABASE_URL"] = f"sqlite:///{db_path}"
+    os.environ["GREENVOLT_COLD_ARCHIVE_DIR"] = os.path.join(scratch, "cold_archive")
+
+    # Imported after the environment is set so the engine and archive point at the scratch paths
+    from sqlalchemy import insert, text
+    from greenvolt_api.cold_archive import archive_month, cold_archive
+    from greenvolt_api.database import SessionLocal, engine
+    from greenvolt_api.migrate import upgrade
+    from greenvolt_api.models import SmartMeter, SmartMeterReading, User
+    from greenvolt_api.readings_source import load_readings
+
+    upgrade(log=lambda _: None)
+    rng = random.Random(42)
+    month = date(2025, 6, 1)
+    start = datetime.combine(month, datetime.min.time())
+    end = start + timedelta(days=args.days) - timedelta(microseconds=1)
+    slots = [start + timedelta(minutes=args.interval_minutes * k)
+             for k in range(args.days * 24 * 60 // args.interval_minutes)]
+    meter_ids = list(range(1, args.meters + 1))
+
+    with engine.begin() as conn:
+        conn.execute(insert(User), [{"id": i, "name": f"Customer {i}", "email": f"c{i}@example.com", "password": "x"}
+                                    for i in meter_ids])
+        conn.execute(insert(SmartMeter), [{"id": i, "serial_number": f"SM-{i:07d}", "location": "Berlin", "user_id": i}
+                                          for i in meter_ids])
+        for i in range(0, args.meters, 100):
+            conn.execute(insert(SmartMeterReading), [
+                {"meter_id": m, "timestamp": ts, "energy_kwh": round(rng.uniform(0.01, 0.5), 4)}
+                for m in meter_ids[i:i + 100] for ts in slots
+            ])
+    readings = len(slots) * args.meters
+    print(f"{args.meters} meters x {len(slots)} readings = {readings} readings")
+
+    with engine.connect() as conn:
+        objects = [name for (name,) in conn.execute(text(
+            "SELECT name FROM sqlite_master WHERE tbl_name = 'smart_meter_readings'"))]
+        sql_bytes = conn.execute(text(
+            f"SELECT SUM(pgsize) FROM dbstat WHERE name IN ({', '.join(repr(n) for n in objects)})")).scalar()
+
+    db = SessionLocal()
+    try:
+        (sql_total,), sql_sum = timed(lambda: db.execute(text(
+            "SELECT SUM(energy_kwh) FROM smart_meter_readings WHERE timestamp >= :lo AND timestamp <= :hi"
+        ), {"lo": str(start), "hi": str(end)}).one(), args.repeat)
+        rows, sql_rows = timed(lambda: load_readings(db, meter_ids, start, end), args.repeat)
+        assert len(rows) == readings
+
+        t0 = time.perf_counter()
+        archive_month(month)
+        archive_s = time.perf_counter() - t0
+        month_file = cold_archive.open(month)
+
+        def archive_energy():
+            return math.fsum(math.fsum(month_file.energies(m)) for m in meter_ids)
+
+        def archive_columns():
+            return sum(len(month_file.columns(m, start, end)[0]) for m in meter_ids)
+
+        archive_total, energy_s = timed(archive_energy, args.repeat)
+        decoded, columns_s = timed(archive_columns, args.repeat)
+        rows, source_s = timed(lambda: load_readings(db, meter_ids, start, end), args.repeat)
+        assert decoded == len(rows) == readings
+        assert math.isclose(archive_total, sql_total, rel_tol=1e-9), (archive_total, sql_total)
+    finally:
+        db.close()
+
+    print(f"Archived the month in {archive_s:.2f}s")
+    print(f"  {'storage':<40} {'bytes':>12} {'B/reading':>10}")
+    print(f"  {'SQL table + indexes':<40} {sql_bytes:>12} {sql_bytes / readings:>10.1f}")
+    print(f"  {'archive file':<40} {month_file.size:>12} {month_file.size / readings:>10.1f}")
+    print(f"  {'scan (whole month, all meters)':<40} {'ms':>12} {'M rows/s':>10}")
+    for name, seconds in [("SQL SUM(energy_kwh)", sql_sum), ("archive energy column (fsum)", energy_s),
+                          ("SQL rows via load_readings", sql_rows), ("archive columns with timestamps", columns_s),
+                          ("archive rows via load_readings", source_s)]:
+        print(f"  {name:<40} {seconds * 1000:>12.1f} {readings / seconds / 1e6:>10.2f}")
+
+
+if __name__ == "__main__":
+    main()
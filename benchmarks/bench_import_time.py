@@ -0,0 +1,98 @@
+"""Cold-start budget: time `import greenvolt_api.main` and the lifespan warmup in fresh interpreters.
+
+    python -m benchmarks.bench_import_time --budget-ms 1200
+
+Exits non-zero when the median import time is over budget, and lists the slowest imports
+(from -X importtime) and any module from --forbid that got imported eagerly.
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+
+# Heavy modules that must stay out of the import path; they load during warmup instead
+DEFAULT_FORBID = "passlib,jose,bcrypt"
+
+PROBE = """
+import json, sys, time
+t0 = time.perf_counter()
+import greenvolt_api.main
+imported = time.perf_counter() - t0
+from greenvolt_api.hot_cache import warmup
+from greenvolt_api.migrate import upgrade
+upgrade(log=lambda _: None)
+t1 = time.perf_counter()
+warmup()
+print(json.dumps({"import": imported, "warmup": time.perf_counter() - t1, "modules": sorted(sys.modules)}))
+"""
+
+
+def run_probe(env: dict, cwd=None) -> dict:
+    out = subprocess.run([sys.executable, "-c", PROBE], env=env, cwd=cwd, capture_output=True, text=True, check=True)
+    return json.loads(out.stdout.strip().splitlines()[-1])
+
+
+def slowest_imports(env: dict, top: int) -> list[tuple[int, str]]:
+    out = subprocess.run([sys.executable, "-X", "importtime", "-c", "import greenvolt_api.main"],
+                         env=env, capture_output=True, text=True, check=True)
+    entries = []  # (depth, cumulative microseconds, module), children listed before their parent
+    for line in out.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, name = line[len("import time:"):].split("|")
+        entries.append(((len(name) - len(name.lstrip())) // 2, int(cumulative), name.strip()))
+
+    main_index = next(i for i, e in enumerate(entries) if e[2] == "greenvolt_api.main")
+    main_depth = entries[main_index][0]
+    rows = []
+    for depth, cumulative, name in reversed(entries[:main_index]):
+        if depth <= main_depth:
+            break
+        if depth == main_depth + 1:
+            rows.append((cumulative, name))
+    return sorted(rows, reverse=True)[:top]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--budget-ms", type=float, default=1200, help="Allowed median import time")
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--forbid", default=DEFAULT_FORBID, help="Comma-separated modules that must not load at import")
+    parser.add_argument("--top", type=int, default=10)
+    args = parser.parse_args(argv)
+
+    env = dict(os.environ, DATABASE_URL=f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'cold.db')}")
+    run_probe(env)  # populate __pycache__ so every timed run sees the same bytecode state
+    samples = [run_probe(env) for _ in range(args.runs)]
+    import_ms = statistics.median(s["import"] for s in samples) * 1000
+    warmup_ms = statistics.median(s["warmup"] for s in samples) * 1000
+
+    print(f"import greenvolt_api.main: median {import_ms:.0f} ms over {args.runs} runs (budget {args.budget_ms:.0f} ms)")
+    print(f"warmup:                    median {warmup_ms:.0f} ms")
+    print("slowest direct imports of greenvolt_api.main (cumulative):")
+    for micros, name in slowest_imports(env, args.top):
+        print(f"  {micros / 1000:8.1f} ms  {name}")
+
+    failures = []
+    if import_ms > args.budget_ms:
+        failures.append(f"import took {import_ms:.0f} ms, budget {args.budget_ms:.0f} ms")
+    # The probe imports warmup's dependencies after timing; check a clean import instead
+    out = subprocess.run([sys.executable, "-c", "import sys, greenvolt_api.main; print(' '.join(sys.modules))"],
+                         env=env, capture_output=True, text=True, check=True)
+    loaded = set(out.stdout.split())
+    for module in filter(None, args.forbid.split(",")):
+        if module in loaded:
+            failures.append(f"{module} is imported eagerly")
+
+    if failures:
+        print("\nCold-start budget exceeded:")
+        for failure in failures:
+            print(f"  {failure}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,85 @@
+"""Encode time and wire size of a one-month, multi-meter hourly bill.
+
+    python -m benchmarks.bench_json_encoding --meters 4 --days 30
+"""
+import argparse
+import os
+import random
+import tempfile
+import time
+from datetime import date, datetime, timedelta
+
+
+def timed(fn, repeat):
+    best = float("inf")
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        out = fn()
+        best = min(best, time.perf_counter() - t0)
+    return best, out
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--meters", type=int, default=4)
+    parser.add_argument("--days", type=int, default=30)
+    parser.add_argument("--interval-minutes", type=int, default=60)
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args(argv)
+
+    os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'bench.db')}"
+
+    from fastapi.encoders import jsonable_encoder
+    from fastapi.responses import JSONResponse
+    from sqlalchemy import insert
+    from greenvolt_api.compression import brotli, compress
+    from greenvolt_api.database import SessionLocal, engine
+    from greenvolt_api.migrate import upgrade
+    from greenvolt_api.models import Pricing, SmartMeter, SmartMeterReading, User
+    from greenvolt_api.responses import FastJSONResponse, fast_json, orjson
+    from routers.billing import compute_hourly_bill
+
+    upgrade(log=lambda _: None)
+    rng = random.Random(42)
+    start = date(2025, 8, 1)
+    end = start + timedelta(days=args.days)
+    t0 = datetime.combine(start, datetime.min.time())
+    steps = args.days * 24 * 60 // args.interval_minutes
+    with engine.begin() as conn:
+        conn.execute(insert(User), [{"id": 1, "name": "Bench", "email": "bench@example.com", "password": "x"}])
+        conn.execute(insert(SmartMeter), [
+            {"id": m, "serial_number": f"SM-{m}", "location": "Berlin", "user_id": 1} for m in range(1, args.meters + 1)
+        ])
+        conn.execute(insert(Pricing), [
+            {"date": t0 + timedelta(hours=h), "price_per_kwh": round(rng.uniform(0.2, 0.4), 4)} for h in range(args.days * 24)
+        ])
+        conn.execute(insert(SmartMeterReading), [
+            {"meter_id": m, "timestamp": t0 + timedelta(minutes=i * args.interval_minutes), "energy_kwh": rng.uniform(0.05, 2.0)}
+            for m in range(1, args.meters + 1) for i in range(steps)
+        ])
+
+    db = SessionLocal()
+    try:
+        payload = compute_hourly_bill(db, 1, start, end)
+    finally:
+        db.close()
+    print(f"{len(payload['hourly_breakdown'])} hourly entries, orjson {'available' if orjson else 'NOT installed'}")
+
+    stdlib_time, stdlib_body = timed(lambda: JSONResponse(jsonable_encoder(payload)).body, args.repeat)
+    default_time, _ = timed(lambda: FastJSONResponse(jsonable_encoder(payload)).body, args.repeat)
+    fast_time, body = timed(lambda: fast_json(payload).body, args.repeat)
+    print(f"encode  stdlib JSONResponse + jsonable_encoder : {stdlib_time * 1000:8.2f} ms")
+    print(f"encode  FastJSONResponse + jsonable_encoder    : {default_time * 1000:8.2f} ms")
+    print(f"encode  fast_json (direct)                     : {fast_time * 1000:8.2f} ms")
+
+    print(f"bytes   identity : {len(body):>10,}  (stdlib {len(stdlib_body):,})")
+    for encoding in ("gzip", "br"):
+        if encoding == "br" and brotli is None:
+            print("bytes   br       : brotli not installed")
+            continue
+        elapsed, compressed = timed(lambda: compress(body, encoding), max(1, args.repeat // 4))
+        print(f"bytes   {encoding:<8} : {len(compressed):>10,}  ({elapsed * 1000:.2f} ms to compress)")
+
+
+if __name__ == "__main__":
+    main()
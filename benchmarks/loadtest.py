@@ -0,0 +1,246 @@
+"""HTTP load generator with a production-like traffic mix.
+
+    # start uvicorn with 4 workers on a fresh generated SQLite dataset and drive it for 60s
+    python -m benchmarks.loadtest --start-server --workers 4 --users 500 --duration 60
+
+    # drive an already running instance (e.g. against Postgres), with a custom mix
+    python -m benchmarks.loadtest --url http://localhost:8000 --users 500 --mix ingest=80,analytics=8,billing=8,pricing=1,login=3
+
+Virtual clients are closed-loop: each of --concurrency clients logs in as a generated user, then
+repeatedly picks an operation from the weighted mix, sends it and waits for the answer. Per-route
+throughput, error rate and p50/p95/p99 latency are printed at the end (--json for machine output),
+so runs with different worker counts or DATABASE_URLs can be compared directly.
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import signal
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import date, datetime, timedelta
+
+import httpx
+
+DEFAULT_MIX = "ingest=70,analytics=10,billing=10,hourly_billing=4,pricing=1,login=5"
+PASSWORD = "password"  # what seed_data gives every user
+
+
+def percentile(sorted_values: list[float], p: float) -> float:
+    if not sorted_values:
+        return 0.0
+    return sorted_values[min(len(sorted_values) - 1, int(len(sorted_values) * p))]
+
+
+class Stats:
+    def __init__(self):
+        self.latencies: dict[str, list[float]] = {}
+        self.errors: dict[str, int] = {}
+        self.statuses: dict[str, dict[int, int]] = {}
+
+    def record(self, route: str, elapsed: float, status: int) -> None:
+        self.latencies.setdefault(route, []).append(elapsed)
+        self.statuses.setdefault(route, {})
+        self.statuses[route][status] = self.statuses[route].get(status, 0) + 1
+        if status >= 400 or status == 0:
+            self.errors[route] = self.errors.get(route, 0) + 1
+
+    def report(self, duration: float) -> dict:
+        routes = {}
+        for route, values in sorted(self.latencies.items()):
+            values.sort()
+            routes[route] = {
+                "requests": len(values),
+                "rps": round(len(values) / duration, 1),
+                "error_rate": round(self.errors.get(route, 0) / len(values), 4),
+                "p50_ms": round(percentile(values, 0.50) * 1000, 2),
+                "p95_ms": round(percentile(values, 0.95) * 1000, 2),
+                "p99_ms": round(percentile(values, 0.99) * 1000, 2),
+                "statuses": self.statuses[route]
+            }
+        total = sum(r["requests"] for r in routes.values())
+        return {
+            "duration_s": round(duration, 1),
+            "requests": total,
+            "rps": round(total / duration, 1),
+            "errors": sum(self.errors.values()),
+            "routes": routes
+        }
+
+
+class VirtualClient:
+    def __init__(self, client: httpx.AsyncClient, stats: Stats, args, rng: random.Random, user_id: int):
+        self.client = client
+        self.stats = stats
+        self.args = args
+        self.rng = rng
+        self.user_id = user_id
+        self.meter_ids = [(user_id - 1) * args.meters_per_user + m + 1 for m in range(args.meters_per_user)]
+        self.headers = {}
+        # Ingest timestamps move forward from a per-client start so they don't collide
+        self.next_ts = datetime(2030, 1, 1) + timedelta(days=user_id)
+        start = date.fromisoformat(args.data_start)
+        self.period = {"start": start.isoformat(), "end": (start + timedelta(days=args.data_days)).isoformat()}
+
+    async def call(self, route: str, method: str, url: str, **kwargs) -> httpx.Response | None:
+        t0 = time.perf_counter()
+        try:
+            response = await self.client.request(method, url, headers=self.headers, **kwargs)
+        except httpx.HTTPError:
+            self.stats.record(route, time.perf_counter() - t0, 0)
+            return None
+        self.stats.record(route, time.perf_counter() - t0, response.status_code)
+        return response
+
+    async def login(self) -> None:
+        self.headers = {}
+        response = await self.call("POST /login/", "POST", "/login/",
+                                   data={"username": f"user{self.user_id}@greenvolt.test", "password": PASSWORD})
+        if response is not None and response.status_code == 200:
+            self.headers = {"Authorization": f"Bearer {response.json()['access_token']}"}
+
+    async def ingest(self) -> None:
+        self.next_ts += timedelta(minutes=15)
+        await self.call("POST /readings/", "POST", "/readings/", json={
+            "meter_id": self.rng.choice(self.meter_ids),
+            "energy_kwh": round(self.rng.uniform(0.05, 1.5), 4),
+            "timestamp": self.next_ts.isoformat()
+        })
+
+    async def analytics(self) -> None:
+        await self.call("GET /analytics/{user_id}", "GET", f"/analytics/{self.user_id}", params=self.period)
+
+    async def billing(self) -> None:
+        await self.call("GET /billing/{user_id}", "GET", f"/billing/{self.user_id}", params=self.period)
+
+    async def hourly_billing(self) -> None:
+        await self.call("GET /billing/{user_id}/detailed_hourly", "GET",
+                        f"/billing/{self.user_id}/detailed_hourly", params=self.period)
+
+    async def pricing(self) -> None:
+        day = datetime.fromisoformat(self.period["start"]) + timedelta(days=self.rng.randrange(self.args.data_days))
+        await self.call("POST /pricing/bulk/", "POST", "/pricing/bulk/", json=[
+            {"date": (day + timedelta(hours=h)).isoformat(), "price_per_kwh": round(self.rng.uniform(0.15, 0.45), 4)}
+            for h in range(24)
+        ])
+
+    async def run(self, operations: list[str], weights: list[int], deadline: float) -> None:
+        await self.login()
+        while time.perf_counter() < deadline:
+            await getattr(self, self.rng.choices(operations, weights)[0])()
+
+
+def parse_mix(mix: str) -> tuple[list[str], list[int]]:
+    operations, weights = [], []
+    for part in mix.split(","):
+        name, _, weight = part.partition("=")
+        if not hasattr(VirtualClient, name.strip()) or name.strip() in ("run", "call"):
+            raise SystemExit(f"Unknown operation in --mix: {name}")
+        operations.append(name.strip())
+        weights.append(int(weight or 1))
+    return operations, weights
+
+
+async def drive(args) -> dict:
+    operations, weights = parse_mix(args.mix)
+    stats = Stats()
+    limits = httpx.Limits(max_connections=args.concurrency, max_keepalive_connections=args.concurrency)
+    async with httpx.AsyncClient(base_url=args.url, limits=limits, timeout=args.timeout) as client:
+        rng = random.Random(args.seed)
+        clients = [
+            VirtualClient(client, stats, args, random.Random(rng.random()), rng.randrange(args.users) + 1)
+            for _ in range(args.concurrency)
+        ]
+        start = time.perf_counter()
+        deadline = start + args.duration
+        await asyncio.gather(*(c.run(operations, weights, deadline) for c in clients))
+        return stats.report(time.perf_counter() - start)
+
+
+def start_server(args) -> subprocess.Popen:
+    env = dict(os.environ)
+    if "DATABASE_URL" not in env:
+        workdir = tempfile.mkdtemp(prefix="greenvolt-loadtest-")
+        env["DATABASE_URL"] = f"sqlite:///{os.path.join(workdir, 'loadtest.db')}"
+    if not args.no_seed:
+        subprocess.run([
+            sys.executable, "-m", "greenvolt_api.seed_data", "--users", str(args.users),
+            "--meters-per-user", str(args.meters_per_user), "--start", args.data_start,
+            "--days", str(args.data_days), "--resolution", args.resolution
+        ], env=env, check=True)
+
+    port = httpx.URL(args.url).port or 8000
+    server = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "greenvolt_api.main:app", "--port", str(port),
+         "--workers", str(args.workers), "--log-level", "warning", "--no-access-log"],
+        env=env, start_new_session=True
+    )
+    deadline = time.monotonic() + 60
+    while time.monotonic() < deadline:
+        try:
+            if httpx.get(args.url + "/").status_code == 200:
+                return server
+        except httpx.HTTPError:
+            pass
+        if server.poll() is not None:
+            raise SystemExit("uvicorn exited during startup")
+        time.sleep(0.2)
+    stop_server(server)
+    raise SystemExit("uvicorn did not become ready within 60s")
+
+
+def stop_server(server: subprocess.Popen) -> None:
+    os.killpg(server.pid, signal.SIGTERM)
+    try:
+        server.wait(timeout=30)
+    except subprocess.TimeoutExpired:
+        os.killpg(server.pid, signal.SIGKILL)
+
+
+def print_report(report: dict, args) -> None:
+    print(f"\n{report['requests']} requests in {report['duration_s']}s: {report['rps']} req/s, "
+          f"{report['errors']} errors (concurrency {args.concurrency}"
+          + (f", {args.workers} workers" if args.start_server else "") + ")")
+    print(f"  {'route':<40}{'req':>8}{'req/s':>9}{'err %':>8}{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}")
+    for route, r in report["routes"].items():
+        print(f"  {route:<40}{r['requests']:>8}{r['rps']:>9.1f}{r['error_rate'] * 100:>8.2f}"
+              f"{r['p50_ms']:>9.1f}{r['p95_ms']:>9.1f}{r['p99_ms']:>9.1f}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Drive a GreenVolt API instance with mixed traffic.")
+    parser.add_argument("--url", default="http://127.0.0.1:8765")
+    parser.add_argument("--duration", type=float, default=30, help="Seconds")
+    parser.add_argument("--concurrency", type=int, default=32, help="Virtual clients")
+    parser.add_argument("--mix", default=DEFAULT_MIX, help=f"Weighted operations (default {DEFAULT_MIX})")
+    parser.add_argument("--users", type=int, default=200, help="Generated users to spread clients over")
+    parser.add_argument("--meters-per-user", type=int, default=1)
+    parser.add_argument("--data-start", default="2025-08-01", help="First day of the generated data")
+    parser.add_argument("--data-days", type=int, default=30)
+    parser.add_argument("--resolution", default="15min")
+    parser.add_argument("--timeout", type=float, default=30)
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--start-server", action="store_true", help="Generate a dataset and start uvicorn on --url's port")
+    parser.add_argument("--workers", type=int, default=1, help="uvicorn workers with --start-server")
+    parser.add_argument("--no-seed", action="store_true", help="With --start-server, use DATABASE_URL as it is")
+    parser.add_argument("--json", action="store_true", help="Print the report as JSON")
+    args = parser.parse_args(argv)
+
+    server = start_server(args) if args.start_server else None
+    try:
+        report = asyncio.run(drive(args))
+    finally:
+        if server is not None:
+            stop_server(server)
+
+    if args.json:
+        print(json.dumps(report, indent=2))
+    else:
+        print_report(report, args)
+
+
+if __name__ == "__main__":
+    main()
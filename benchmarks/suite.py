@@ -0,0 +1,179 @@
+"""In-process endpoint benchmarks against generated datasets, compared with stored baselines.
+
+    python -m benchmarks.suite                       # run small+medium, compare with baselines.json
+    python -m benchmarks.suite --sizes large         # pick dataset sizes
+    python -m benchmarks.suite --update-baselines    # record the current numbers as the new baseline
+
+Each dataset size runs in its own subprocess against a fresh SQLite file, with the result
+cache off so every request does the full computation. Timings are compared against the
+baseline with --tolerance; query counts are deterministic and must not grow at all.
+"""
+import argparse
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import date, datetime, timedelta
+
+BASELINES = os.path.join(os.path.dirname(__file__), "baselines.json")
+START = date(2025, 8, 1)
+
+SIZES = {
+    "small": {"users": 20, "meters_per_user": 1, "days": 7, "resolution": "hourly"},
+    "medium": {"users": 200, "meters_per_user": 2, "days": 31, "resolution": "15min"},
+    "large": {"users": 2000, "meters_per_user": 2, "days": 31, "resolution": "15min"},
+}
+
+
+def benchmarks(user_id: int, meter_id: int):
+    """(name, method, path, request kwargs factory) for every hot endpoint."""
+    week = {"start": START.isoformat(), "end": (START + timedelta(days=7)).isoformat()}
+    month = {"start": START.isoformat(), "end": (START + timedelta(days=30)).isoformat()}
+    counter = iter(range(10**9))
+
+    def reading():
+        ts = datetime(2030, 1, 1) + timedelta(minutes=15 * next(counter))
+        return {"json": {"meter_id": meter_id, "energy_kwh": 0.25, "timestamp": ts.isoformat()}}
+
+    def bulk_consumption():
+        base = datetime(2031, 1, 1) + timedelta(days=next(counter))
+        return {"json": [
+            {"user_id": user_id, "smart_meter_id": meter_id, "timestamp": (base + timedelta(minutes=m)).isoformat(), "energy_kwh": 0.1}
+            for m in range(0, 500 * 15, 15)
+        ]}
+
+    def bulk_pricing():
+        return {"json": [
+            {"date": (datetime.combine(START, datetime.min.time()) + timedelta(hours=h)).isoformat(), "price_per_kwh": 0.3}
+            for h in range(168)
+        ]}
+
+    def ev_session():
+        start = datetime.combine(START, datetime.min.time()) + timedelta(hours=18)
+        return {"json": {"user_id": user_id, "energy_kwh": 22.0, "start_time": start.isoformat(),
+                         "end_time": (start + timedelta(hours=4)).isoformat()}}
+
+    return [
+        ("reading_ingest", "POST", "/readings/", reading),
+        ("bulk_consumption_500", "POST", "/consumption/bulk/", bulk_consumption),
+        ("bulk_pricing_168", "POST", "/pricing/bulk/", bulk_pricing),
+        ("billing_week", "GET", f"/billing/{user_id}", lambda: {"params": week}),
+        ("billing_month", "GET", f"/billing/{user_id}", lambda: {"params": month}),
+        ("hourly_billing_month", "GET", f"/billing/{user_id}/detailed_hourly", lambda: {"params": month}),
+        ("analytics_month", "GET", f"/analytics/{user_id}", lambda: {"params": month}),
+        ("ev_session_create", "POST", "/ev/", ev_session),
+        ("ev_monthly_summary", "GET", f"/ev/{user_id}/monthly-summary", lambda: {}),
+    ]
+
+
+def run_size(size: str, iterations: int) -> dict:
+    """Runs inside the per-size subprocess."""
+    from fastapi.testclient import TestClient
+    from greenvolt_api.instrumentation import add_request_listener
+    from greenvolt_api.main import app
+    from greenvolt_api.seed_data import generate
+
+    generate(start=START, **SIZES[size])
+    client = TestClient(app)
+    token = client.post("/login/", data={"username": "user1@greenvolt.test", "password": "password"}).json()["access_token"]
+    headers = {"Authorization": f"Bearer {token}"}
+
+    query_counts = []
+    add_request_listener(lambda stats: query_counts.append(stats.count))
+
+    results = {}
+    for name, method, path, make_kwargs in benchmarks(user_id=1, meter_id=1):
+        timings = []
+        for i in range(iterations + 2):  # two warmups
+            kwargs = make_kwargs()
+            t0 = time.perf_counter()
+            response = client.request(method, path, headers=headers, **kwargs)
+            elapsed = time.perf_counter() - t0
+            if response.status_code >= 400:
+                raise SystemExit(f"{name}: HTTP {response.status_code} {response.text[:200]}")
+            if i >= 2:
+                timings.append(elapsed * 1000)
+        timings.sort()
+        results[name] = {
+            "median_ms": round(statistics.median(timings), 3),
+            "p95_ms": round(timings[min(len(timings) - 1, int(len(timings) * 0.95))], 3),
+            "queries": query_counts[-1],
+        }
+    return results
+
+
+def run_in_subprocess(size: str, iterations: int) -> dict:
+    workdir = tempfile.mkdtemp(prefix=f"greenvolt-bench-{size}-")
+    env = dict(os.environ, DATABASE_URL=f"sqlite:///{os.path.join(workdir, 'bench.db')}", GREENVOLT_CACHE="off")
+    out = subprocess.run(
+        [sys.executable, "-m", "benchmarks.suite", "--worker", size, "--iterations", str(iterations)],
+        env=env, capture_output=True, text=True, check=True,
+        cwd=os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    )
+    return json.loads(out.stdout.strip().splitlines()[-1])
+
+
+def compare(size: str, current: dict, baseline: dict, tolerance: float) -> list[str]:
+    problems = []
+    for name, now in current.items():
+        base = baseline.get(name)
+        if base is None:
+            continue
+        if now["queries"] > base["queries"]:
+            problems.append(f"{size}/{name}: {now['queries']} queries, baseline {base['queries']}")
+        if now["median_ms"] > base["median_ms"] * (1 + tolerance):
+            problems.append(f"{size}/{name}: median {now['median_ms']:.2f} ms, baseline {base['median_ms']:.2f} ms "
+                            f"(+{now['median_ms'] / base['median_ms'] - 1:.0%})")
+    return problems
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--sizes", default="small,medium", help=f"Comma-separated, from {', '.join(SIZES)}")
+    parser.add_argument("--iterations", type=int, default=20)
+    parser.add_argument("--tolerance", type=float, default=0.25, help="Allowed median slowdown (0.25 = 25%%)")
+    parser.add_argument("--update-baselines", action="store_true")
+    parser.add_argument("--worker", help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+
+    if args.worker:
+        print(json.dumps(run_size(args.worker, args.iterations)))
+        return
+
+    baselines = {}
+    if os.path.exists(BASELINES):
+        with open(BASELINES) as f:
+            baselines = json.load(f)
+
+    problems = []
+    for size in args.sizes.split(","):
+        current = run_in_subprocess(size, args.iterations)
+        print(f"\n[{size}] {SIZES[size]}")
+        print(f"  {'benchmark':<24}{'median ms':>11}{'p95 ms':>10}{'queries':>9}{'baseline ms':>13}")
+        for name, r in current.items():
+            base = baselines.get("sizes", {}).get(size, {}).get(name, {})
+            print(f"  {name:<24}{r['median_ms']:>11.2f}{r['p95_ms']:>10.2f}{r['queries']:>9}{base.get('median_ms', float('nan')):>13.2f}")
+        problems += compare(size, current, baselines.get("sizes", {}).get(size, {}), args.tolerance)
+        if args.update_baselines:
+            baselines.setdefault("sizes", {})[size] = current
+
+    if args.update_baselines:
+        baselines["machine"] = {"python": platform.python_version(), "platform": platform.platform(),
+                                "processor": platform.processor() or platform.machine()}
+        with open(BASELINES, "w") as f:
+            json.dump(baselines, f, indent=2, sort_keys=True)
+            f.write("\n")
+        print(f"\nBaselines written to {BASELINES}")
+    elif problems:
+        print("\nRegressions:")
+        for p in problems:
+            print(f"  {p}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
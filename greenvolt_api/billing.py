@@ -0,0 +1,115 @@
+from collections import defaultdict
+from datetime import date, datetime
+
+from sqlalchemy.orm import Session
+
+from greenvolt_api.models import Pricing, Invoice
+from greenvolt_api.schemas import BILLING_BREAKDOWN
+
+EMISSIONS_FACTOR_KG_PER_KWH = 0.4
+
+
+def hour_floor(dt: datetime) -> datetime:
+    return dt.replace(minute=0, second=0, microsecond=0)
+
+
+def as_datetime(d) -> datetime:
+    """Dates bind as midnight, so use the same boundary when we compare in Python."""
+    if isinstance(d, datetime):
+        return d
+    return datetime.combine(d, datetime.min.time())
+
+
+def load_rates(db: Session, start, end) -> dict[datetime, float]:
+    """Return {hour_start_datetime -> price_per_kwh} for every rate between start and end."""
+    rates = db.query(Pricing.date, Pricing.price_per_kwh).filter(
+        Pricing.date >= hour_floor(as_datetime(start)),
+        Pricing.date <= end
+    ).all()
+    return {hour_floor(d): p for d, p in rates}
+
+
+def missing_rate_hours(hours, rates: dict[datetime, float]) -> int:
+    """How many of the (hour-floored) reading hours have no loaded price."""
+    return len(set(hours) - rates.keys())
+
+
+def hourly_line_items(readings, rates: dict[datetime, float]) -> list[dict]:
+    """Aggregate readings into one priced line item per (meter, hour). Missing rate -> 0, flagged rate_missing."""
+    buckets = defaultdict(float)
+    for meter_id, ts, kwh in readings:
+        buckets[(meter_id, hour_floor(ts))] += kwh
+
+    items = []
+    for (meter_id, hour), kwh in sorted(buckets.items()):
+        price = rates.get(hour, 0)
+        items.append({
+            "meter_id": meter_id,
+            "timestamp": hour,
+            "energy_kwh": kwh,
+            "price_per_kwh": price,
+            "cost": kwh * price,
+            "rate_missing": hour not in rates
+        })
+    return items
+
+
+def bill_summary(user_id: int, start, end, items) -> dict:
+    """Build the /billing response (a BillingBreakdown) from priced line items (dicts or InvoiceLineItem rows).
+
+    Missing-rate hours come from the items' own flags, i.e. the prices they were billed with.
+    """
+    items = [
+        item if isinstance(item, dict) else {
+            "meter_id": item.meter_id,
+            "timestamp": item.timestamp,
+            "energy_kwh": item.energy_kwh,
+            "price_per_kwh": item.price_per_kwh,
+            "cost": item.cost,
+            "rate_missing": item.rate_missing
+        }
+        for item in items
+    ]
+    total_kwh = 0
+    total_cost = 0
+    daily_data = defaultdict(lambda: {"kwh": 0, "cost": 0})
+
+    for item in items:
+        ts, kwh, cost = item["timestamp"], item["energy_kwh"], item["cost"]
+        day = ts.date()
+        daily_data[day]["kwh"] += kwh
+        daily_data[day]["cost"] += cost
+        total_kwh += kwh
+        total_cost += cost
+
+    daily_breakdown = [
+        {
+            "date": day.isoformat(),
+            "kwh": round(data["kwh"], 2),
+            "cost": round(data["cost"], 2),
+            "co2_avoided_kg": round(data["kwh"] * EMISSIONS_FACTOR_KG_PER_KWH, 2)
+        }
+        for day, data in sorted(daily_data.items())
+    ]
+
+    breakdown = BILLING_BREAKDOWN.validate_python({
+        "user_id": user_id,
+        "start_date": start,
+        "end_date": end,
+        "total_kwh": round(total_kwh, 2),
+        "total_cost": round(total_cost, 2),
+        "co2_avoided_kg": round(total_kwh * EMISSIONS_FACTOR_KG_PER_KWH, 2),
+        "missing_rate_hours": len({i["timestamp"] for i in items if i["rate_missing"]}),
+        "daily_breakdown": daily_breakdown,
+        "items": items
+    })
+    return BILLING_BREAKDOWN.dump_python(breakdown, exclude_none=True)
+
+
+def find_invoice(db: Session, user_id: int, start: date, end: date):
+    """Persisted invoice for exactly this period, if the billing run produced one."""
+    return db.query(Invoice).filter(
+        Invoice.user_id == user_id,
+        Invoice.period_start == as_datetime(start),
+        Invoice.period_end == as_datetime(end)
+    ).first()
@@ -0,0 +1,125 @@
+import argparse
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, datetime
+
+from sqlalchemy import insert
+
+from greenvolt_api.billing import as_datetime, hourly_line_items, load_rates
+from greenvolt_api.database import SessionLocal
+from greenvolt_api.models import Invoice, InvoiceLineItem, SmartMeter
+from greenvolt_api.readings_source import load_readings
+from greenvolt_api.versions import bump_versions, user_scope
+
+
+def chunked(seq, size):
+    for i in range(0, len(seq), size):
+        yield seq[i:i + size]
+
+
+def bill_chunk(user_ids: list[int], start: datetime, end: datetime, rates: dict, session_factory=SessionLocal) -> int:
+    """Bill one chunk of users in its own session/transaction. Returns the number of invoices written."""
+    db = session_factory()
+    try:
+        # Users with no meters get no invoice; GET falls back to the live path (and its 404)
+        meter_owner = dict(
+            db.query(SmartMeter.id, SmartMeter.user_id).filter(SmartMeter.user_id.in_(user_ids)).all()
+        )
+        if not meter_owner:
+            return 0
+
+        readings_by_user = {user_id: [] for user_id in set(meter_owner.values())}
+        for row in load_readings(db, list(meter_owner), start, end):
+            readings_by_user[meter_owner[row[0]]].append(row)
+
+        # Re-running a period replaces its invoices
+        stale_ids = [i for (i,) in db.query(Invoice.id).filter(
+            Invoice.user_id.in_(list(readings_by_user)),
+            Invoice.period_start == start,
+            Invoice.period_end == end
+        )]
+        if stale_ids:
+            db.query(InvoiceLineItem).filter(InvoiceLineItem.invoice_id.in_(stale_ids)).delete(synchronize_session=False)
+            db.query(Invoice).filter(Invoice.id.in_(stale_ids)).delete(synchronize_session=False)
+
+        items_by_user = {}
+        invoices = []
+        for user_id, rows in readings_by_user.items():
+            items = hourly_line_items(rows, rates)
+            items_by_user[user_id] = items
+            invoices.append(Invoice(
+                user_id=user_id,
+                period_start=start,
+                period_end=end,
+                total_kwh=sum(i["energy_kwh"] for i in items),
+                total_cost=sum(i["cost"] for i in items)
+            ))
+        db.add_all(invoices)
+        db.flush()
+
+        line_items = []
+        for invoice in invoices:
+            for item in items_by_user[invoice.user_id]:
+                line_items.append({"invoice_id": invoice.id, **item})
+        if line_items:
+            db.execute(insert(InvoiceLineItem), line_items)
+        # Responses cached from the previous invoices must not be served again
+        bump_versions(db, *(user_scope(user_id) for user_id in readings_by_user))
+
+        db.commit()
+        return len(invoices)
+    except Exception:
+        db.rollback()
+        raise
+    finally:
+        db.close()
+
+
+def run_billing(start: date, end: date, chunk_size: int = 1000, workers: int = 4,
+                session_factory=SessionLocal) -> int:
+    """Compute and persist invoices for every metered user for the period [start, end]."""
+    start_dt, end_dt = as_datetime(start), as_datetime(end)
+
+    db = session_factory()
+    try:
+        user_ids = [u for (u,) in db.query(SmartMeter.user_id).filter(SmartMeter.user_id.isnot(None)).distinct()]
+        # Rates are shared read-only by every chunk
+        rates = load_rates(db, start_dt, end_dt)
+        dialect = db.get_bind().dialect.name
+    finally:
+        db.close()
+
+    chunks = list(chunked(sorted(user_ids), chunk_size))
+    if dialect == "sqlite" or workers <= 1:
+        # SQLite has a single writer; parallel chunks would only queue up on the lock
+        return sum(bill_chunk(chunk, start_dt, end_dt, rates, session_factory) for chunk in chunks)
+
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        futures = [
+            pool.submit(bill_chunk, chunk, start_dt, end_dt, rates, session_factory)
+            for chunk in chunks
+        ]
+        return sum(f.result() for f in futures)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Bill all users for a closed period and persist the invoices.")
+    parser.add_argument("--start", type=date.fromisoformat, required=True, help="Period start (YYYY-MM-DD)")
+    parser.add_argument("--end", type=date.fromisoformat, required=True, help="Period end (YYYY-MM-DD)")
+    parser.add_argument("--chunk-size", type=int, default=1000, help="Users per transaction")
+    parser.add_argument("--workers", type=int, default=4, help="Chunks billed in parallel (Postgres; SQLite uses one)")
+    parser.add_argument("--force", action="store_true", help="Allow billing a period that has not closed yet")
+    args = parser.parse_args(argv)
+
+    if args.end < args.start:
+        parser.error("--end must not be before --start")
+    if args.end > date.today() and not args.force:
+        parser.error("period is still open; pass --force to bill it anyway")
+
+    t0 = time.perf_counter()
+    count = run_billing(args.start, args.end, chunk_size=args.chunk_size, workers=args.workers)
+    print(f"Billed {count} users for {args.start}..{args.end} in {time.perf_counter() - t0:.1f}s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,171 @@
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+from datetime import date, datetime
+from typing import Any, Callable, Optional
+
+from greenvolt_api.metrics import callback, counter
+from greenvolt_api.singleflight import SingleFlight
+
+# Cached entries are keyed by data version, so they never need explicit invalidation:
+# a write bumps the version and later requests simply look up a different key.
+DEFAULT_TTL_SECONDS = 3600
+
+
+class LRUCache:
+    """In-process cache. Values are returned as stored, so callers must not mutate them."""
+
+    def __init__(self, maxsize: int = 4096):
+        self.maxsize = maxsize
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Optional[Any]:
+        with self._lock:
+            value = self._data.get(key)
+            if value is not None:
+                self._data.move_to_end(key)
+            return value
+
+    def set(self, key: str, value: Any) -> None:
+        with self._lock:
+            self._data[key] = value
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+
+
+class LocalKeyValueStore:
+    """Stand-in for an external key-value store, exposing the subset of the redis client API we use."""
+
+    def __init__(self):
+        self._data = {}
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Optional[bytes]:
+        with self._lock:
+            item = self._data.get(key)
+            if item is None:
+                return None
+            value, expires_at = item
+            if expires_at is not None and expires_at <= time.monotonic():
+                del self._data[key]
+                return None
+            return value
+
+    def set(self, key: str, value: bytes, ex: Optional[int] = None) -> None:
+        with self._lock:
+            self._data[key] = (value, time.monotonic() + ex if ex else None)
+
+    def flushdb(self) -> None:
+        with self._lock:
+            self._data.clear()
+
+
+def _json_default(o):
+    if isinstance(o, (date, datetime)):
+        return o.isoformat()
+    raise TypeError(f"Cannot cache value of type {type(o).__name__}")
+
+
+class KeyValueCache:
+    """Cache backed by a redis-compatible client, shared by every worker that talks to the same store."""
+
+    def __init__(self, client, prefix: str = "greenvolt:", ttl: int = DEFAULT_TTL_SECONDS):
+        self.client = client
+        self.prefix = prefix
+        self.ttl = ttl
+
+    def get(self, key: str) -> Optional[Any]:
+        raw = self.client.get(self.prefix + key)
+        return json.loads(raw) if raw is not None else None
+
+    def set(self, key: str, value: Any) -> None:
+        self.client.set(self.prefix + key, json.dumps(value, default=_json_default), ex=self.ttl)
+
+    def clear(self) -> None:
+        self.client.flushdb()
+
+
+class NullCache:
+    def get(self, key: str) -> None:
+        return None
+
+    def set(self, key: str, value: Any) -> None:
+        pass
+
+    def clear(self) -> None:
+        pass
+
+
+class ResultCache:
+    """Version-keyed cache in front of expensive computations.
+
+    Misses go through a SingleFlight, so identical concurrent requests (same key, i.e. same
+    user, range and data version) run the computation once and share the result.
+    """
+
+    def __init__(self, backend, flight: Optional[SingleFlight] = None):
+        self.backend = backend
+        self.flight = flight or SingleFlight()
+
+    def get_or_compute(self, key: str, compute: Callable[[], Any]) -> Any:
+        value = self.backend.get(key)
+        if value is not None:
+            CACHE_REQUESTS.inc(("hit",))
+            return value
+        CACHE_REQUESTS.inc(("miss",))
+        return self.flight.do(key, lambda: self._compute_and_store(key, compute))
+
+    def _compute_and_store(self, key: str, compute: Callable[[], Any]) -> Any:
+        value = compute()
+        self.backend.set(key, value)
+        return value
+
+    def clear(self) -> None:
+        self.backend.clear()
+
+
+def cache_key(kind: str, user_id: int, start, end, versions: tuple[int, ...]) -> str:
+    return f"{kind}:{user_id}:{start}:{end}:v" + ".".join(str(v) for v in versions)
+
+
+def create_backend(name: str):
+    """GREENVOLT_CACHE: lru (default), redis, local or off."""
+    if name == "lru":
+        return LRUCache(int(os.getenv("GREENVOLT_CACHE_SIZE", "4096")))
+    if name == "redis":
+        import redis  # optional dependency, only needed for this backend
+        return KeyValueCache(redis.Redis.from_url(os.getenv("GREENVOLT_CACHE_URL", "redis://localhost:6379/0")))
+    if name == "local":
+        return KeyValueCache(LocalKeyValueStore())
+    if name == "off":
+        return NullCache()
+    raise ValueError(f"Unknown GREENVOLT_CACHE backend: {name}")
+
+
+CACHE_REQUESTS = counter("greenvolt_cache_requests_total", "Result cache lookups.", ("result",))
+
+
+def hit_ratio() -> float:
+    values = CACHE_REQUESTS.values()
+    hits, misses = values.get(("hit",), 0.0), values.get(("miss",), 0.0)
+    return hits / (hits + misses) if hits + misses else 0.0
+
+
+result_cache = ResultCache(create_backend(os.getenv("GREENVOLT_CACHE", "lru")))
+
+callback("greenvolt_cache_hit_ratio", "Result cache hits / lookups since start.", hit_ratio)
+callback(
+    "greenvolt_singleflight_calls_total", "Expensive computations run (executed) or shared with an in-flight call (deduplicated).",
+    lambda: {(k,): v for k, v in result_cache.flight.stats().items() if k != "in_flight"},
+    ("outcome",), kind="counter"
+)
+callback("greenvolt_singleflight_in_flight", "Computations currently in flight.",
+         lambda: result_cache.flight.stats()["in_flight"])
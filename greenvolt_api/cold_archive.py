@@ -0,0 +1,335 @@
+"""Cold archive: closed months of readings in compact, memory-mapped columnar files.
+
+    python -m greenvolt_api.cold_archive list
+    python -m greenvolt_api.cold_archive archive --before 2025-01
+
+One file per month (``readings-2024-08.gvc`` under the archive directory) holds one block per
+meter: its timestamps as deltas from the previous reading (uint32 seconds, or int64 microseconds when
+a timestamp has sub-second precision), then its energy values as float64. An index of
+(meter_id, offset, count, first timestamp, unit) per meter sits at the end of the file. That is
+12 bytes per reading for the usual whole-second series. Readers mmap the file and cast the blocks
+to typed memoryviews, so nothing is parsed or copied until a meter is asked for.
+
+Archiving a month writes the file (merged with any earlier archive of that month), then deletes the
+archived rows from ``smart_meter_readings``. Billing and analytics read archived months through
+greenvolt_api.readings_source. Rows still in the table for an archived month, such as late readings,
+win over archived ones at the same instant. Run ``archive`` again to fold them in.
+
+The archive directory is GREENVOLT_COLD_ARCHIVE_DIR. A relative setting, and the default
+``cold_archive``, are taken relative to the SQLite database file, so the API and the CLI find the
+same files whatever their working directory. Other databases need an absolute setting; without
+one there is no archive. At startup the API warns when readings have been archived but the
+directory holds no archive files, since billing would silently miss those months.
+"""
+import argparse
+import logging
+import mmap
+import os
+import struct
+import sys
+import threading
+from array import array
+from bisect import bisect_left, bisect_right
+from datetime import date, datetime, timedelta
+from heapq import merge
+from itertools import accumulate, groupby
+from operator import itemgetter
+from typing import Iterable, Iterator, Optional
+
+from sqlalchemy import func, select
+
+from greenvolt_api.billing import as_datetime
+from greenvolt_api.database import SessionLocal, engine
+from greenvolt_api.models import SmartMeterReading
+from greenvolt_api.partitions import add_months, month_start, months_between
+from greenvolt_api.versions import ARCHIVE_SCOPE, bump_versions, get_versions, meter_data_scopes
+
+logger = logging.getLogger("greenvolt.cold_archive")
+
+
+def archive_dir(setting: Optional[str], bind) -> Optional[str]:
+    """The archive directory as an absolute path; None when the database has no file to sit next to."""
+    if setting and os.path.isabs(setting):
+        return setting
+    database = bind.url.database if bind.dialect.name == "sqlite" else None
+    if not database or database == ":memory:":
+        if setting:
+            raise ValueError(f"GREENVOLT_COLD_ARCHIVE_DIR must be an absolute path, not {setting!r}, "
+                             f"unless the database is a SQLite file")
+        return None
+    return os.path.join(os.path.dirname(os.path.abspath(database)), setting or "cold_archive")
+
+
+ARCHIVE_DIR = archive_dir(os.getenv("GREENVOLT_COLD_ARCHIVE_DIR"), engine)
+SUFFIX = ".gvc"
+
+MAGIC = b"GVCA"
+VERSION = 1
+# magic, version, byte order of the data blocks (0 little, 1 big), meter count, index offset, reading count
+HEADER = struct.Struct("<4sHBxIqq")
+# meter_id, block offset, reading count, first timestamp (epoch µs), µs per delta unit
+INDEX = struct.Struct("<qqqqq")
+
+EPOCH = datetime(1970, 1, 1)
+US_PER_S = 1_000_000
+assert array("I").itemsize == 4 and array("q").itemsize == 8 and array("d").itemsize == 8
+
+
+def _us(ts: datetime) -> int:
+    return (ts - EPOCH) // timedelta(microseconds=1)
+
+
+def _pad(n: int) -> int:
+    return -n % 8
+
+
+class MonthFile:
+    """One archived month, memory-mapped read-only."""
+
+    def __init__(self, path: str):
+        self.path = path
+        with open(path, "rb") as f:
+            self._map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, version, order, meters, index_offset, self.reading_count = HEADER.unpack_from(self._map)
+        if magic != MAGIC or version != VERSION:
+            raise ValueError(f"{path} is not a version {VERSION} cold archive file")
+        if order != (sys.byteorder == "big"):
+            raise ValueError(f"{path} was written on a machine with the other byte order")
+        self._view = memoryview(self._map)
+        self._index = {entry[0]: entry[1:] for entry in
+                       INDEX.iter_unpack(self._view[index_offset:index_offset + meters * INDEX.size])}
+        self.size = len(self._map)
+
+    def meter_ids(self) -> list[int]:
+        return list(self._index)
+
+    def _energies(self, offset: int, count: int, size: int) -> memoryview:
+        energy_offset = offset + count * size + _pad(count * size)
+        return self._view[energy_offset:energy_offset + count * 8].cast("d")
+
+    def energies(self, meter_id: int) -> memoryview:
+        """All energy values of one meter, straight from the mapping; nothing is decoded."""
+        entry = self._index.get(meter_id)
+        if entry is None:
+            return memoryview(b"").cast("d")
+        offset, count, _, step = entry
+        return self._energies(offset, count, 4 if step == US_PER_S else 8)
+
+    def columns(self, meter_id: int, start: Optional[datetime] = None,
+                end: Optional[datetime] = None) -> tuple[list[datetime], memoryview]:
+        """Timestamps and energy values of one meter with start <= timestamp <= end."""
+        entry = self._index.get(meter_id)
+        if entry is None:
+            return [], memoryview(b"").cast("d")
+        offset, count, first, step = entry
+        code, size = ("I", 4) if step == US_PER_S else ("q", 8)
+        units = list(accumulate(self._view[offset:offset + count * size].cast(code)))
+
+        lo = 0 if start is None else bisect_left(units, -(-(_us(start) - first) // step))
+        hi = count if end is None else bisect_right(units, (_us(end) - first) // step)
+        base, unit = EPOCH + timedelta(microseconds=first), timedelta(microseconds=step)
+        # map() over bound methods keeps the per-reading work in C
+        timestamps = list(map(base.__add__, map(unit.__mul__, units[lo:hi])))
+        return timestamps, self._energies(offset, count, size)[lo:hi]
+
+    def series(self) -> Iterator[tuple[int, list[tuple[datetime, float]]]]:
+        """(meter_id, [(timestamp, energy_kwh), ...]) for every meter, in meter order."""
+        for meter_id in self._index:
+            timestamps, energies = self.columns(meter_id)
+            yield meter_id, list(zip(timestamps, energies))
+
+
+def write_month(path: str, series: Iterable[tuple[int, list[tuple[datetime, float]]]]) -> int:
+    """Write per-meter series (ascending meter_id and timestamp) to ``path`` atomically; returns readings."""
+    tmp = f"{path}.tmp"
+    index, total = [], 0
+    with open(tmp, "wb") as f:
+        f.write(bytes(HEADER.size + _pad(HEADER.size)))
+        for meter_id, points in series:
+            if not points:
+                continue
+            stamps = [_us(ts) for ts, _ in points]
+            first = stamps[0]
+            if all(us % US_PER_S == 0 for us in stamps):
+                step, deltas = US_PER_S, array("I")
+            else:
+                step, deltas = 1, array("q")
+            previous = first
+            for us in stamps:
+                deltas.append((us - previous) // step)
+                previous = us
+            index.append((meter_id, f.tell(), len(points), first, step))
+            f.write(deltas.tobytes())
+            f.write(bytes(_pad(len(deltas) * deltas.itemsize)))
+            f.write(array("d", (kwh for _, kwh in points)).tobytes())
+            total += len(points)
+        index_offset = f.tell()
+        for entry in index:
+            f.write(INDEX.pack(*entry))
+        f.seek(0)
+        f.write(HEADER.pack(MAGIC, VERSION, sys.byteorder == "big", len(index), index_offset, total))
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp, path)
+    return total
+
+
+def _merged(archived: Iterable, fresh: Iterable) -> Iterator[tuple[int, list[tuple[datetime, float]]]]:
+    """Per-meter union of two series streams; the fresh side wins at the same instant."""
+    for meter_id, parts in groupby(merge(((m, 0, p) for m, p in archived), ((m, 1, p) for m, p in fresh)),
+                                   key=itemgetter(0)):
+        parts = [points for _, _, points in parts]
+        if len(parts) == 1:
+            yield meter_id, parts[0]
+        else:
+            yield meter_id, sorted(dict(parts[0] + parts[1]).items())
+
+
+class ColdArchive:
+    def __init__(self, directory: Optional[str] = ARCHIVE_DIR):
+        self.directory = directory
+        self._lock = threading.Lock()
+        self._listing: tuple[Optional[int], dict[date, str]] = (None, {})
+        self._open: dict[str, tuple[tuple, MonthFile]] = {}
+
+    def path(self, month: date) -> str:
+        if self.directory is None:
+            raise RuntimeError("No cold archive directory; set GREENVOLT_COLD_ARCHIVE_DIR to an absolute path")
+        return os.path.join(self.directory, f"readings-{month:%Y-%m}{SUFFIX}")
+
+    def months(self) -> dict[date, str]:
+        """Archived months; one stat() per call while the directory is unchanged."""
+        if self.directory is None:
+            return {}
+        try:
+            stamp = os.stat(self.directory).st_mtime_ns
+        except FileNotFoundError:
+            return {}
+        with self._lock:
+            if stamp != self._listing[0]:
+                months = {}
+                for filename in os.listdir(self.directory):
+                    if filename.startswith("readings-") and filename.endswith(SUFFIX):
+                        months[date.fromisoformat(filename[9:-len(SUFFIX)] + "-01")] = \
+                            os.path.join(self.directory, filename)
+                self._listing = (stamp, dict(sorted(months.items())))
+            return self._listing[1]
+
+    def overlapping(self, start: datetime, end: datetime) -> list[date]:
+        return [m for m in self.months() if as_datetime(m) <= end and as_datetime(add_months(m, 1)) > start]
+
+    def open(self, month: date) -> Optional[MonthFile]:
+        """The month's file, mapped once and remapped only after it has been rewritten."""
+        if self.directory is None:
+            return None
+        path = self.path(month)
+        try:
+            st = os.stat(path)
+        except FileNotFoundError:
+            return None
+        key = (st.st_ino, st.st_mtime_ns, st.st_size)
+        with self._lock:
+            cached = self._open.get(path)
+            if cached is None or cached[0] != key:
+                # A replaced file keeps its old mapping alive for readers still holding views into it
+                cached = self._open[path] = (key, MonthFile(path))
+            return cached[1]
+
+
+cold_archive = ColdArchive()
+
+
+def archive_month(month: date, session_factory=SessionLocal, archive: ColdArchive = cold_archive,
+                  batch: int = 50_000) -> int:
+    """Move one month of readings from the table into the archive; returns readings in the file."""
+    R = SmartMeterReading
+    lo, hi = as_datetime(month), as_datetime(add_months(month, 1))
+    path = archive.path(month)
+    os.makedirs(archive.directory, exist_ok=True)
+    db = session_factory()
+    try:
+        in_month = (R.timestamp >= lo, R.timestamp < hi)
+        max_id = db.query(func.max(R.id)).filter(*in_month).scalar()
+        if max_id is None:
+            return 0
+        rows = db.execute(select(R.meter_id, R.timestamp, R.energy_kwh)
+                          .where(*in_month, R.id <= max_id)
+                          .order_by(R.meter_id, R.timestamp)
+                          .execution_options(yield_per=batch))
+        moved = []
+
+        def fresh():
+            for meter_id, group in groupby(rows, itemgetter(0)):
+                moved.append(meter_id)
+                yield meter_id, [(ts, kwh) for _, ts, kwh in group]
+
+        existing = archive.open(month)
+        total = write_month(path, _merged(existing.series() if existing else (), fresh()))
+
+        # Readers prefer table rows over archived ones, so both existing briefly does not double count.
+        # Rows inserted after the max id was read stay in the table for the next run.
+        db.query(R).filter(*in_month, R.id <= max_id).delete(synchronize_session=False)
+        bump_versions(db, ARCHIVE_SCOPE, *meter_data_scopes(db, moved))
+        db.commit()
+        return total
+    except Exception:
+        db.rollback()
+        raise
+    finally:
+        db.close()
+
+
+def check_archive(session_factory=SessionLocal, archive: ColdArchive = cold_archive) -> Optional[str]:
+    """Log and return a warning when months have been archived but the directory holds none of them."""
+    db = session_factory()
+    try:
+        (archived,) = get_versions(db, ARCHIVE_SCOPE)
+    finally:
+        db.close()
+    if not archived or archive.months():
+        return None
+    where = archive.directory or "nowhere (GREENVOLT_COLD_ARCHIVE_DIR is not set)"
+    warning = (f"Readings have been moved to the cold archive, but {where} holds no archive files; "
+               f"billing and analytics will miss the archived months")
+    logger.warning(warning)
+    return warning
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Move closed months of readings into the columnar cold archive.")
+    parser.add_argument("command", choices=["list", "archive"])
+    parser.add_argument("--before", type=lambda s: month_start(date.fromisoformat(s + "-01")),
+                        help="archive: every month before YYYY-MM")
+    parser.add_argument("--batch", type=int, default=50_000, help="Rows fetched per round trip")
+    args = parser.parse_args(argv)
+
+    if args.command == "list":
+        for month in cold_archive.months():
+            f = cold_archive.open(month)
+            per_reading = f.size / f.reading_count if f.reading_count else 0
+            print(f"{month:%Y-%m}  {len(f.meter_ids()):>8} meters  {f.reading_count:>12} readings  "
+                  f"{f.size:>12} bytes  {per_reading:.1f} B/reading")
+        return
+
+    if args.before is None:
+        parser.error("archive needs --before YYYY-MM")
+    if cold_archive.directory is None:
+        parser.error("no archive directory; set GREENVOLT_COLD_ARCHIVE_DIR to an absolute path")
+    current = month_start(date.today())
+    if args.before > current:
+        parser.error(f"only closed months can be archived (before {current:%Y-%m})")
+    db = SessionLocal()
+    try:
+        oldest = db.query(func.min(SmartMeterReading.timestamp)).scalar()
+    finally:
+        db.close()
+    if oldest is None:
+        return
+    if isinstance(oldest, str):  # SQLite hands back text for MIN() over a DateTime
+        oldest = datetime.fromisoformat(oldest)
+    for month in months_between(month_start(oldest), add_months(args.before, -1)):
+        print(f"{month:%Y-%m}: {archive_month(month, batch=args.batch)} readings archived")
+
+
+if __name__ == "__main__":
+    main()
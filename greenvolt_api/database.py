@@ -1,13 +1,40 @@
+import os
+import time
+
 from sqlalchemy import create_engine
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import QueuePool
+
+from greenvolt_api.instrumentation import install_query_instrumentation
+from greenvolt_api.metrics import DB_POOL_WAIT, callback
+from greenvolt_api.slow_query import install_slow_query_log
+
+
+class TimedQueuePool(QueuePool):
+    """QueuePool that reports how long each checkout waited for a connection."""
 
-DATABASE_URL = "sqlite:///./greenvolt.db"  # Change to Postgres/MySQL in production
+    def _do_get(self):
+        start = time.perf_counter()
+        try:
+            return super()._do_get()
+        finally:
+            DB_POOL_WAIT.observe(time.perf_counter() - start)
 
-engine = create_engine(DATABASE_URL, connect_args={"check_same_thread": False})
+
+DATABASE_URL = os.getenv("DATABASE_URL", "sqlite:///./greenvolt.db")  # Change to Postgres/MySQL in production
+
+connect_args = {"check_same_thread": False} if DATABASE_URL.startswith("sqlite") else {}
+engine_args = {} if ":memory:" in DATABASE_URL else {"poolclass": TimedQueuePool}
+engine = create_engine(DATABASE_URL, connect_args=connect_args, **engine_args)
+install_query_instrumentation(engine)
+install_slow_query_log()
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 Base = declarative_base()
 
+callback("greenvolt_db_pool_checked_out", "Connections currently checked out of the pool.",
+         lambda: engine.pool.checkedout() if isinstance(engine.pool, QueuePool) else 0)
+
 def get_db():
     db = SessionLocal()
     try:
@@ -15,4 +42,3 @@ def get_db():
     finally:
         db.close()
 
-
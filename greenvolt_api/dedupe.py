@@ -0,0 +1,86 @@
+"""Remove duplicate readings and consumptions, one meter range at a time.
+
+    python -m greenvolt_api.dedupe --dry-run
+    python -m greenvolt_api.dedupe --table readings --meters-per-chunk 200 --sleep 0.05
+
+For each (meter, timestamp) the newest row (highest id) is kept, the same row an "overwrite"
+replay would have left. Every chunk is its own short transaction, so ingest keeps running.
+Migration 0003 runs this before it adds the unique indexes.
+"""
+import argparse
+import time
+
+from sqlalchemy import text
+from sqlalchemy.orm import Session
+
+from greenvolt_api.database import engine
+from greenvolt_api.versions import bump_versions, meter_data_scopes, user_scope
+
+TABLES = {
+    # name: (table, meter column, user column)
+    "readings": ("smart_meter_readings", "meter_id", None),
+    "consumptions": ("consumptions", "smart_meter_id", "user_id"),
+}
+
+
+def count_duplicates(conn, name: str) -> int:
+    table, meter_col, _ = TABLES[name]
+    return conn.execute(text(
+        f"SELECT COALESCE(SUM(n - 1), 0) FROM (SELECT COUNT(*) AS n FROM {table} WHERE timestamp IS NOT NULL "
+        f"GROUP BY {meter_col}, timestamp HAVING COUNT(*) > 1) AS duplicates"
+    )).scalar()
+
+
+def dedupe_table(conn, name: str, meters_per_chunk: int = 500, sleep: float = 0.0, log=print) -> int:
+    """Delete duplicates chunk by chunk on an autocommit connection; returns rows deleted."""
+    table, meter_col, user_col = TABLES[name]
+    bounds = conn.execute(text(f"SELECT MIN({meter_col}), MAX({meter_col}) FROM {table}")).first()
+    if bounds[0] is None:
+        return 0
+
+    returning = f"{meter_col}, {user_col}" if user_col else f"{meter_col}, NULL"
+    deleted = 0
+    for lo in range(bounds[0], bounds[1] + 1, meters_per_chunk):
+        hi = lo + meters_per_chunk
+        removed = conn.execute(text(
+            f"DELETE FROM {table} WHERE {meter_col} >= :lo AND {meter_col} < :hi AND timestamp IS NOT NULL "
+            f"AND id NOT IN (SELECT MAX(id) FROM {table} WHERE {meter_col} >= :lo AND {meter_col} < :hi "
+            f"GROUP BY {meter_col}, timestamp) RETURNING {returning}"
+        ), {"lo": lo, "hi": hi}).all()
+        if removed:
+            deleted += len(removed)
+            # Listings, ETags and cached totals of exactly these meters and their owners changed
+            with Session(bind=conn) as db:
+                bump_versions(db, *meter_data_scopes(db, {m for m, _ in removed if m is not None}),
+                              *(user_scope(u) for _, u in removed if u is not None))
+                db.commit()
+            log(f"{name}: meters {lo}-{hi - 1}: deleted {len(removed)}")
+        if sleep:
+            time.sleep(sleep)
+    return deleted
+
+
+def dedupe(conn, names: list[str], meters_per_chunk: int = 500, sleep: float = 0.0, log=print) -> int:
+    return sum(dedupe_table(conn, name, meters_per_chunk, sleep, log) for name in names)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Remove duplicate (meter, timestamp) rows in chunks.")
+    parser.add_argument("--table", choices=[*TABLES, "all"], default="all")
+    parser.add_argument("--meters-per-chunk", type=int, default=500)
+    parser.add_argument("--sleep", type=float, default=0.0, help="Pause between chunks, in seconds")
+    parser.add_argument("--dry-run", action="store_true", help="Only count duplicates")
+    args = parser.parse_args(argv)
+
+    names = list(TABLES) if args.table == "all" else [args.table]
+    with engine.connect().execution_options(isolation_level="AUTOCOMMIT") as conn:
+        if args.dry_run:
+            for name in names:
+                print(f"{name}: {count_duplicates(conn, name)} duplicate rows")
+            return
+        total = dedupe(conn, names, args.meters_per_chunk, args.sleep)
+    print(f"✅ Deleted {total} duplicate rows")
+
+
+if __name__ == "__main__":
+    main()
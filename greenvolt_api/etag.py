@@ -0,0 +1,54 @@
+import hashlib
+from typing import Optional
+
+from fastapi import Request, Response
+
+# Part of every ETag: bump it whenever a tagged response changes shape for the same data, so
+# clients holding a tag from the previous deploy get the new body instead of a 304
+RESPONSE_FORMAT = 2  # 2: typed billing breakdowns, compacted slots in gap reports
+# Content codings the compression middleware appends to a strong ETag ("abc" -> "abc-br")
+ENCODING_SUFFIXES = ("-br", "-gzip")
+
+
+def make_etag(*parts) -> str:
+    """Strong ETag for a response identified by its parameters and the data versions it was built from."""
+    digest = hashlib.sha1(":".join(str(p) for p in (RESPONSE_FORMAT, *parts)).encode()).hexdigest()
+    return f'"{digest}"'
+
+
+def encoded_etag(etag: str, encoding: str) -> str:
+    """The ETag of one content coding of a response, so each coding has its own strong validator."""
+    if etag.startswith("W/") or not etag.endswith('"'):
+        return etag
+    return f'{etag[:-1]}-{encoding}"'
+
+
+def _identity_etag(tag: str) -> str:
+    tag = tag.removeprefix("W/")  # If-None-Match uses weak comparison, so W/"x" matches "x"
+    for suffix in ENCODING_SUFFIXES:
+        if tag.endswith(f'{suffix}"'):
+            return tag[:-len(suffix) - 1] + '"'
+    return tag
+
+
+def etag_matches(request: Request, etag: str) -> Optional[str]:
+    """The If-None-Match tag naming this version of the response, in whichever coding; None if none does."""
+    header = request.headers.get("if-none-match")
+    if not header:
+        return None
+    if header.strip() == "*":
+        return etag
+    for candidate in (c.strip() for c in header.split(",")):
+        if _identity_etag(candidate) == etag:
+            return candidate
+    return None
+
+
+def conditional_response(request: Request, response: Response, etag: str) -> Optional[Response]:
+    """Return a 304 if the client already has this version, else tag the outgoing response."""
+    matched = etag_matches(request, etag)
+    if matched:
+        # Echo the tag the client holds: the coding it was sent in is the one its cache keeps
+        return Response(status_code=304, headers={"ETag": matched, "Cache-Control": "private, no-cache"})
+    response.headers.update({"ETag": etag, "Cache-Control": "private, no-cache"})
+    return None
@@ -0,0 +1,180 @@
+"""Find missing intervals in meter time series, and optionally fill them with estimates.
+
+    python -m greenvolt_api.gaps --start 2025-08-01 --end 2025-08-31
+    python -m greenvolt_api.gaps --start 2025-08-01 --end 2025-08-31 --fill --min-completeness 0.99
+
+One windowed query per chunk of meters compares every reading with the one before it (LAG) and
+returns only the rows that border a gap, plus each meter's first and last reading and its reading
+count. Nothing else leaves the database. Interior gaps of up to GREENVOLT_GAP_MAX_FILL_INTERVALS
+slots can be filled by linear interpolation between the neighbouring readings. Fills are stored
+with ``is_estimated`` set, and a real reading for the same slot always replaces them.
+
+Slots before the raw retention horizon are reported as ``compacted``, not missing: retention has
+folded their readings into hourly/daily sums, which have no per-slot timestamps to check. Nothing
+is estimated there either.
+"""
+import argparse
+import os
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from typing import Optional
+
+from sqlalchemy import DateTime, Float, func, or_, select
+from sqlalchemy.orm import Session
+
+from greenvolt_api.database import SessionLocal
+from greenvolt_api.ingest import upsert
+from greenvolt_api.late_data import late_windows, mark_late
+from greenvolt_api.models import SmartMeter, SmartMeterReading
+from greenvolt_api.retention import raw_horizon
+from greenvolt_api.versions import bump_versions, meter_scope, user_scope
+
+INTERVAL_MINUTES = float(os.getenv("GREENVOLT_READING_INTERVAL_MINUTES", "15"))
+MAX_FILL_INTERVALS = int(os.getenv("GREENVOLT_GAP_MAX_FILL_INTERVALS", "8"))
+# Spacing beyond this many intervals counts as a gap; absorbs clock jitter
+GAP_TOLERANCE = 1.5
+
+
+@dataclass
+class Gap:
+    after: Optional[datetime]   # last reading before the gap; None when the range starts with it
+    before: Optional[datetime]  # first reading after the gap; None when the range ends with it
+    missing: int                # expected readings that are absent
+    after_kwh: Optional[float] = None
+    before_kwh: Optional[float] = None
+
+    def to_dict(self) -> dict:
+        return {"after": self.after, "before": self.before, "missing": self.missing}
+
+
+def _seconds_between(earlier, later, dialect: str):
+    if dialect == "sqlite":
+        return (func.julianday(later) - func.julianday(earlier)) * 86400.0
+    return func.extract("epoch", later - earlier)
+
+
+def find_gaps(db: Session, meter_ids: list[int], start: datetime, end: datetime,
+              interval: timedelta = timedelta(minutes=INTERVAL_MINUTES),
+              now: Optional[datetime] = None) -> dict[int, dict]:
+    """Completeness report per meter for readings in [start, end); compacted slots are counted apart."""
+    compacted = 0
+    horizon = raw_horizon(now)
+    if start < horizon:
+        compacted = int((min(end, horizon) - start) / interval)
+        start = max(start, min(end, horizon))
+    R = SmartMeterReading
+    window = {"partition_by": R.meter_id, "order_by": R.timestamp}
+    inner = select(
+        R.meter_id,
+        R.timestamp,
+        R.energy_kwh,
+        func.lag(R.timestamp, type_=DateTime).over(**window).label("prev_ts"),
+        func.lag(R.energy_kwh, type_=Float).over(**window).label("prev_kwh"),
+        func.lead(R.timestamp, type_=DateTime).over(**window).label("next_ts"),
+        func.count().over(partition_by=R.meter_id).label("n"),
+    ).where(R.meter_id.in_(meter_ids), R.timestamp >= start, R.timestamp < end).subquery()
+    spacing = _seconds_between(inner.c.prev_ts, inner.c.timestamp, db.get_bind().dialect.name)
+    rows = db.execute(select(inner).where(or_(
+        inner.c.prev_ts.is_(None),
+        inner.c.next_ts.is_(None),
+        spacing > interval.total_seconds() * GAP_TOLERANCE
+    )).order_by(inner.c.meter_id, inner.c.timestamp)).all()
+
+    expected = int((end - start) / interval)
+    reports = {m: {"meter_id": m, "expected": expected, "present": 0, "missing": expected, "completeness": 0.0,
+                   "compacted": compacted, "gaps": [Gap(None, None, expected)] if expected else []}
+               for m in meter_ids}
+    for row in rows:
+        report = reports[row.meter_id]
+        if row.prev_ts is None:
+            report["present"] = row.n
+            report["gaps"] = []
+            leading = round((row.timestamp - start) / interval)
+            if leading:
+                report["gaps"].append(Gap(None, row.timestamp, leading))
+        else:
+            missing = round((row.timestamp - row.prev_ts) / interval) - 1
+            if missing > 0:
+                report["gaps"].append(Gap(row.prev_ts, row.timestamp, missing, row.prev_kwh, row.energy_kwh))
+        if row.next_ts is None:
+            trailing = round((end - row.timestamp) / interval) - 1
+            if trailing > 0:
+                report["gaps"].append(Gap(row.timestamp, None, trailing))
+
+    for report in reports.values():
+        report["missing"] = sum(g.missing for g in report["gaps"])
+        report["completeness"] = round(min(1.0, report["present"] / expected), 4) if expected else 1.0
+    return reports
+
+
+def estimate(gap: Gap) -> list[dict]:
+    """Evenly spaced readings inside an interior gap, interpolated between its neighbours."""
+    step = (gap.before - gap.after) / (gap.missing + 1)
+    return [
+        {"timestamp": gap.after + step * k,
+         "energy_kwh": round(gap.after_kwh + (gap.before_kwh - gap.after_kwh) * k / (gap.missing + 1), 6),
+         "is_estimated": True}
+        for k in range(1, gap.missing + 1)
+    ]
+
+
+def fill_gaps(db: Session, reports: dict[int, dict], max_fill: int = MAX_FILL_INTERVALS) -> int:
+    """Insert estimates for interior gaps no longer than ``max_fill`` slots; the caller commits."""
+    rows = [
+        {"meter_id": meter_id, **estimated}
+        for meter_id, report in reports.items()
+        for gap in report["gaps"]
+        if gap.after is not None and gap.before is not None and gap.missing <= max_fill
+        for estimated in estimate(gap)
+    ]
+    horizon = raw_horizon()
+    rows = [r for r in rows if r["timestamp"] >= horizon]  # never into hours retention may have folded
+    if not rows:
+        return 0
+    # "ignore": a slot that meanwhile got a real reading keeps it
+    db.execute(upsert(db.get_bind().dialect.name, SmartMeterReading, policy="ignore"), rows)
+    meter_ids = {r["meter_id"] for r in rows}
+    owners = dict(db.query(SmartMeter.id, SmartMeter.user_id).filter(SmartMeter.id.in_(meter_ids)))
+    mark_late(db, late_windows((r["meter_id"], r["timestamp"]) for r in rows), owners)
+    bump_versions(db, *(user_scope(u) for u in set(owners.values()) if u is not None),
+                  *(meter_scope(m) for m in meter_ids))
+    return len(rows)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Report (and optionally fill) missing readings across the fleet.")
+    parser.add_argument("--start", type=datetime.fromisoformat, required=True)
+    parser.add_argument("--end", type=datetime.fromisoformat, required=True, help="Exclusive")
+    parser.add_argument("--interval-minutes", type=float, default=INTERVAL_MINUTES)
+    parser.add_argument("--meters-per-chunk", type=int, default=500)
+    parser.add_argument("--min-completeness", type=float, default=1.0, help="List meters below this ratio")
+    parser.add_argument("--fill", action="store_true", help="Insert interpolated estimates for short gaps")
+    parser.add_argument("--max-fill", type=int, default=MAX_FILL_INTERVALS, help="Longest gap to fill, in slots")
+    args = parser.parse_args(argv)
+
+    interval = timedelta(minutes=args.interval_minutes)
+    db = SessionLocal()
+    try:
+        meter_ids = [m for (m,) in db.query(SmartMeter.id).order_by(SmartMeter.id)]
+        meters = expected = present = filled = 0
+        for i in range(0, len(meter_ids), args.meters_per_chunk):
+            reports = find_gaps(db, meter_ids[i:i + args.meters_per_chunk], args.start, args.end, interval)
+            for report in reports.values():
+                meters += 1
+                expected += report["expected"]
+                present += min(report["present"], report["expected"])
+                if report["completeness"] < args.min_completeness:
+                    print(f"meter {report['meter_id']}: {report['completeness']:.2%} complete, "
+                          f"{report['missing']} missing in {len(report['gaps'])} gaps")
+            if args.fill:
+                filled += fill_gaps(db, reports, args.max_fill)
+            db.commit()  # one short transaction per chunk
+    finally:
+        db.close()
+
+    ratio = present / expected if expected else 1.0
+    print(f"{meters} meters, fleet completeness {ratio:.2%}" + (f", {filled} readings estimated" if args.fill else ""))
+
+
+if __name__ == "__main__":
+    main()
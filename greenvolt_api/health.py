@@ -0,0 +1,104 @@
+import os
+import threading
+import time
+from dataclasses import dataclass
+from typing import Callable
+
+from sqlalchemy import text
+from sqlalchemy.pool import QueuePool
+
+from greenvolt_api.cache import KeyValueCache, hit_ratio, result_cache
+from greenvolt_api.database import engine
+from greenvolt_api.hot_cache import day_prices, is_warm, meter_owners
+
+# Readiness fails once this share of the pool's connections (size + overflow) is checked out
+POOL_SATURATION_LIMIT = float(os.getenv("GREENVOLT_POOL_SATURATION_LIMIT", "0.9"))
+
+
+@dataclass
+class Probe:
+    name: str
+    check: Callable[[], dict]  # returns details; "ok": False marks the probe as failing
+    critical: bool = True      # non-critical failures are reported but keep the instance ready
+
+
+_probes: dict[str, Probe] = {}
+_draining = threading.Event()
+
+
+def register_probe(name: str, check: Callable[[], dict], critical: bool = True) -> None:
+    """Add a readiness check; subsystems call this when they start (e.g. the ingest buffer)."""
+    _probes[name] = Probe(name, check, critical)
+
+
+def unregister_probe(name: str) -> None:
+    _probes.pop(name, None)
+
+
+def start_draining() -> None:
+    """Report not-ready from now on, so load balancers stop routing here before shutdown."""
+    _draining.set()
+
+
+def readiness() -> tuple[bool, dict]:
+    ready = not _draining.is_set()
+    checks = {}
+    for probe in list(_probes.values()):
+        start = time.perf_counter()
+        try:
+            result = probe.check()
+        except Exception as e:
+            result = {"ok": False, "error": f"{type(e).__name__}: {e}"}
+        result.setdefault("ok", True)
+        result["critical"] = probe.critical
+        result["check_ms"] = round((time.perf_counter() - start) * 1000, 2)
+        checks[probe.name] = result
+        if probe.critical and not result["ok"]:
+            ready = False
+    return ready, {"status": "ready" if ready else "unavailable", "draining": _draining.is_set(), "checks": checks}
+
+
+def pool_state() -> dict:
+    pool = engine.pool
+    if not isinstance(pool, QueuePool):
+        return {"ok": True, "pool": type(pool).__name__}
+    checked_out = pool.checkedout()
+    max_overflow = pool._max_overflow
+    capacity = pool.size() + max_overflow if max_overflow >= 0 else None
+    saturation = checked_out / capacity if capacity else 0.0
+    return {
+        "ok": saturation < POOL_SATURATION_LIMIT,
+        "checked_out": checked_out,
+        "capacity": capacity,
+        "saturation": round(saturation, 3),
+        "limit": POOL_SATURATION_LIMIT
+    }
+
+
+def check_database() -> dict:
+    # An exhausted pool would block the probe for the full checkout timeout
+    pool = pool_state()
+    if not pool["ok"]:
+        return {"ok": False, "error": "connection pool saturated"}
+    start = time.perf_counter()
+    with engine.connect() as conn:
+        conn.execute(text("SELECT 1"))
+    return {"ok": True, "latency_ms": round((time.perf_counter() - start) * 1000, 2)}
+
+
+def check_warm_caches() -> dict:
+    return {"ok": is_warm(), "meters": len(meter_owners), "price_day": str(day_prices.day)}
+
+
+def check_result_cache() -> dict:
+    backend = result_cache.backend
+    state = {"backend": type(backend).__name__, "hit_ratio": round(hit_ratio(), 3)}
+    if isinstance(backend, KeyValueCache) and hasattr(backend.client, "ping"):
+        backend.client.ping()
+    return state
+
+
+register_probe("database", check_database)
+register_probe("pool", pool_state)
+register_probe("warm_caches", check_warm_caches)
+register_probe("result_cache", check_result_cache, critical=False)
@@ -0,0 +1,144 @@
+import logging
+import os
+import threading
+import time
+from datetime import date, datetime, timedelta
+from typing import Optional
+
+from sqlalchemy.orm import Session
+
+from greenvolt_api import jwt
+from greenvolt_api.billing import hour_floor, load_rates
+from greenvolt_api.database import SessionLocal
+from greenvolt_api.models import SmartMeter
+from greenvolt_api.versions import METERS_SCOPE, PRICING_SCOPE, get_versions
+
+logger = logging.getLogger("greenvolt.startup")
+
+OWNER_MAP_REVALIDATE_SECONDS = float(os.getenv("GREENVOLT_OWNER_MAP_REVALIDATE_SECONDS", "1"))
+
+# Per-process caches preloaded by warmup() before the worker takes traffic.
+
+
+class MeterOwners:
+    """meter_id -> user_id. Meters created by another worker are picked up on the first miss.
+    Ownership changes only when a meter is deleted or its user is (the meter is left unassigned);
+    both bump METERS_SCOPE, which every worker checks at most once per OWNER_MAP_REVALIDATE_SECONDS
+    and then drops its map."""
+
+    def __init__(self):
+        self._owners: dict[int, int] = {}
+        self._version: Optional[int] = None
+        self._checked = 0.0
+        self._lock = threading.Lock()
+
+    def load(self, db: Session) -> int:
+        version = get_versions(db, METERS_SCOPE)[0]
+        owners = dict(db.query(SmartMeter.id, SmartMeter.user_id).all())
+        with self._lock:
+            self._owners, self._version, self._checked = owners, version, time.monotonic()
+        return len(owners)
+
+    def _revalidate(self, db: Session) -> None:
+        now = time.monotonic()
+        if now - self._checked < OWNER_MAP_REVALIDATE_SECONDS:
+            return
+        version = get_versions(db, METERS_SCOPE)[0]
+        with self._lock:
+            if version != self._version:
+                self._owners = {}
+            self._version, self._checked = version, now
+
+    def owner(self, db: Session, meter_id: int) -> Optional[int]:
+        """Owning user id, or None if the meter doesn't exist."""
+        self._revalidate(db)
+        user_id = self._owners.get(meter_id)
+        if user_id is None:
+            row = db.query(SmartMeter.user_id).filter(SmartMeter.id == meter_id).first()
+            if row is None:
+                return None
+            user_id = row[0]
+            self.add(meter_id, user_id)
+        return user_id
+
+    def owners_of(self, db: Session, meter_ids) -> dict[int, int]:
+        """{meter_id: user_id} for the meters that exist; misses are fetched in one query."""
+        self._revalidate(db)
+        owners = self._owners
+        result = {m: owners[m] for m in set(meter_ids) if m in owners}
+        missing = [m for m in set(meter_ids) if m not in result]
+        if missing:
+            found = dict(db.query(SmartMeter.id, SmartMeter.user_id).filter(SmartMeter.id.in_(missing)).all())
+            with self._lock:
+                self._owners.update(found)
+            result.update(found)
+        return result
+
+    def add(self, meter_id: int, user_id: int) -> None:
+        with self._lock:
+            self._owners[meter_id] = user_id
+
+    def discard(self, meter_id: int) -> None:
+        with self._lock:
+            self._owners.pop(meter_id, None)
+
+    def __len__(self) -> int:
+        return len(self._owners)
+
+
+class DayPrices:
+    """Hourly prices for the current UTC day, revalidated against the pricing data version."""
+
+    def __init__(self):
+        self._day: Optional[date] = None
+        self._version: Optional[int] = None
+        self._rates: dict[datetime, float] = {}
+        self._lock = threading.Lock()
+
+    @property
+    def day(self) -> Optional[date]:
+        return self._day
+
+    def load(self, db: Session, day: Optional[date] = None) -> int:
+        day = day or datetime.utcnow().date()
+        version = get_versions(db, PRICING_SCOPE)[0]
+        start = datetime.combine(day, datetime.min.time())
+        rates = load_rates(db, start, start + timedelta(days=1) - timedelta(microseconds=1))
+        with self._lock:
+            self._day, self._version, self._rates = day, version, rates
+        return len(rates)
+
+    def rates(self, db: Session, start: datetime, end: datetime) -> dict[datetime, float]:
+        """{hour -> price} covering [start, end); served from memory when the range is within today."""
+        today = datetime.utcnow().date()
+        if start.date() == today and end <= datetime.combine(today, datetime.min.time()) + timedelta(days=1):
+            version = get_versions(db, PRICING_SCOPE)[0]
+            if self._day != today or self._version != version:
+                self.load(db, today)
+            return self._rates
+        return load_rates(db, hour_floor(start), end)
+
+
+meter_owners = MeterOwners()
+day_prices = DayPrices()
+
+_warm = threading.Event()
+
+
+def is_warm() -> bool:
+    return _warm.is_set()
+
+
+def warmup(session_factory=SessionLocal) -> dict:
+    """Fill the hot caches and load the auth libraries that importing the app leaves for later."""
+    start = time.perf_counter()
+    jwt.preload()
+    db = session_factory()
+    try:
+        stats = {"meters": meter_owners.load(db), "price_hours": day_prices.load(db)}
+    finally:
+        db.close()
+    stats["seconds"] = round(time.perf_counter() - start, 3)
+    _warm.set()
+    logger.info("Warmup done: %s", stats)
+    return stats
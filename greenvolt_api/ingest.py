@@ -0,0 +1,56 @@
+import os
+
+from sqlalchemy import insert
+
+from greenvolt_api.models import Consumption, DirtyWindow, MeterRegisterReading, SmartMeterReading
+
+# What a replayed (meter, timestamp) does: "ignore" keeps the stored row, "overwrite" replaces its values
+DUPLICATE_POLICY = os.getenv("GREENVOLT_DUPLICATE_POLICY", "ignore")
+if DUPLICATE_POLICY not in ("ignore", "overwrite"):
+    raise ValueError(f"GREENVOLT_DUPLICATE_POLICY must be ignore or overwrite, not {DUPLICATE_POLICY!r}")
+
+# Natural key of each de-duplicated table, backed by a unique index
+NATURAL_KEYS = {
+    SmartMeterReading: ("meter_id", "timestamp"),
+    Consumption: ("smart_meter_id", "timestamp"),
+    MeterRegisterReading: ("meter_id", "timestamp"),
+    DirtyWindow: ("meter_id", "hour"),
+}
+
+
+def upsert(dialect: str, model, policy: str = DUPLICATE_POLICY):
+    """INSERT that applies the duplicate policy on a natural-key conflict.
+
+    Dialects without ON CONFLICT get a plain INSERT, and the unique index rejects duplicates.
+    """
+    if dialect == "postgresql":
+        from sqlalchemy.dialects.postgresql import insert as dialect_insert
+    elif dialect == "sqlite":
+        from sqlalchemy.dialects.sqlite import insert as dialect_insert
+    else:
+        return insert(model)
+
+    keys = NATURAL_KEYS[model]
+    stmt = dialect_insert(model)
+    values = [c.name for c in model.__table__.columns if not c.primary_key and c.name not in keys]
+    if policy == "overwrite":
+        return stmt.on_conflict_do_update(index_elements=list(keys), set_={c: stmt.excluded[c] for c in values})
+    if "is_estimated" in model.__table__.c:
+        # An estimated gap fill always gives way to the real reading, even under "ignore"
+        return stmt.on_conflict_do_update(index_elements=list(keys), set_={c: stmt.excluded[c] for c in values},
+                                          where=model.__table__.c.is_estimated)
+    return stmt.on_conflict_do_nothing(index_elements=list(keys))
+
+
+def unique_rows(model, rows: list[dict], policy: str = DUPLICATE_POLICY) -> list[dict]:
+    """Collapse rows sharing a natural key within one batch (first or last wins, per policy).
+
+    Postgres refuses to touch the same row twice in one ON CONFLICT DO UPDATE statement.
+    """
+    keys = NATURAL_KEYS[model]
+    by_key = {}
+    for row in rows:
+        key = tuple(row[k] for k in keys)
+        if policy == "overwrite" or key not in by_key:
+            by_key[key] = row
+    return list(by_key.values())
@@ -0,0 +1,247 @@
+"""Optional write-behind buffer for single-row ingest (GREENVOLT_INGEST_BUFFER=1).
+
+Durability: a 202 from a buffered endpoint means the row passed validation and is queued in
+this worker's memory; it is committed within GREENVOLT_INGEST_FLUSH_MS (or as soon as
+GREENVOLT_INGEST_FLUSH_ROWS rows are queued). Rows still queued when the process is killed
+without a graceful shutdown are lost, so meters must be able to resend recent readings. A
+graceful shutdown stops accepting and flushes everything that was accepted. When the queue is
+full the endpoints answer 503 with Retry-After instead of blocking.
+
+A batch that fails on its data (integrity or data errors, values the driver cannot bind) is split
+in halves until the offending rows are isolated; those are dead-lettered (logged, counted, and
+appended to GREENVOLT_INGEST_DEAD_LETTER_FILE when set) and the rest is committed. Only other
+errors, such as a lost connection, put the batch back at the head of the queue for a retry.
+"""
+import json
+import logging
+import os
+import threading
+import time
+from collections import deque
+from typing import Optional
+
+from fastapi import HTTPException
+from sqlalchemy import insert
+from sqlalchemy.exc import DataError, DBAPIError, IntegrityError, StatementError
+
+from greenvolt_api.database import SessionLocal
+from greenvolt_api.health import register_probe
+from greenvolt_api.ingest import NATURAL_KEYS, unique_rows, upsert
+from greenvolt_api.late_data import late_windows, mark_late
+from greenvolt_api.metrics import INGEST_ROWS, callback, counter, histogram
+from greenvolt_api.models import Consumption, SmartMeterData, SmartMeterReading
+from greenvolt_api.responses import FastJSONResponse
+from greenvolt_api.retention import check_raw_horizon
+from greenvolt_api.versions import bump_versions
+
+logger = logging.getLogger("greenvolt.ingest_buffer")
+
+ENABLED = os.getenv("GREENVOLT_INGEST_BUFFER") == "1"
+MAX_ROWS = int(os.getenv("GREENVOLT_INGEST_BUFFER_SIZE", "20000"))
+FLUSH_ROWS = int(os.getenv("GREENVOLT_INGEST_FLUSH_ROWS", "500"))
+FLUSH_MS = float(os.getenv("GREENVOLT_INGEST_FLUSH_MS", "200"))
+RETRY_AFTER_SECONDS = os.getenv("GREENVOLT_INGEST_RETRY_AFTER", "1")
+DEAD_LETTER_FILE = os.getenv("GREENVOLT_INGEST_DEAD_LETTER_FILE")
+
+MODELS = {"reading": SmartMeterReading, "consumption": Consumption, "meter_data": SmartMeterData}
+
+FLUSH_SECONDS = histogram("greenvolt_ingest_flush_seconds", "Time to commit one buffered batch.")
+FLUSH_ROWS_TOTAL = counter("greenvolt_ingest_buffer_flushed_rows_total", "Buffered rows committed.", ("kind",))
+REJECTED = counter("greenvolt_ingest_buffer_rejected_total", "Rows refused because the buffer was full.", ("kind",))
+DEAD_LETTERED = counter("greenvolt_ingest_buffer_dead_letter_total", "Buffered rows dropped because they cannot be written.", ("kind",))
+
+
+def is_permanent(error: Exception) -> bool:
+    """True when retrying the same rows can only fail again."""
+    if isinstance(error, (IntegrityError, DataError, TypeError, ValueError)):
+        return True
+    # Bind-parameter processing failures arrive wrapped, with the TypeError/ValueError as .orig
+    return isinstance(error, StatementError) and not isinstance(error, DBAPIError) \
+        and isinstance(error.orig, (TypeError, ValueError))
+
+
+class IngestBuffer:
+    def __init__(self, max_rows: int = MAX_ROWS, flush_rows: int = FLUSH_ROWS, flush_ms: float = FLUSH_MS,
+                 session_factory=SessionLocal):
+        self.max_rows = max_rows
+        self.flush_rows = flush_rows
+        self.flush_interval = flush_ms / 1000
+        self.session_factory = session_factory
+        self._queue: deque = deque()  # (kind, row, scopes)
+        self._cond = threading.Condition()
+        self._thread: Optional[threading.Thread] = None
+        self._accepting = False
+        self._stopping = False
+        self.flushed = 0
+        self.dead_lettered = 0
+        self.last_error: Optional[str] = None
+
+    @property
+    def running(self) -> bool:
+        return self._accepting
+
+    def start(self) -> None:
+        with self._cond:
+            self._accepting, self._stopping = True, False
+        self._thread = threading.Thread(target=self._run, name="ingest-buffer-flusher", daemon=True)
+        self._thread.start()
+
+    def offer(self, kind: str, row: dict, scopes: tuple) -> bool:
+        """Queue a validated row; False when the buffer is full or not accepting."""
+        with self._cond:
+            if not self._accepting or len(self._queue) >= self.max_rows:
+                REJECTED.inc((kind,))
+                return False
+            self._queue.append((kind, row, scopes))
+            if len(self._queue) >= self.flush_rows:
+                self._cond.notify()
+            return True
+
+    def close(self, timeout: float = 30.0) -> None:
+        """Stop accepting and flush everything already accepted."""
+        with self._cond:
+            self._accepting = False
+            self._stopping = True
+            self._cond.notify()
+        if self._thread is not None:
+            self._thread.join(timeout)
+            if self._thread.is_alive():
+                logger.error("Ingest buffer did not drain within %.0fs; %d rows lost", timeout, len(self._queue))
+
+    def _run(self) -> None:
+        backoff = self.flush_interval
+        while True:
+            with self._cond:
+                if len(self._queue) < self.flush_rows and not self._stopping:
+                    self._cond.wait(self.flush_interval)
+                if not self._queue:
+                    if self._stopping:
+                        return
+                    continue
+                batch = [self._queue.popleft() for _ in range(min(self.flush_rows, len(self._queue)))]
+            retry, error = self._flush_isolating(batch)
+            if error is None:
+                backoff = self.flush_interval
+                continue
+            # Keep what is left at the head, in order; the bounded queue turns a long outage into 503s
+            self.last_error = f"{type(error).__name__}: {error}"
+            logger.error("Ingest buffer flush of %d rows failed; retrying", len(retry), exc_info=error)
+            with self._cond:
+                self._queue.extendleft(reversed(retry))
+            time.sleep(backoff)
+            backoff = min(backoff * 2, 5.0)
+
+    def _flush_isolating(self, batch: list) -> tuple[list, Optional[Exception]]:
+        """Commit ``batch``, halving around rows that fail permanently and dead-lettering those.
+
+        Returns the rows not yet committed and the error when a transient failure stopped it.
+        """
+        pending = [batch]  # stack; the top is the earliest part
+        while pending:
+            part = pending.pop()
+            try:
+                self._flush(part)
+            except Exception as e:
+                if not is_permanent(e):
+                    return part + [item for rest in reversed(pending) for item in rest], e
+                if len(part) == 1:
+                    self._dead_letter(part[0], e)
+                else:
+                    middle = len(part) // 2
+                    pending.extend((part[middle:], part[:middle]))
+        return [], None
+
+    def _dead_letter(self, item: tuple, error: Exception) -> None:
+        kind, row, _ = item
+        self.dead_lettered += 1
+        self.last_error = f"{type(error).__name__}: {error}"
+        DEAD_LETTERED.inc((kind,))
+        record = json.dumps({"kind": kind, "row": row, "error": self.last_error}, default=str)
+        logger.error("Dead-lettered buffered row: %s", record)
+        if DEAD_LETTER_FILE:
+            with open(DEAD_LETTER_FILE, "a") as f:
+                f.write(record + "\n")
+
+    def _flush(self, batch: list) -> None:
+        start = time.perf_counter()
+        rows_by_kind: dict[str, list[dict]] = {}
+        scopes = set()
+        for kind, row, row_scopes in batch:
+            rows_by_kind.setdefault(kind, []).append(row)
+            scopes.update(row_scopes)
+        horizon = check_raw_horizon(row["timestamp"] for row in rows_by_kind.get("reading", ()))
+        if horizon is not None:
+            # Queued (or retried) until the horizon passed it; its hour may already be compacted
+            raise ValueError(f"Reading before {horizon} is past raw retention")
+
+        db = self.session_factory()
+        try:
+            dialect = db.get_bind().dialect.name
+            for kind, rows in rows_by_kind.items():
+                model = MODELS[kind]
+                if model in NATURAL_KEYS:
+                    # Replays (also within one batch) follow GREENVOLT_DUPLICATE_POLICY
+                    db.execute(upsert(dialect, model), unique_rows(model, rows))
+                else:
+                    db.execute(insert(model), rows)
+                if model is SmartMeterReading:
+                    mark_late(db, late_windows((r["meter_id"], r["timestamp"]) for r in rows))
+            bump_versions(db, *scopes)
+            db.commit()
+        except Exception:
+            db.rollback()
+            raise
+        finally:
+            db.close()
+
+        FLUSH_SECONDS.observe(time.perf_counter() - start)
+        for kind, rows in rows_by_kind.items():
+            FLUSH_ROWS_TOTAL.inc((kind,), len(rows))
+            INGEST_ROWS.inc((kind,), len(rows))
+        self.flushed += len(batch)
+        self.last_error = None
+
+    def depth(self) -> int:
+        return len(self._queue)
+
+    def stats(self) -> dict:
+        return {
+            "running": self.running,
+            "depth": self.depth(),
+            "capacity": self.max_rows,
+            "flushed": self.flushed,
+            "dead_lettered": self.dead_lettered,
+            "last_error": self.last_error
+        }
+
+
+ingest_buffer = IngestBuffer()
+
+
+def buffered_response(kind: str, row: dict, scopes: tuple) -> FastJSONResponse:
+    """202 once the row is queued, or 503 with Retry-After when the buffer is full."""
+    if not ingest_buffer.offer(kind, row, scopes):
+        raise HTTPException(status_code=503, detail="Ingest buffer full, retry later",
+                            headers={"Retry-After": RETRY_AFTER_SECONDS})
+    return FastJSONResponse({"status": "accepted", **row}, status_code=202)
+
+
+def check_ingest_buffer() -> dict:
+    state = ingest_buffer.stats()
+    # Stop routing ingest here before the buffer overflows into 503s
+    state["ok"] = not state["running"] or state["depth"] < 0.9 * state["capacity"]
+    return state
+
+
+def start_ingest_buffer() -> None:
+    if ENABLED:
+        ingest_buffer.start()
+        register_probe("ingest_buffer", check_ingest_buffer)
+
+
+def stop_ingest_buffer() -> None:
+    if ingest_buffer.running:
+        ingest_buffer.close()
+
+
+callback("greenvolt_ingest_buffer_depth", "Rows accepted but not yet committed.", ingest_buffer.depth)
@@ -0,0 +1,161 @@
+import logging
+import os
+import time
+from collections import Counter
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Callable, Optional
+
+from sqlalchemy import event
+from starlette.datastructures import MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from greenvolt_api.metrics import counter
+
+logger = logging.getLogger("greenvolt.db")
+
+DEBUG = os.getenv("GREENVOLT_DEBUG", "0") == "1"
+# The same statement this many times in one request is reported as a likely N+1
+N_PLUS_ONE_THRESHOLD = int(os.getenv("GREENVOLT_N_PLUS_ONE_THRESHOLD", "10"))
+
+
+class QueryStats:
+    """Queries executed while handling one request."""
+
+    def __init__(self, method: str = "", path: str = "", scope: Optional[Scope] = None):
+        self.method = method
+        self.path = path
+        self.scope = scope
+        self.count = 0
+        self.total_time = 0.0
+        self.slowest_time = 0.0
+        self.slowest_statement = None
+        self.statements = Counter()
+        self.statement_time = Counter()
+
+    def record(self, statement: str, elapsed: float) -> None:
+        self.count += 1
+        self.total_time += elapsed
+        self.statements[statement] += 1
+        self.statement_time[statement] += elapsed
+        if elapsed > self.slowest_time:
+            self.slowest_time = elapsed
+            self.slowest_statement = statement
+
+    @property
+    def route(self) -> str:
+        """Route template once routing has matched, else the raw path."""
+        route = self.scope.get("route") if self.scope else None
+        return getattr(route, "path", self.path)
+
+    def repeated_statements(self, threshold: int = N_PLUS_ONE_THRESHOLD) -> list[tuple[str, int]]:
+        return [(s, n) for s, n in self.statements.most_common() if n >= threshold]
+
+
+current_stats: ContextVar[Optional[QueryStats]] = ContextVar("current_query_stats", default=None)
+
+DB_QUERIES = counter("greenvolt_db_queries_total", "SQL statements executed.")
+DB_QUERY_SECONDS = counter("greenvolt_db_query_seconds_total", "Time spent executing SQL statements.")
+N_PLUS_ONE_REQUESTS = counter("greenvolt_db_n_plus_one_requests_total", "Requests that repeated one statement past the N+1 threshold.")
+
+_request_listeners: list[Callable[[QueryStats], None]] = []
+# Called as listener(conn, cursor, statement, parameters, executemany, elapsed) after every statement
+_query_listeners: list[Callable] = []
+
+
+def add_request_listener(listener: Callable[[QueryStats], None]) -> None:
+    _request_listeners.append(listener)
+
+
+def remove_request_listener(listener: Callable[[QueryStats], None]) -> None:
+    _request_listeners.remove(listener)
+
+
+def add_query_listener(listener: Callable) -> None:
+    _query_listeners.append(listener)
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault("query_start_time", []).append(time.perf_counter())
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    elapsed = time.perf_counter() - conn.info["query_start_time"].pop()
+    DB_QUERIES.inc()
+    DB_QUERY_SECONDS.inc(amount=elapsed)
+    stats = current_stats.get()
+    if stats is not None:
+        stats.record(statement, elapsed)
+    for listener in _query_listeners:
+        listener(conn, cursor, statement, parameters, executemany, elapsed)
+
+
+def install_query_instrumentation(engine) -> None:
+    event.listen(engine, "before_cursor_execute", _before_cursor_execute)
+    event.listen(engine, "after_cursor_execute", _after_cursor_execute)
+
+
+def _finish_request(stats: QueryStats) -> None:
+    repeated = stats.repeated_statements()
+    if repeated:
+        N_PLUS_ONE_REQUESTS.inc()
+        statement, times = repeated[0]
+        logger.warning("Possible N+1 in %s %s: %d queries, statement run %d times: %s",
+                       stats.method, stats.path, stats.count, times, statement)
+    for listener in list(_request_listeners):
+        listener(stats)
+
+
+class QueryCountMiddleware:
+    """Tracks query count, DB time and the slowest statement per request.
+
+    With GREENVOLT_DEBUG=1 the numbers are also returned as X-DB-* response headers.
+    """
+
+    def __init__(self, app: ASGIApp, debug: bool = DEBUG):
+        self.app = app
+        self.debug = debug
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        stats = QueryStats(scope["method"], scope["path"], scope)
+        token = current_stats.set(stats)
+
+        async def send_wrapper(message: Message) -> None:
+            if message["type"] == "http.response.start" and self.debug:
+                headers = MutableHeaders(scope=message)
+                headers["X-DB-Query-Count"] = str(stats.count)
+                headers["X-DB-Time-Ms"] = f"{stats.total_time * 1000:.2f}"
+                headers["X-DB-Slowest-Ms"] = f"{stats.slowest_time * 1000:.2f}"
+                if stats.repeated_statements():
+                    headers["X-DB-N-Plus-One"] = "1"
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            current_stats.reset(token)
+            _finish_request(stats)
+
+
+@contextmanager
+def assert_max_queries(limit: int):
+    """Fail if any request handled inside the block runs more than ``limit`` queries."""
+    seen: list[QueryStats] = []
+    listener = seen.append
+    add_request_listener(listener)
+    try:
+        yield seen
+    finally:
+        remove_request_listener(listener)
+
+    over = [s for s in seen if s.count > limit]
+    if over:
+        lines = []
+        for s in over:
+            lines.append(f"{s.method} {s.path}: {s.count} queries (budget {limit})")
+            lines.extend(f"    {n}x {statement}" for statement, n in s.statements.most_common(5))
+        raise AssertionError("Query budget exceeded:\n" + "\n".join(lines))
@@ -0,0 +1,258 @@
+"""Late readings: keep persisted invoices right when readings arrive after their hour has passed.
+
+Ingest records every late (meter, hour) in ``dirty_windows`` and flags the invoices covering it as
+stale, in the same transaction as the readings. A stale invoice is never served: the bill is
+computed live until the correction pass has re-priced just the dirty hours of that invoice,
+refreshed its totals and cleared the flag.
+
+    python -m greenvolt_api.late_data           # drain the backlog once
+    python -m greenvolt_api.late_data --loop    # keep correcting every GREENVOLT_LATE_DATA_INTERVAL seconds
+
+The API also runs the pass in a background thread unless GREENVOLT_LATE_DATA_INTERVAL is 0.
+"""
+import argparse
+import logging
+import os
+import threading
+import time
+from collections import defaultdict
+from datetime import datetime, timedelta
+from typing import Iterable, Optional
+
+from sqlalchemy import and_, exists, func, insert, or_, text, tuple_
+from sqlalchemy.orm import Session
+
+from greenvolt_api.billing import hour_floor, hourly_line_items, load_rates
+from greenvolt_api.database import SessionLocal
+from greenvolt_api.health import register_probe
+from greenvolt_api.hot_cache import meter_owners
+from greenvolt_api.ingest import upsert
+from greenvolt_api.metrics import counter
+from greenvolt_api.models import DirtyWindow, Invoice, InvoiceLineItem, SmartMeter
+from greenvolt_api.readings_source import load_readings
+from greenvolt_api.versions import bump_versions, user_scope
+
+logger = logging.getLogger("greenvolt.late_data")
+
+# Readings older than this when they are written count as late
+LATE_AFTER = timedelta(minutes=float(os.getenv("GREENVOLT_LATE_AFTER_MINUTES", "60")))
+INTERVAL_SECONDS = float(os.getenv("GREENVOLT_LATE_DATA_INTERVAL", "30"))
+BATCH_WINDOWS = int(os.getenv("GREENVOLT_LATE_DATA_BATCH", "1000"))
+ADVISORY_LOCK_ID = 0x6C617465  # one correction pass at a time across workers
+
+HOUR = timedelta(hours=1)
+
+LATE_WINDOWS = counter("greenvolt_late_windows_total", "Late (meter, hour) windows marked by ingest.")
+CORRECTED_WINDOWS = counter("greenvolt_late_windows_corrected_total", "Dirty windows re-priced by the correction pass.")
+
+
+def late_windows(rows: Iterable[tuple[int, datetime]], now: Optional[datetime] = None) -> set[tuple[int, datetime]]:
+    """(meter_id, hour) for every (meter_id, timestamp) older than GREENVOLT_LATE_AFTER_MINUTES."""
+    cutoff = (now or datetime.utcnow()) - LATE_AFTER
+    return {(meter_id, hour_floor(ts)) for meter_id, ts in rows if ts < cutoff}
+
+
+def mark_late(db: Session, windows: set[tuple[int, datetime]], owners: Optional[dict[int, int]] = None) -> None:
+    """Record dirty windows and flag the invoices that cover them; the caller commits."""
+    if not windows:
+        return
+    if owners is None:
+        owners = meter_owners.owners_of(db, {meter_id for meter_id, _ in windows})
+
+    now = datetime.utcnow()
+    db.execute(upsert(db.get_bind().dialect.name, DirtyWindow, policy="overwrite"),
+               [{"meter_id": meter_id, "hour": hour, "marked_at": now} for meter_id, hour in windows])
+
+    # One hour range per user; an extra invoice flagged inside the range is just a no-op for the pass
+    ranges = {}
+    for meter_id, hour in windows:
+        user_id = owners.get(meter_id)
+        if user_id is not None:
+            lo, hi = ranges.get(user_id, (hour, hour))
+            ranges[user_id] = (min(lo, hour), max(hi, hour))
+    if ranges:
+        db.query(Invoice).filter(or_(*(
+            and_(Invoice.user_id == user_id, Invoice.period_start <= hi, Invoice.period_end >= lo)
+            for user_id, (lo, hi) in ranges.items()
+        ))).update({Invoice.stale: True}, synchronize_session=False)
+    LATE_WINDOWS.inc((), len(windows))
+
+
+def _try_lock(db: Session) -> bool:
+    if db.get_bind().dialect.name != "postgresql":
+        return True  # SQLite has one writer anyway
+    return db.execute(text("SELECT pg_try_advisory_xact_lock(:id)"), {"id": ADVISORY_LOCK_ID}).scalar()
+
+
+def correct_batch(db: Session, limit: int = BATCH_WINDOWS) -> dict:
+    """Re-price the oldest ``limit`` dirty windows in every invoice that covers them; the caller commits."""
+    windows = db.query(DirtyWindow.meter_id, DirtyWindow.hour, DirtyWindow.marked_at) \
+        .order_by(DirtyWindow.marked_at).limit(limit).all()
+    if not windows:
+        return {"windows": 0, "invoices": 0}
+
+    lo, hi = min(w.hour for w in windows), max(w.hour for w in windows)
+    owners = dict(db.query(SmartMeter.id, SmartMeter.user_id).filter(SmartMeter.id.in_({w.meter_id for w in windows})))
+    invoices_by_user = defaultdict(list)
+    for invoice in db.query(Invoice).filter(
+        Invoice.user_id.in_(set(owners.values())),
+        Invoice.period_start <= hi,
+        Invoice.period_end >= lo
+    ):
+        invoices_by_user[invoice.user_id].append(invoice)
+
+    # invoice -> the (meter, hour) windows it has to re-price
+    targets = defaultdict(set)
+    for w in windows:
+        for invoice in invoices_by_user.get(owners.get(w.meter_id), ()):
+            if invoice.period_start <= w.hour <= invoice.period_end:
+                targets[invoice].add((w.meter_id, w.hour))
+
+    if targets:
+        readings_by_window = defaultdict(list)
+        for row in load_readings(db, list({m for pairs in targets.values() for m, _ in pairs}), lo, hi + HOUR):
+            readings_by_window[(row.meter_id, hour_floor(row.timestamp))].append(row)
+        rates = load_rates(db, lo, hi)
+
+        line_items = []
+        for invoice, pairs in targets.items():
+            db.query(InvoiceLineItem).filter(
+                InvoiceLineItem.invoice_id == invoice.id,
+                tuple_(InvoiceLineItem.meter_id, InvoiceLineItem.timestamp).in_(pairs)
+            ).delete(synchronize_session=False)
+            rows = [r for pair in pairs for r in readings_by_window.get(pair, ())
+                    if invoice.period_start <= r.timestamp <= invoice.period_end]
+            line_items.extend({"invoice_id": invoice.id, **item} for item in hourly_line_items(rows, rates))
+        if line_items:
+            db.execute(insert(InvoiceLineItem), line_items)
+
+        totals = dict((invoice_id, (kwh, cost)) for invoice_id, kwh, cost in db.query(
+            InvoiceLineItem.invoice_id, func.sum(InvoiceLineItem.energy_kwh), func.sum(InvoiceLineItem.cost)
+        ).filter(InvoiceLineItem.invoice_id.in_([i.id for i in targets])).group_by(InvoiceLineItem.invoice_id))
+        for invoice in targets:
+            invoice.total_kwh, invoice.total_cost = totals.get(invoice.id, (0.0, 0.0))
+        db.flush()
+        bump_versions(db, *(user_scope(invoice.user_id) for invoice in targets))
+
+    # A window marked again while we worked has a newer marked_at and stays for the next batch
+    db.query(DirtyWindow).filter(
+        tuple_(DirtyWindow.meter_id, DirtyWindow.hour, DirtyWindow.marked_at).in_([tuple(w) for w in windows])
+    ).delete(synchronize_session=False)
+    _clear_stale(db)
+    CORRECTED_WINDOWS.inc((), len(windows))
+    return {"windows": len(windows), "invoices": len(targets)}
+
+
+def _clear_stale(db: Session) -> None:
+    """Un-flag stale invoices that no longer cover any dirty window."""
+    pending = exists().where(
+        DirtyWindow.meter_id == SmartMeter.id,
+        SmartMeter.user_id == Invoice.user_id,
+        DirtyWindow.hour >= Invoice.period_start,
+        DirtyWindow.hour <= Invoice.period_end
+    )
+    db.query(Invoice).filter(Invoice.stale.is_(True), ~pending).update({Invoice.stale: False}, synchronize_session=False)
+
+
+def correct_late_data(session_factory=SessionLocal, limit: int = BATCH_WINDOWS) -> dict:
+    """Drain the dirty-window backlog one batch (transaction) at a time."""
+    totals = {"windows": 0, "invoices": 0}
+    while True:
+        db = session_factory()
+        try:
+            if not _try_lock(db):
+                return totals
+            result = correct_batch(db, limit)
+            db.commit()
+        except Exception:
+            db.rollback()
+            raise
+        finally:
+            db.close()
+        for k in totals:
+            totals[k] += result[k]
+        if result["windows"] < limit:
+            return totals
+
+
+class CorrectionLoop:
+    def __init__(self, interval: float = INTERVAL_SECONDS, session_factory=SessionLocal):
+        self.interval = interval
+        self.session_factory = session_factory
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self.last_run: Optional[datetime] = None
+        self.last_error: Optional[str] = None
+
+    @property
+    def running(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self) -> None:
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="late-data-correction", daemon=True)
+        self._thread.start()
+
+    def close(self, timeout: float = 30.0) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.interval):
+            try:
+                result = correct_late_data(self.session_factory)
+                if result["windows"]:
+                    logger.info("Corrected %d late windows in %d invoices", result["windows"], result["invoices"])
+                self.last_error = None
+            except Exception as e:
+                # Stale invoices keep being billed live meanwhile; try again next interval
+                self.last_error = f"{type(e).__name__}: {e}"
+                logger.exception("Late-data correction failed")
+            self.last_run = datetime.utcnow()
+
+    def stats(self) -> dict:
+        return {"running": self.running, "interval_s": self.interval,
+                "last_run": self.last_run.isoformat() if self.last_run else None, "last_error": self.last_error}
+
+
+correction_loop = CorrectionLoop()
+
+
+def check_correction_loop() -> dict:
+    state = correction_loop.stats()
+    state["ok"] = state["running"] and state["last_error"] is None
+    return state
+
+
+def start_correction_loop() -> None:
+    if INTERVAL_SECONDS > 0:
+        correction_loop.start()
+        # Not critical: stale invoices are billed live until the pass catches up
+        register_probe("late_data", check_correction_loop, critical=False)
+
+
+def stop_correction_loop() -> None:
+    if correction_loop.running:
+        correction_loop.close()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Re-price invoices for readings that arrived late.")
+    parser.add_argument("--loop", action="store_true", help="Keep running every --interval seconds")
+    parser.add_argument("--interval", type=float, default=INTERVAL_SECONDS or 30)
+    parser.add_argument("--batch", type=int, default=BATCH_WINDOWS, help="Dirty windows per transaction")
+    args = parser.parse_args(argv)
+
+    while True:
+        t0 = time.perf_counter()
+        result = correct_late_data(limit=args.batch)
+        print(f"Corrected {result['windows']} windows in {result['invoices']} invoices "
+              f"in {time.perf_counter() - t0:.1f}s")
+        if not args.loop:
+            return
+        time.sleep(args.interval)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,27 +1,66 @@
-from fastapi import FastAPI
-from greenvolt_api.database import Base, engine
-from routers import smart_meters, consumption, ev_charging, billing, users, login, analytics, pricing
-
-
-Base.metadata.create_all(bind=engine)
+import os
+from contextlib import asynccontextmanager
 
-
-app = FastAPI(title="GreenVolt API 🌱⚡")
-print("MAIN.PY is being loaded")
+from fastapi import FastAPI
+from fastapi.responses import PlainTextResponse
+from greenvolt_api.cold_archive import check_archive
+from greenvolt_api.compression import CompressionMiddleware
+from greenvolt_api.database import engine
+from greenvolt_api.health import start_draining
+from greenvolt_api.hot_cache import warmup
+from greenvolt_api.ingest_buffer import start_ingest_buffer, stop_ingest_buffer
+from greenvolt_api.instrumentation import QueryCountMiddleware
+from greenvolt_api.late_data import start_correction_loop, stop_correction_loop
+from greenvolt_api.metrics import REGISTRY, MetricsMiddleware
+from greenvolt_api.migrate import upgrade, verify_schema
+from greenvolt_api.profiling import install_profiling
+from greenvolt_api.responses import FastJSONResponse
+from routers import smart_meters, consumption, ev_charging, billing, users, login, analytics, pricing, reading, health
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Schema changes belong to `python -m greenvolt_api.migrate`, run once before the workers start.
+    # GREENVOLT_AUTO_MIGRATE=1 applies them here instead, for single-process local runs.
+    if os.getenv("GREENVOLT_AUTO_MIGRATE") == "1":
+        upgrade(engine)
+    verify_schema(engine)
+    check_archive()
+    # Preload prices and meter ownership before uvicorn starts accepting connections
+    warmup()
+    start_ingest_buffer()
+    start_correction_loop()
+    yield
+    # Anything still probing while shutdown work runs sees not-ready
+    start_draining()
+    stop_ingest_buffer()
+    stop_correction_loop()
+
+
+app = FastAPI(title="GreenVolt API 🌱⚡", default_response_class=FastJSONResponse, lifespan=lifespan)
+app.add_middleware(QueryCountMiddleware)
+app.add_middleware(CompressionMiddleware, minimum_size=int(os.getenv("GREENVOLT_COMPRESS_MIN_BYTES", "1024")))
+app.add_middleware(MetricsMiddleware)
 
 @app.get("/")
 def read_root():
     return {"message": "Welcome to GreenVolt API"}
 
+@app.get("/metrics", include_in_schema=False)
+def metrics():
+    return PlainTextResponse(REGISTRY.render(), media_type="text/plain; version=0.0.4")
+
 app.include_router(users.router, prefix="/users", tags=["users"])
 app.include_router(login.router, prefix="/login", tags=["login"])
 app.include_router(smart_meters.router, prefix="/meters", tags=["smart meters"])
 app.include_router(consumption.router, prefix="/consumption", tags=["consumption"])
 app.include_router(pricing.router, prefix="/pricing", tags=["pricing"])
 app.include_router(ev_charging.router, prefix="/ev", tags=["EV sessions"])
-app.include_router(ev_charging.router, prefix="/readings", tags=["readings"])
+app.include_router(reading.router, prefix="/readings", tags=["readings"])
 app.include_router(billing.router, prefix="/billing", tags=["billing"])
 app.include_router(analytics.router, prefix="/analytics", tags=["analytics"])
+app.include_router(health.router, prefix="/health", tags=["health"])
+install_profiling(app)
 
 
 
@@ -0,0 +1,233 @@
+import bisect
+import threading
+import time
+import weakref
+from typing import Callable, Optional
+
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+# Metric updates go to a per-thread shard, so the hot path never takes a lock;
+# shards are only summed when /metrics is scraped. When a thread ends (the threadpool retires
+# idle workers), its shard is folded into a base shard so the list stays as long as the live threads.
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(names: tuple, values: tuple, extra: str = "") -> str:
+    parts = [f'{n}="{_escape(v)}"' for n, v in zip(names, values)]
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+
+class _ThreadToken:
+    """Lives in one thread's locals and is collected with them when the thread ends."""
+    __slots__ = ("__weakref__",)
+
+
+class _Sharded:
+    kind = "untyped"
+
+    def __init__(self, name: str, documentation: str, labelnames: tuple = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._local = threading.local()
+        self._base: dict = {}  # what threads that have ended recorded
+        self._shards: list[dict] = []
+        self._shards_lock = threading.Lock()
+
+    def _shard(self) -> dict:
+        shard = getattr(self._local, "shard", None)
+        if shard is None:
+            shard = self._local.shard = {}
+            self._local.token = token = _ThreadToken()
+            weakref.finalize(token, self._retire, shard)
+            with self._shards_lock:  # once per thread
+                self._shards.append(shard)
+        return shard
+
+    def _retire(self, shard: dict) -> None:
+        with self._shards_lock:
+            self._shards = [s for s in self._shards if s is not shard]
+            self._fold(self._base, shard)
+
+    def _fold(self, base: dict, shard: dict) -> None:
+        raise NotImplementedError
+
+    def _snapshot(self) -> list[dict]:
+        with self._shards_lock:
+            return [dict(s) for s in [self._base, *self._shards]]
+
+
+class Counter(_Sharded):
+    kind = "counter"
+
+    def inc(self, labels: tuple = (), amount: float = 1.0) -> None:
+        shard = self._shard()
+        shard[labels] = shard.get(labels, 0.0) + amount
+
+    def _fold(self, base: dict, shard: dict) -> None:
+        for labels, value in shard.items():
+            base[labels] = base.get(labels, 0.0) + value
+
+    def values(self) -> dict[tuple, float]:
+        merged = {}
+        for shard in self._snapshot():
+            self._fold(merged, shard)
+        return merged
+
+    def render(self) -> list[str]:
+        return [f"{self.name}{_format_labels(self.labelnames, l)} {v}" for l, v in sorted(self.values().items())]
+
+
+class Gauge(Counter):
+    """Up/down gauge (e.g. requests in flight); each thread's shard holds its net change."""
+    kind = "gauge"
+
+    def dec(self, labels: tuple = (), amount: float = 1.0) -> None:
+        self.inc(labels, -amount)
+
+
+class Histogram(_Sharded):
+    kind = "histogram"
+
+    def __init__(self, name: str, documentation: str, labelnames: tuple = (), buckets: tuple = DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(buckets)
+
+    def observe(self, value: float, labels: tuple = ()) -> None:
+        shard = self._shard()
+        state = shard.get(labels)
+        if state is None:
+            # per-bucket counts, then +Inf, then sum
+            state = shard[labels] = [0] * (len(self.buckets) + 1) + [0.0]
+        state[bisect.bisect_left(self.buckets, value)] += 1
+        state[-1] += value
+
+    def _fold(self, base: dict, shard: dict) -> None:
+        for labels, state in shard.items():
+            acc = base.setdefault(labels, [0] * len(state[:-1]) + [0.0])
+            for i, v in enumerate(state):
+                acc[i] += v
+
+    def render(self) -> list[str]:
+        merged = {}
+        for shard in self._snapshot():
+            self._fold(merged, shard)
+
+        lines = []
+        for labels, state in sorted(merged.items()):
+            cumulative = 0
+            for bound, count in zip(self.buckets + ("+Inf",), state[:-1]):
+                cumulative += count
+                le = f'le="{bound}"'
+                lines.append(f"{self.name}_bucket{_format_labels(self.labelnames, labels, le)} {cumulative}")
+            lines.append(f"{self.name}_sum{_format_labels(self.labelnames, labels)} {state[-1]}")
+            lines.append(f"{self.name}_count{_format_labels(self.labelnames, labels)} {cumulative}")
+        return lines
+
+
+class CallbackMetric:
+    """Value read from elsewhere at scrape time, e.g. pool occupancy or a stats() dict."""
+
+    def __init__(self, name: str, documentation: str, fn: Callable[[], dict], labelnames: tuple = (),
+                 kind: str = "gauge"):
+        self.name = name
+        self.documentation = documentation
+        self.fn = fn
+        self.labelnames = tuple(labelnames)
+        self.kind = kind
+
+    def render(self) -> list[str]:
+        values = self.fn()
+        if not isinstance(values, dict):
+            values = {(): values}
+        return [f"{self.name}{_format_labels(self.labelnames, l)} {v}" for l, v in sorted(values.items())]
+
+
+class Registry:
+    def __init__(self):
+        self._metrics = {}
+
+    def register(self, metric):
+        self._metrics[metric.name] = metric
+        return metric
+
+    def render(self) -> str:
+        lines = []
+        for metric in self._metrics.values():
+            lines.append(f"# HELP {metric.name} {metric.documentation}")
+            lines.append(f"# TYPE {metric.name} {metric.kind}")
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = Registry()
+
+
+def counter(name: str, documentation: str, labelnames: tuple = ()) -> Counter:
+    return REGISTRY.register(Counter(name, documentation, labelnames))
+
+
+def gauge(name: str, documentation: str, labelnames: tuple = ()) -> Gauge:
+    return REGISTRY.register(Gauge(name, documentation, labelnames))
+
+
+def histogram(name: str, documentation: str, labelnames: tuple = (), buckets: tuple = DEFAULT_BUCKETS) -> Histogram:
+    return REGISTRY.register(Histogram(name, documentation, labelnames, buckets))
+
+
+def callback(name: str, documentation: str, fn: Callable, labelnames: tuple = (), kind: str = "gauge") -> CallbackMetric:
+    return REGISTRY.register(CallbackMetric(name, documentation, fn, labelnames, kind))
+
+
+REQUEST_LATENCY = histogram(
+    "greenvolt_http_request_duration_seconds", "Request latency by route template.",
+    ("method", "route", "status")
+)
+REQUESTS_IN_FLIGHT = gauge("greenvolt_http_requests_in_flight", "Requests currently being handled.")
+INGEST_ROWS = counter("greenvolt_ingest_rows_total", "Rows accepted by ingest endpoints.", ("kind",))
+DB_POOL_WAIT = histogram(
+    "greenvolt_db_pool_checkout_wait_seconds", "Time spent waiting for a pooled DB connection.",
+    buckets=(0.0005, 0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1.0, 5.0, 30.0)
+)
+
+
+def route_label(scope: Scope) -> Optional[str]:
+    """Route template ("/billing/{user_id}") rather than the raw path, to keep label cardinality bounded."""
+    route = scope.get("route")
+    return getattr(route, "path", None)
+
+
+class MetricsMiddleware:
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        status = 500
+        start = time.perf_counter()
+        REQUESTS_IN_FLIGHT.inc()
+
+        async def send_wrapper(message: Message) -> None:
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            REQUESTS_IN_FLIGHT.dec()
+            REQUEST_LATENCY.observe(
+                time.perf_counter() - start,
+                (scope["method"], route_label(scope) or "unmatched", str(status))
+            )
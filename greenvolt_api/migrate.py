@@ -0,0 +1,118 @@
+"""Apply schema migrations once, before the API workers start.
+
+    python -m greenvolt_api.migrate            # upgrade to the latest version
+    python -m greenvolt_api.migrate status     # show applied and pending migrations
+    python -m greenvolt_api.migrate upgrade --to 3
+"""
+import argparse
+import contextlib
+from datetime import datetime
+from typing import Optional
+
+from sqlalchemy import Column, DateTime, Integer, MetaData, String, Table, select, text
+from sqlalchemy.engine import Engine
+
+from greenvolt_api.database import engine
+from greenvolt_api.migrations import Migration, load_migrations
+
+ADVISORY_LOCK_ID = 0x6772656E  # any constant shared by every migrate process
+
+_metadata = MetaData()
+schema_version = Table(
+    "schema_version", _metadata,
+    Column("version", Integer, primary_key=True),
+    Column("description", String, nullable=False),
+    Column("applied_at", DateTime, nullable=False),
+)
+
+
+class SchemaVersionError(RuntimeError):
+    pass
+
+
+def head_version() -> int:
+    migrations = load_migrations()
+    return migrations[-1].version if migrations else 0
+
+
+def current_version(bind: Engine = engine) -> int:
+    with bind.connect() as conn:
+        if not bind.dialect.has_table(conn, "schema_version"):
+            return 0
+        return conn.execute(select(schema_version.c.version).order_by(schema_version.c.version.desc())).scalar() or 0
+
+
+@contextlib.contextmanager
+def _migration_lock(bind: Engine):
+    """Serialise concurrent migrate runs. Postgres uses an advisory lock; SQLite has one writer anyway."""
+    if bind.dialect.name != "postgresql":
+        yield
+        return
+    with bind.connect() as conn:
+        conn.execute(text("SELECT pg_advisory_lock(:id)"), {"id": ADVISORY_LOCK_ID})
+        try:
+            yield
+        finally:
+            conn.execute(text("SELECT pg_advisory_unlock(:id)"), {"id": ADVISORY_LOCK_ID})
+
+
+def _record(conn, migration: Migration) -> None:
+    conn.execute(schema_version.insert().values(
+        version=migration.version, description=migration.description, applied_at=datetime.utcnow()
+    ))
+
+
+def upgrade(bind: Engine = engine, target: Optional[int] = None, log=print) -> list[int]:
+    """Apply pending migrations up to ``target`` (default: latest); returns the versions applied."""
+    applied = []
+    with _migration_lock(bind):
+        _metadata.create_all(bind, checkfirst=True)
+        current = current_version(bind)  # re-read under the lock
+        for migration in load_migrations():
+            if migration.version <= current or (target is not None and migration.version > target):
+                continue
+            log(f"Applying {migration.version:04d} {migration.name}: {migration.description}")
+            if migration.transactional:
+                with bind.begin() as conn:
+                    migration.upgrade(conn)
+                    _record(conn, migration)
+            else:
+                with bind.connect().execution_options(isolation_level="AUTOCOMMIT") as conn:
+                    migration.upgrade(conn)
+                with bind.begin() as conn:
+                    _record(conn, migration)
+            applied.append(migration.version)
+    return applied
+
+
+def verify_schema(bind: Engine = engine) -> int:
+    """Raise SchemaVersionError unless the database has every migration this code expects."""
+    current, head = current_version(bind), head_version()
+    if current < head:
+        raise SchemaVersionError(
+            f"Database schema is at version {current}, this build needs {head}. "
+            f"Run `python -m greenvolt_api.migrate` before starting the API."
+        )
+    return current
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Apply GreenVolt schema migrations.")
+    parser.add_argument("command", nargs="?", choices=["upgrade", "status"], default="upgrade")
+    parser.add_argument("--to", type=int, help="Stop at this version")
+    args = parser.parse_args(argv)
+
+    if args.command == "status":
+        current = current_version()
+        for migration in load_migrations():
+            state = "applied" if migration.version <= current else "pending"
+            txn = "" if migration.transactional else " (non-transactional)"
+            print(f"{migration.version:04d} {state:<8} {migration.name}{txn}: {migration.description}")
+        return
+
+    applied = upgrade(target=args.to)
+    print(f"✅ Schema at version {current_version()}" + ("" if applied else " (nothing to apply)"))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,65 @@
+"""Versioned schema migrations.
+
+Each ``mNNNN_<name>.py`` module defines ``upgrade(conn)`` and ``transactional``. Transactional
+migrations run in one transaction together with their schema_version row; non-transactional
+ones (CREATE INDEX CONCURRENTLY and friends) run on an autocommit connection and must be safe
+to re-run if they fail halfway.
+"""
+import importlib
+import pkgutil
+import re
+from dataclasses import dataclass
+from types import ModuleType
+
+from sqlalchemy import text
+
+_MODULE_NAME = re.compile(r"^m(\d{4})_(\w+)$")
+
+
+@dataclass
+class Migration:
+    version: int
+    name: str
+    module: ModuleType
+
+    @property
+    def transactional(self) -> bool:
+        return getattr(self.module, "transactional", True)
+
+    @property
+    def description(self) -> str:
+        return (self.module.__doc__ or self.name).strip().splitlines()[0]
+
+    def upgrade(self, conn) -> None:
+        self.module.upgrade(conn)
+
+
+def load_migrations() -> list[Migration]:
+    migrations = []
+    for info in pkgutil.iter_modules(__path__):
+        match = _MODULE_NAME.match(info.name)
+        if match:
+            module = importlib.import_module(f"{__name__}.{info.name}")
+            migrations.append(Migration(int(match.group(1)), match.group(2), module))
+    migrations.sort(key=lambda m: m.version)
+    versions = [m.version for m in migrations]
+    if len(set(versions)) != len(versions):
+        raise RuntimeError(f"Duplicate migration versions: {versions}")
+    return migrations
+
+
+def create_index(conn, name: str, table: str, columns: list[str], unique: bool = False) -> None:
+    """Idempotent index creation; CONCURRENTLY on Postgres (needs an autocommit connection)."""
+    columns_sql = ", ".join(columns)
+    unique_sql = "UNIQUE " if unique else ""
+    if conn.dialect.name == "postgresql":
+        # A failed concurrent build leaves an INVALID index behind that IF NOT EXISTS would skip
+        invalid = conn.execute(text(
+            "SELECT 1 FROM pg_index i JOIN pg_class c ON c.oid = i.indexrelid "
+            "WHERE c.relname = :name AND NOT i.indisvalid"
+        ), {"name": name}).first()
+        if invalid:
+            conn.execute(text(f"DROP INDEX CONCURRENTLY IF EXISTS {name}"))
+        conn.execute(text(f"CREATE {unique_sql}INDEX CONCURRENTLY IF NOT EXISTS {name} ON {table} ({columns_sql})"))
+    else:
+        conn.execute(text(f"CREATE {unique_sql}INDEX IF NOT EXISTS {name} ON {table} ({columns_sql})"))
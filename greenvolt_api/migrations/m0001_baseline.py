@@ -0,0 +1,105 @@
+"""Baseline schema: every table as create_all built it before versioned migrations.
+
+The definitions are frozen here rather than taken from models.py, so later migrations
+always start from the same schema. checkfirst lets databases created by the old
+create_all-at-import adopt version 1 without changes.
+"""
+from datetime import datetime
+
+from sqlalchemy import Column, DateTime, Float, ForeignKey, Integer, MetaData, String, Table, UniqueConstraint
+
+transactional = True
+
+metadata = MetaData()
+
+Table(
+    "users", metadata,
+    Column("id", Integer, primary_key=True, index=True),
+    Column("name", String, index=True),
+    Column("email", String, unique=True, index=True),
+    Column("password", String),
+)
+
+Table(
+    "smart_meters", metadata,
+    Column("id", Integer, primary_key=True, index=True),
+    Column("serial_number", String, unique=True, index=True),
+    Column("location", String),
+    Column("installation_date", DateTime, default=datetime.utcnow),
+    Column("user_id", Integer, ForeignKey("users.id")),
+)
+
+Table(
+    "smart_meter_readings", metadata,
+    Column("id", Integer, primary_key=True, index=True),
+    Column("meter_id", Integer, ForeignKey("smart_meters.id")),
+    Column("timestamp", DateTime),
+    Column("energy_kwh", Float),
+)
+
+Table(
+    "pricing", metadata,
+    Column("id", Integer, primary_key=True, index=True),
+    Column("date", DateTime, index=True),
+    Column("price_per_kwh", Float),
+)
+
+Table(
+    "ev_charging_sessions", metadata,
+    Column("id", Integer, primary_key=True, index=True),
+    Column("user_id", Integer, ForeignKey("users.id")),
+    Column("start_time", DateTime),
+    Column("end_time", DateTime, nullable=True),
+    Column("energy_kwh", Float, nullable=False),
+    Column("cost", Float, nullable=True),
+)
+
+Table(
+    "smart_meter_data", metadata,
+    Column("id", Integer, primary_key=True, index=True),
+    Column("user_id", Integer, ForeignKey("users.id")),
+    Column("timestamp", DateTime),
+    Column("consumption_kwh", Float),
+)
+
+Table(
+    "consumptions", metadata,
+    Column("id", Integer, primary_key=True, index=True),
+    Column("user_id", Integer, ForeignKey("users.id")),
+    Column("smart_meter_id", Integer, ForeignKey("smart_meters.id")),
+    Column("timestamp", DateTime),
+    Column("energy_kwh", Float),
+)
+
+Table(
+    "invoices", metadata,
+    Column("id", Integer, primary_key=True, index=True),
+    Column("user_id", Integer, ForeignKey("users.id"), index=True),
+    Column("period_start", DateTime, nullable=False),
+    Column("period_end", DateTime, nullable=False),
+    Column("total_kwh", Float, nullable=False),
+    Column("total_cost", Float, nullable=False),
+    Column("created_at", DateTime),
+    UniqueConstraint("user_id", "period_start", "period_end", name="uq_invoice_user_period"),
+)
+
+Table(
+    "invoice_line_items", metadata,
+    Column("id", Integer, primary_key=True, index=True),
+    Column("invoice_id", Integer, ForeignKey("invoices.id"), index=True),
+    Column("meter_id", Integer, ForeignKey("smart_meters.id")),
+    Column("timestamp", DateTime, nullable=False),
+    Column("energy_kwh", Float, nullable=False),
+    Column("price_per_kwh", Float, nullable=False),
+    Column("cost", Float, nullable=False),
+)
+
+Table(
+    "data_versions", metadata,
+    Column("scope", String, primary_key=True),
+    Column("version", Integer, nullable=False),
+)
+
+
+def upgrade(conn) -> None:
+    metadata.create_all(conn, checkfirst=True)
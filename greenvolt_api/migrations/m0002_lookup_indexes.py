@@ -0,0 +1,15 @@
+"""Composite indexes for the per-meter and per-user time-range queries.
+
+Built with CREATE INDEX CONCURRENTLY on Postgres, so it runs outside a transaction
+and doesn't block ingest while the indexes build.
+"""
+from greenvolt_api.migrations import create_index
+
+transactional = False
+
+
+def upgrade(conn) -> None:
+    create_index(conn, "ix_readings_meter_timestamp", "smart_meter_readings", ["meter_id", "timestamp"])
+    create_index(conn, "ix_consumptions_user_timestamp", "consumptions", ["user_id", "timestamp"])
+    create_index(conn, "ix_ev_sessions_user_start", "ev_charging_sessions", ["user_id", "start_time"])
+    create_index(conn, "ix_smart_meters_user_id", "smart_meters", ["user_id"])
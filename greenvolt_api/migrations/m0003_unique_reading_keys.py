@@ -0,0 +1,20 @@
+"""Unique (meter, timestamp) keys on readings and consumptions, after removing duplicates.
+
+Non-transactional: duplicates are deleted in per-chunk transactions and the unique indexes are
+built concurrently on Postgres. Re-running after a failure picks up where it stopped.
+"""
+from sqlalchemy import text
+
+from greenvolt_api.dedupe import TABLES, dedupe
+from greenvolt_api.migrations import create_index
+
+transactional = False
+
+
+def upgrade(conn) -> None:
+    dedupe(conn, list(TABLES), log=lambda _: None)
+    create_index(conn, "ux_readings_meter_timestamp", "smart_meter_readings", ["meter_id", "timestamp"], unique=True)
+    create_index(conn, "ux_consumptions_meter_timestamp", "consumptions", ["smart_meter_id", "timestamp"], unique=True)
+    # The unique index serves every lookup the plain one did
+    concurrently = " CONCURRENTLY" if conn.dialect.name == "postgresql" else ""
+    conn.execute(text(f"DROP INDEX{concurrently} IF EXISTS ix_readings_meter_timestamp"))
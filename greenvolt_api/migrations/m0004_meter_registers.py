@@ -0,0 +1,25 @@
+"""Table for raw cumulative register readings."""
+from sqlalchemy import Boolean, Column, DateTime, Float, ForeignKey, Index, Integer, MetaData, Table
+
+transactional = True
+
+metadata = MetaData()
+
+Table(
+    "smart_meters", metadata,
+    Column("id", Integer, primary_key=True),
+)
+
+Table(
+    "meter_register_readings", metadata,
+    Column("id", Integer, primary_key=True),
+    Column("meter_id", Integer, ForeignKey("smart_meters.id"), nullable=False),
+    Column("timestamp", DateTime, nullable=False),
+    Column("register_kwh", Float, nullable=False),
+    Column("reset", Boolean, nullable=False),
+    Index("ux_register_meter_timestamp", "meter_id", "timestamp", unique=True),
+)
+
+
+def upgrade(conn) -> None:
+    metadata.tables["meter_register_readings"].create(conn, checkfirst=True)
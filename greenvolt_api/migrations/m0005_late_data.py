@@ -0,0 +1,24 @@
+"""Dirty (meter, hour) windows and a stale flag on invoices for late readings."""
+from sqlalchemy import Column, DateTime, ForeignKey, Integer, MetaData, Table, inspect, text
+
+transactional = True
+
+metadata = MetaData()
+
+Table(
+    "smart_meters", metadata,
+    Column("id", Integer, primary_key=True),
+)
+
+Table(
+    "dirty_windows", metadata,
+    Column("meter_id", Integer, ForeignKey("smart_meters.id"), primary_key=True),
+    Column("hour", DateTime, primary_key=True),
+    Column("marked_at", DateTime, nullable=False),
+)
+
+
+def upgrade(conn) -> None:
+    metadata.tables["dirty_windows"].create(conn, checkfirst=True)
+    if "stale" not in {c["name"] for c in inspect(conn).get_columns("invoices")}:
+        conn.execute(text("ALTER TABLE invoices ADD COLUMN stale BOOLEAN NOT NULL DEFAULT false"))
@@ -0,0 +1,10 @@
+"""is_estimated flag on readings, for interpolated gap fills."""
+from sqlalchemy import inspect, text
+
+transactional = True
+
+
+def upgrade(conn) -> None:
+    # A constant default is a metadata-only change on Postgres 11+, no table rewrite
+    if "is_estimated" not in {c["name"] for c in inspect(conn).get_columns("smart_meter_readings")}:
+        conn.execute(text("ALTER TABLE smart_meter_readings ADD COLUMN is_estimated BOOLEAN NOT NULL DEFAULT false"))
@@ -0,0 +1,73 @@
+"""Monthly RANGE partitions for readings, consumptions and meter data (Postgres only).
+
+Each table is rebuilt as a partitioned table: one partition per month from its oldest row through
+GREENVOLT_PARTITION_AHEAD_MONTHS from now, plus a DEFAULT partition. Rows are copied inside the
+migration's transaction, so the tables are locked while it runs; plan a maintenance window for
+large tables. The primary key becomes (id, timestamp), as Postgres requires the partition key in
+every unique index. SQLite keeps its plain tables (see greenvolt_api.partitions).
+"""
+from datetime import date
+
+from sqlalchemy import text
+
+from greenvolt_api.partitions import AHEAD_MONTHS, add_months, create_partition, month_start, months_between
+
+transactional = True
+
+# table: (indexes as (name, columns, unique), foreign keys as (column, referenced table))
+TABLES = {
+    "smart_meter_readings": (
+        [("ux_readings_meter_timestamp", "meter_id, timestamp", True)],
+        [("meter_id", "smart_meters")],
+    ),
+    "consumptions": (
+        [("ix_consumptions_user_timestamp", "user_id, timestamp", False),
+         ("ux_consumptions_meter_timestamp", "smart_meter_id, timestamp", True)],
+        [("user_id", "users"), ("smart_meter_id", "smart_meters")],
+    ),
+    "smart_meter_data": (
+        [],
+        [("user_id", "users")],
+    ),
+}
+
+
+def partition_table(conn, table: str, indexes, foreign_keys) -> None:
+    old = f"{table}_unpartitioned"
+    nulls = conn.execute(text(f"SELECT COUNT(*) FROM {table} WHERE timestamp IS NULL")).scalar()
+    if nulls:
+        raise RuntimeError(f"{table} has {nulls} rows without a timestamp; they cannot be placed in a partition")
+
+    # The id sequence must outlive the old table it belongs to
+    sequence = conn.execute(text("SELECT pg_get_serial_sequence(:t, 'id')"), {"t": table}).scalar()
+    conn.execute(text(f"ALTER SEQUENCE {sequence} OWNED BY NONE"))
+    conn.execute(text(f"ALTER TABLE {table} RENAME TO {old}"))
+    conn.execute(text(f"CREATE TABLE {table} (LIKE {old} INCLUDING DEFAULTS) PARTITION BY RANGE (timestamp)"))
+    conn.execute(text(f"CREATE TABLE {table}_default PARTITION OF {table} DEFAULT"))
+
+    oldest = conn.execute(text(f"SELECT MIN(timestamp) FROM {old}")).scalar()
+    this_month = month_start(date.today())
+    for month in months_between(min(oldest.date(), this_month) if oldest else this_month,
+                                add_months(this_month, AHEAD_MONTHS)):
+        create_partition(conn, table, month)
+
+    conn.execute(text(f"INSERT INTO {table} SELECT * FROM {old}"))
+    conn.execute(text(f"DROP TABLE {old}"))
+    conn.execute(text(f"ALTER SEQUENCE {sequence} OWNED BY {table}.id"))
+
+    # Built after the copy (and after the old table freed the names); partitioned indexes and
+    # constraints cascade to every current and future partition
+    conn.execute(text(f"ALTER TABLE {table} ADD PRIMARY KEY (id, timestamp)"))
+    for name, columns, unique in indexes:
+        conn.execute(text(f"CREATE {'UNIQUE ' if unique else ''}INDEX {name} ON {table} ({columns})"))
+    for column, referenced in foreign_keys:
+        conn.execute(text(f"ALTER TABLE {table} ADD FOREIGN KEY ({column}) REFERENCES {referenced} (id)"))
+
+
+def upgrade(conn) -> None:
+    if conn.dialect.name != "postgresql":
+        return
+    for table, (indexes, foreign_keys) in TABLES.items():
+        if conn.execute(text("SELECT relkind FROM pg_class WHERE oid = to_regclass(:t)"), {"t": table}).scalar() == "p":
+            continue  # already partitioned
+        partition_table(conn, table, indexes, foreign_keys)
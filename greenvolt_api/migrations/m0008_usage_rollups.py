@@ -0,0 +1,32 @@
+"""Hourly and daily usage tables that compacted raw readings are folded into."""
+from sqlalchemy import Column, DateTime, Float, ForeignKey, Integer, MetaData, Table
+
+transactional = True
+
+metadata = MetaData()
+
+Table(
+    "smart_meters", metadata,
+    Column("id", Integer, primary_key=True),
+)
+
+Table(
+    "hourly_meter_usage", metadata,
+    Column("meter_id", Integer, ForeignKey("smart_meters.id"), primary_key=True),
+    Column("hour", DateTime, primary_key=True),
+    Column("energy_kwh", Float, nullable=False),
+    Column("reading_count", Integer, nullable=False),
+)
+
+Table(
+    "daily_meter_usage", metadata,
+    Column("meter_id", Integer, ForeignKey("smart_meters.id"), primary_key=True),
+    Column("day", DateTime, primary_key=True),
+    Column("energy_kwh", Float, nullable=False),
+    Column("reading_count", Integer, nullable=False),
+)
+
+
+def upgrade(conn) -> None:
+    metadata.tables["hourly_meter_usage"].create(conn, checkfirst=True)
+    metadata.tables["daily_meter_usage"].create(conn, checkfirst=True)
@@ -0,0 +1,17 @@
+"""A rate_missing flag on invoice line items, so stored invoices report the prices they were billed with.
+
+Existing zero-priced items are flagged when the pricing table still has no rate for their hour.
+"""
+from sqlalchemy import inspect, text
+
+transactional = True
+
+
+def upgrade(conn) -> None:
+    if "rate_missing" in {c["name"] for c in inspect(conn).get_columns("invoice_line_items")}:
+        return
+    conn.execute(text("ALTER TABLE invoice_line_items ADD COLUMN rate_missing BOOLEAN NOT NULL DEFAULT false"))
+    conn.execute(text(
+        "UPDATE invoice_line_items SET rate_missing = true WHERE price_per_kwh = 0 "
+        "AND NOT EXISTS (SELECT 1 FROM pricing WHERE pricing.date = invoice_line_items.timestamp)"
+    ))
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, Float, DateTime, ForeignKey
+from sqlalchemy import Boolean, Column, Integer, String, Float, DateTime, ForeignKey, Index, UniqueConstraint
 from sqlalchemy.orm import relationship
 from greenvolt_api.database import Base
 from datetime import datetime
@@ -20,7 +20,7 @@ class SmartMeter(Base):
     serial_number = Column(String, unique=True, index=True)
     location = Column(String)
     installation_date = Column(DateTime, default=datetime.utcnow)
-    user_id = Column(Integer, ForeignKey("users.id"))
+    user_id = Column(Integer, ForeignKey("users.id"), index=True)
 
     owner = relationship("User", back_populates="smart_meters")
     readings = relationship("SmartMeterReading", back_populates="meter")
@@ -28,14 +28,52 @@ class SmartMeter(Base):
 
 class SmartMeterReading(Base):
     __tablename__ = "smart_meter_readings"
+    __table_args__ = (
+        Index("ux_readings_meter_timestamp", "meter_id", "timestamp", unique=True),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     meter_id = Column(Integer, ForeignKey("smart_meters.id"))
     timestamp = Column(DateTime, default=datetime.utcnow)
     energy_kwh = Column(Float)  # Energy consumed/generated in kWh
+    is_estimated = Column(Boolean, nullable=False, default=False)  # interpolated by the gap filler
 
     meter = relationship("SmartMeter", back_populates="readings")
 
+class MeterRegisterReading(Base):
+    """Raw cumulative register values; interval energy derived from them lives in smart_meter_readings."""
+    __tablename__ = "meter_register_readings"
+    __table_args__ = (
+        Index("ux_register_meter_timestamp", "meter_id", "timestamp", unique=True),
+    )
+
+    id = Column(Integer, primary_key=True)
+    meter_id = Column(Integer, ForeignKey("smart_meters.id"), nullable=False)
+    timestamp = Column(DateTime, nullable=False)
+    register_kwh = Column(Float, nullable=False)
+    reset = Column(Boolean, nullable=False, default=False)
+
+
+class HourlyMeterUsage(Base):
+    """Readings past the raw retention window, summed per (meter, hour) by greenvolt_api.retention."""
+    __tablename__ = "hourly_meter_usage"
+
+    meter_id = Column(Integer, ForeignKey("smart_meters.id"), primary_key=True)
+    hour = Column(DateTime, primary_key=True)
+    energy_kwh = Column(Float, nullable=False)
+    reading_count = Column(Integer, nullable=False)  # raw readings folded in
+
+
+class DailyMeterUsage(Base):
+    """Hourly usage past the hourly retention window, summed per (meter, day)."""
+    __tablename__ = "daily_meter_usage"
+
+    meter_id = Column(Integer, ForeignKey("smart_meters.id"), primary_key=True)
+    day = Column(DateTime, primary_key=True)
+    energy_kwh = Column(Float, nullable=False)
+    reading_count = Column(Integer, nullable=False)
+
+
 class Pricing(Base):
     __tablename__ = "pricing"
 
@@ -45,6 +83,9 @@ class Pricing(Base):
 
 class EVChargingSession(Base):
     __tablename__ = "ev_charging_sessions"
+    __table_args__ = (
+        Index("ix_ev_sessions_user_start", "user_id", "start_time"),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     user_id = Column(Integer, ForeignKey("users.id"))
@@ -68,6 +109,10 @@ class SmartMeterData(Base):
 
 class Consumption(Base):
     __tablename__ = "consumptions"
+    __table_args__ = (
+        Index("ix_consumptions_user_timestamp", "user_id", "timestamp"),
+        Index("ux_consumptions_meter_timestamp", "smart_meter_id", "timestamp", unique=True),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     user_id = Column(Integer, ForeignKey("users.id"))
@@ -79,3 +124,53 @@ class Consumption(Base):
     user = relationship("User", backref="consumptions")
     smart_meter = relationship("SmartMeter", backref="consumptions")
 
+
+
+class Invoice(Base):
+    __tablename__ = "invoices"
+    __table_args__ = (
+        UniqueConstraint("user_id", "period_start", "period_end", name="uq_invoice_user_period"),
+    )
+
+    id = Column(Integer, primary_key=True, index=True)
+    user_id = Column(Integer, ForeignKey("users.id"), index=True)
+    period_start = Column(DateTime, nullable=False)
+    period_end = Column(DateTime, nullable=False)
+    total_kwh = Column(Float, nullable=False)
+    total_cost = Column(Float, nullable=False)
+    created_at = Column(DateTime, default=datetime.utcnow)
+    stale = Column(Boolean, nullable=False, default=False)  # late readings arrived; re-priced by late_data
+
+    user = relationship("User")
+    line_items = relationship("InvoiceLineItem", back_populates="invoice", cascade="all, delete-orphan")
+
+
+class InvoiceLineItem(Base):
+    __tablename__ = "invoice_line_items"
+
+    id = Column(Integer, primary_key=True, index=True)
+    invoice_id = Column(Integer, ForeignKey("invoices.id"), index=True)
+    meter_id = Column(Integer, ForeignKey("smart_meters.id"))
+    timestamp = Column(DateTime, nullable=False)  # Hour the line item covers
+    energy_kwh = Column(Float, nullable=False)
+    price_per_kwh = Column(Float, nullable=False)
+    cost = Column(Float, nullable=False)
+    rate_missing = Column(Boolean, nullable=False, default=False)  # no price for the hour when it was billed
+
+    invoice = relationship("Invoice", back_populates="line_items")
+
+
+class DirtyWindow(Base):
+    """A (meter, hour) whose readings changed after the hour closed, waiting for the late-data pass."""
+    __tablename__ = "dirty_windows"
+
+    meter_id = Column(Integer, ForeignKey("smart_meters.id"), primary_key=True)
+    hour = Column(DateTime, primary_key=True)
+    marked_at = Column(DateTime, nullable=False)  # last time a late reading touched the window
+
+
+class DataVersion(Base):
+    __tablename__ = "data_versions"
+
+    scope = Column(String, primary_key=True)  # e.g. "user:42", "pricing"
+    version = Column(Integer, nullable=False, default=0)
@@ -0,0 +1,223 @@
+"""Monthly partitions for the reading tables.
+
+    python -m greenvolt_api.partitions list
+    python -m greenvolt_api.partitions create --ahead 3
+    python -m greenvolt_api.partitions detach --before 2024-09 [--table readings] [--drop]
+
+Postgres: migration 0007 turns each table into a declaratively RANGE-partitioned table with one
+partition per month plus a DEFAULT partition. Queries with a timestamp range are pruned to the
+months they touch. ``create`` adds upcoming months; schedule it (e.g. daily), since rows without
+a matching partition land in DEFAULT. If rows for a month are already sitting there, ``create``
+moves them into the new partition. ``detach`` removes closed months from the parent and keeps them
+as standalone tables, or drops them with --drop. Postgres refuses DETACH ... CONCURRENTLY while a
+DEFAULT partition exists, so each month is detached in its own short transaction that gives up
+after GREENVOLT_PARTITION_LOCK_TIMEOUT instead of queueing behind long readers.
+
+SQLite has no partitioning: each table stays one table, and range queries are served by the
+(meter, timestamp) indexes. The per-period equivalent of detach moves a closed month into its own
+database file next to the main one (``greenvolt.smart_meter_readings.2024-08.db``).
+
+Either way, a detached month is no longer visible to the API.
+"""
+import argparse
+import os
+from datetime import date, datetime
+from typing import Optional
+
+from sqlalchemy import DateTime, bindparam, text
+from sqlalchemy.engine import Engine
+
+from greenvolt_api.database import engine
+
+TABLES = {
+    "readings": "smart_meter_readings",
+    "consumptions": "consumptions",
+    "meter_data": "smart_meter_data",
+}
+AHEAD_MONTHS = int(os.getenv("GREENVOLT_PARTITION_AHEAD_MONTHS", "3"))
+# Months younger than this are refused by detach; the raw data is still needed
+MIN_DETACH_AGE_MONTHS = int(os.getenv("GREENVOLT_PARTITION_MIN_DETACH_AGE_MONTHS", "13"))
+# How long a detach waits for its lock on the parent table before failing; rerun detach to retry
+LOCK_TIMEOUT = os.getenv("GREENVOLT_PARTITION_LOCK_TIMEOUT", "5s")
+
+
+def month_start(d) -> date:
+    return date(d.year, d.month, 1)
+
+
+def add_months(d: date, n: int) -> date:
+    y, m = divmod(d.month - 1 + n, 12)
+    return date(d.year + y, m + 1, 1)
+
+
+def months_between(first: date, last: date) -> list[date]:
+    """First days of every month from first through last."""
+    months, m = [], month_start(first)
+    while m <= last:
+        months.append(m)
+        m = add_months(m, 1)
+    return months
+
+
+def partition_name(table: str, month: date) -> str:
+    return f"{table}_y{month.year}m{month.month:02d}"
+
+
+def create_partition(conn, table: str, month: date) -> bool:
+    """Add the partition for ``month`` (Postgres), moving any of its rows out of DEFAULT; False if it exists."""
+    name = partition_name(table, month)
+    if conn.execute(text("SELECT to_regclass(:name)"), {"name": name}).scalar():
+        return False
+    lo, hi = month, add_months(month, 1)
+    conn.execute(text(f"CREATE TABLE {name} (LIKE {table} INCLUDING DEFAULTS INCLUDING CONSTRAINTS)"))
+    # ATTACH would fail while DEFAULT still holds rows of this range
+    conn.execute(text(
+        f"WITH moved AS (DELETE FROM {table}_default WHERE timestamp >= :lo AND timestamp < :hi RETURNING *) "
+        f"INSERT INTO {name} SELECT * FROM moved"
+    ), {"lo": lo, "hi": hi})
+    conn.execute(text(f"ALTER TABLE {table} ATTACH PARTITION {name} FOR VALUES FROM ('{lo}') TO ('{hi}')"))
+    return True
+
+
+def list_partitions(bind: Engine, table: str) -> list[tuple[str, str, Optional[int]]]:
+    """(partition or period, bounds or location, row count)."""
+    with bind.connect() as conn:
+        if bind.dialect.name == "postgresql":
+            rows = conn.execute(text(
+                "SELECT c.relname, pg_get_expr(c.relpartbound, c.oid), c.reltuples::bigint FROM pg_inherits i "
+                "JOIN pg_class c ON c.oid = i.inhrelid WHERE i.inhparent = to_regclass(:table) ORDER BY c.relname"
+            ), {"table": table}).all()
+            return [(name, bound, max(count, 0)) for name, bound, count in rows]
+        rows = conn.execute(text(
+            f"SELECT substr(timestamp, 1, 7) AS period, COUNT(*) FROM {table} GROUP BY period ORDER BY period"
+        )).all()
+        listed = [(period or "(no timestamp)", "main", count) for period, count in rows]
+        directory, stem = _sqlite_archive_prefix(bind)
+        if directory is not None and os.path.isdir(directory):
+            prefix = f"{stem}.{table}."
+            for filename in sorted(os.listdir(directory)):
+                if filename.startswith(prefix) and filename.endswith(".db"):
+                    listed.append((filename[len(prefix):-3], os.path.join(directory, filename), None))
+        return listed
+
+
+def _sqlite_archive_prefix(bind: Engine) -> tuple[Optional[str], str]:
+    database = bind.url.database
+    if not database or database == ":memory:":
+        return None, ""
+    path = os.path.abspath(database)
+    return os.path.dirname(path), os.path.splitext(os.path.basename(path))[0]
+
+
+def sqlite_archive_path(bind: Engine, table: str, month: date) -> str:
+    directory, stem = _sqlite_archive_prefix(bind)
+    if directory is None:
+        raise ValueError("An in-memory SQLite database has nowhere to detach to")
+    return os.path.join(directory, f"{stem}.{table}.{month:%Y-%m}.db")
+
+
+def detach_month(bind: Engine, table: str, month: date, drop: bool = False) -> str:
+    """Take one closed month out of the live table; returns where it went."""
+    lo, hi = month, add_months(month, 1)
+    if bind.dialect.name == "postgresql":
+        name = partition_name(table, month)
+        # A plain DETACH holds an exclusive lock on the parent until commit, so keep the
+        # transaction short and bound the wait for that lock
+        with bind.begin() as conn:
+            # A month detached earlier survives as a standalone table of the same name
+            if not conn.execute(text(
+                "SELECT 1 FROM pg_inherits WHERE inhrelid = to_regclass(:name) AND inhparent = to_regclass(:table)"
+            ), {"name": name, "table": table}).scalar():
+                return "no partition"
+            conn.execute(text("SELECT set_config('lock_timeout', :timeout, true)"), {"timeout": LOCK_TIMEOUT})
+            conn.execute(text(f"ALTER TABLE {table} DETACH PARTITION {name}"))
+            if drop:
+                conn.execute(text(f"DROP TABLE {name}"))
+                return "dropped"
+        return f"table {name}"
+
+    bounds = {"lo": datetime.combine(lo, datetime.min.time()), "hi": datetime.combine(hi, datetime.min.time())}
+
+    def in_month(sql: str):
+        # Bound as DateTime so they compare against the stored text format
+        return text(f"{sql} WHERE timestamp >= :lo AND timestamp < :hi").bindparams(
+            bindparam("lo", type_=DateTime), bindparam("hi", type_=DateTime))
+
+    if drop:
+        with bind.begin() as conn:
+            conn.execute(in_month(f"DELETE FROM {table}"), bounds)
+        return "dropped"
+
+    path = sqlite_archive_path(bind, table, month)
+    with bind.connect() as conn:
+        # SQLite refuses to DETACH inside the transaction that used the database
+        conn.exec_driver_sql("ATTACH DATABASE ? AS period", (path,))
+        try:
+            conn.execute(text(f"CREATE TABLE IF NOT EXISTS period.{table} AS SELECT * FROM main.{table} WHERE 0"))
+            conn.execute(in_month(f"INSERT INTO period.{table} SELECT * FROM main.{table}"), bounds)
+            conn.execute(in_month(f"DELETE FROM main.{table}"), bounds)
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+        finally:
+            conn.exec_driver_sql("DETACH DATABASE period")
+            conn.commit()
+    return path
+
+
+def create_upcoming(bind: Engine, ahead: int = AHEAD_MONTHS, today: Optional[date] = None) -> list[str]:
+    """Partitions for the current month and ``ahead`` more, on every partitioned table."""
+    if bind.dialect.name != "postgresql":
+        return []
+    first = month_start(today or date.today())
+    created = []
+    with bind.begin() as conn:
+        for table in TABLES.values():
+            for month in months_between(first, add_months(first, ahead)):
+                if create_partition(conn, table, month):
+                    created.append(partition_name(table, month))
+    return created
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Maintain monthly partitions of the reading tables.")
+    parser.add_argument("command", choices=["list", "create", "detach"])
+    parser.add_argument("--table", choices=[*TABLES, "all"], default="all")
+    parser.add_argument("--ahead", type=int, default=AHEAD_MONTHS, help="create: months after the current one")
+    parser.add_argument("--before", type=lambda s: month_start(date.fromisoformat(s + "-01")),
+                        help="detach: every month before YYYY-MM")
+    parser.add_argument("--drop", action="store_true", help="detach: delete the data instead of keeping it")
+    args = parser.parse_args(argv)
+
+    tables = [table for name, table in TABLES.items() if args.table in (name, "all")]
+    if args.command == "list":
+        for table in tables:
+            print(table)
+            for name, where, count in list_partitions(engine, table):
+                print(f"  {name:<36} {where:<48} {'' if count is None else count}")
+    elif args.command == "create":
+        created = create_upcoming(engine, args.ahead)
+        print(f"Created {len(created)} partitions" if engine.dialect.name == "postgresql"
+              else "SQLite keeps one table per kind; nothing to create")
+    else:
+        if args.before is None:
+            parser.error("detach needs --before YYYY-MM")
+        newest = add_months(month_start(date.today()), -MIN_DETACH_AGE_MONTHS)
+        if args.before > newest:
+            parser.error(f"refusing to detach months after {newest:%Y-%m} "
+                         f"(GREENVOLT_PARTITION_MIN_DETACH_AGE_MONTHS={MIN_DETACH_AGE_MONTHS})")
+        with engine.connect() as conn:
+            oldest = {table: conn.execute(text(f"SELECT MIN(timestamp) FROM {table}")).scalar() for table in tables}
+        for table in tables:
+            first = oldest[table]
+            if first is None:
+                continue
+            if isinstance(first, str):  # SQLite returns the stored text through a bare MIN()
+                first = datetime.fromisoformat(first)
+            for month in months_between(first, add_months(args.before, -1)):
+                print(f"{table} {month:%Y-%m}: {detach_month(engine, table, month, args.drop)}")
+
+
+if __name__ == "__main__":
+    main()
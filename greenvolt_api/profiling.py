@@ -0,0 +1,193 @@
+import cProfile
+import functools
+import hmac
+import inspect
+import json
+import os
+import sys
+import threading
+import time
+import uuid
+from collections import Counter
+from contextvars import ContextVar
+from typing import Optional
+
+from fastapi import FastAPI, Header, HTTPException
+from fastapi.routing import APIRoute
+from starlette.datastructures import Headers, MutableHeaders, QueryParams
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from greenvolt_api.instrumentation import current_stats
+
+# Profiling is only wired in when an admin token is configured; without it requests pay nothing.
+PROFILE_TOKEN = os.getenv("GREENVOLT_PROFILE_TOKEN")
+PROFILE_DIR = os.getenv("GREENVOLT_PROFILE_DIR", "./profiles")
+SAMPLE_INTERVAL = float(os.getenv("GREENVOLT_PROFILE_INTERVAL_MS", "1")) / 1000
+MODES = ("sample", "cprofile")
+
+
+class ProfileSession:
+    def __init__(self, mode: str):
+        self.id = uuid.uuid4().hex[:16]
+        self.mode = mode
+        self.stacks = Counter()  # collapsed stack -> samples
+        self.profiler: Optional[cProfile.Profile] = None
+        self.wall_time = 0.0
+
+
+_session: ContextVar[Optional[ProfileSession]] = ContextVar("profile_session", default=None)
+
+
+def _collapse(frame, stop_code) -> str:
+    names = []
+    while frame is not None and frame.f_code is not stop_code:
+        code = frame.f_code
+        names.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})")
+        frame = frame.f_back
+    return ";".join(reversed(names))
+
+
+def _sampler(ident: int, stop: threading.Event, stacks: Counter, stop_code) -> None:
+    while not stop.wait(SAMPLE_INTERVAL):
+        frame = sys._current_frames().get(ident)
+        if frame is not None:
+            stacks[_collapse(frame, stop_code)] += 1
+
+
+def _run_profiled(session: ProfileSession, call, *args, **kwargs):
+    start = time.perf_counter()
+    try:
+        if session.mode == "cprofile":
+            session.profiler = cProfile.Profile()
+            return session.profiler.runcall(call, *args, **kwargs)
+
+        stop = threading.Event()
+        sampler = threading.Thread(
+            target=_sampler,
+            args=(threading.get_ident(), stop, session.stacks, _run_profiled.__code__),
+            daemon=True
+        )
+        sampler.start()
+        try:
+            return call(*args, **kwargs)
+        finally:
+            stop.set()
+            sampler.join()
+    finally:
+        session.wall_time = time.perf_counter() - start
+
+
+def _wrap_endpoint(call):
+    if inspect.iscoroutinefunction(call):
+        # Every router endpoint is sync; async ones are left unprofiled
+        return call
+
+    @functools.wraps(call)
+    def profiled(*args, **kwargs):
+        session = _session.get()
+        if session is None:
+            return call(*args, **kwargs)
+        return _run_profiled(session, call, *args, **kwargs)
+
+    return profiled
+
+
+def _save(session: ProfileSession, method: str, path: str) -> None:
+    os.makedirs(PROFILE_DIR, exist_ok=True)
+    base = os.path.join(PROFILE_DIR, session.id)
+    if session.profiler is not None:
+        session.profiler.dump_stats(base + ".pstats")
+    else:
+        # Brendan Gregg's collapsed format: flamegraph.pl, speedscope, inferno
+        with open(base + ".collapsed", "w") as f:
+            for stack, count in session.stacks.most_common():
+                f.write(f"{stack} {count}\n")
+
+    stats = current_stats.get()
+    sql = []
+    if stats is not None:
+        sql = [
+            {"statement": s, "count": n, "total_ms": round(stats.statement_time[s] * 1000, 3)}
+            for s, n in stats.statements.most_common()
+        ]
+    with open(base + ".json", "w") as f:
+        json.dump({
+            "id": session.id,
+            "method": method,
+            "path": path,
+            "mode": session.mode,
+            "wall_ms": round(session.wall_time * 1000, 3),
+            "db_ms": round(stats.total_time * 1000, 3) if stats else None,
+            "sql": sql
+        }, f, indent=2)
+
+
+def requested_mode(scope: Scope) -> Optional[str]:
+    """Profile mode if the request carries the admin token and asks for profiling."""
+    headers = Headers(scope=scope)
+    token = headers.get("x-profile-token")
+    if not token or not hmac.compare_digest(token, PROFILE_TOKEN):
+        return None
+    mode = headers.get("x-profile") or QueryParams(scope.get("query_string", b"")).get("profile")
+    if not mode:
+        return None
+    return mode if mode in MODES else "sample"
+
+
+class ProfilingMiddleware:
+    """Runs the endpoint of an admin-flagged request under a profiler and stores the result.
+
+    Request: ``X-Profile-Token: <GREENVOLT_PROFILE_TOKEN>`` plus ``X-Profile: sample|cprofile``
+    (or ``?profile=sample``). The response carries ``X-Profile-Id``; the profile is written to
+    GREENVOLT_PROFILE_DIR as ``<id>.collapsed`` (sampling) or ``<id>.pstats``, with SQL timings in ``<id>.json``.
+    """
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        mode = requested_mode(scope) if scope["type"] == "http" else None
+        if mode is None:
+            await self.app(scope, receive, send)
+            return
+
+        session = ProfileSession(mode)
+        token = _session.set(session)
+
+        async def send_wrapper(message: Message) -> None:
+            if message["type"] == "http.response.start":
+                _save(session, scope["method"], scope["path"])
+                MutableHeaders(scope=message)["X-Profile-Id"] = session.id
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            _session.reset(token)
+
+
+def install_profiling(app: FastAPI) -> None:
+    """Wrap every route's endpoint so it can be profiled; a no-op unless GREENVOLT_PROFILE_TOKEN is set."""
+    if not PROFILE_TOKEN:
+        return
+    for route in app.routes:
+        if isinstance(route, APIRoute):
+            route.dependant.call = _wrap_endpoint(route.dependant.call)
+    app.add_middleware(ProfilingMiddleware)
+
+    @app.get("/debug/profiles/{profile_id}", include_in_schema=False)
+    def get_profile(profile_id: str, x_profile_token: str = Header(...)):
+        if not hmac.compare_digest(x_profile_token, PROFILE_TOKEN):
+            raise HTTPException(status_code=403, detail="Not authorized")
+        if not profile_id.isalnum():
+            raise HTTPException(status_code=404, detail="Profile not found")
+        base = os.path.join(PROFILE_DIR, profile_id)
+        try:
+            with open(base + ".json") as f:
+                summary = json.load(f)
+            if summary["mode"] == "sample":
+                with open(base + ".collapsed") as f:
+                    summary["collapsed"] = f.read()
+        except FileNotFoundError:
+            raise HTTPException(status_code=404, detail="Profile not found")
+        return summary
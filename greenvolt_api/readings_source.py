@@ -0,0 +1,80 @@
+"""Where billing and analytics get readings from, whatever resolution they are kept at.
+
+Recent ranges are served from ``smart_meter_readings`` alone. Ranges reaching back past the raw
+retention window also pull compacted hourly usage, in the same UNION ALL query. Hourly rows come
+back as one reading at the start of their hour, so hourly pricing is exact. Ranges past the hourly
+window also get daily usage, spread evenly over the 24 hours of the day: it is priced at the day's
+average rate and shows a flat hour-of-day profile. Months moved to the cold archive are read from
+its memory-mapped files; a raw reading still in the table at the same instant as an archived one
+wins. Compacted hourly and daily rows are sums, never the same reading, so they add to the archive.
+"""
+from collections import namedtuple
+from datetime import datetime, timedelta
+from itertools import repeat
+from typing import Optional
+
+from sqlalchemy import or_, select, union_all
+from sqlalchemy.orm import Session
+
+from greenvolt_api.billing import as_datetime
+from greenvolt_api.cold_archive import cold_archive
+from greenvolt_api.models import DailyMeterUsage, HourlyMeterUsage, SmartMeterReading
+from greenvolt_api.partitions import add_months
+from greenvolt_api.retention import hourly_horizon, raw_horizon
+
+Reading = namedtuple("Reading", ["meter_id", "timestamp", "energy_kwh"])
+
+HOURS_PER_DAY = 24
+DAY = timedelta(days=1)
+
+
+def load_readings(db: Session, meter_ids: list[int], start, end, now: Optional[datetime] = None):
+    """(meter_id, timestamp, energy_kwh) rows for the meters with start <= timestamp <= end."""
+    start, end = as_datetime(start), as_datetime(end)
+    R, H, D = SmartMeterReading, HourlyMeterUsage, DailyMeterUsage
+    query = select(R.meter_id, R.timestamp, R.energy_kwh).where(
+        R.meter_id.in_(meter_ids),
+        R.timestamp >= start,
+        R.timestamp <= end
+    )
+    # Compaction only ever folds rows older than the horizons, so newer ranges skip those tables
+    if start < raw_horizon(now):
+        query = union_all(query, select(H.meter_id, H.hour, H.energy_kwh).where(
+            H.meter_id.in_(meter_ids),
+            H.hour >= start,
+            H.hour <= end
+        ))
+    rows = db.execute(query).all()
+
+    daily_before = hourly_horizon(now)
+    if daily_before is not None and start < daily_before:
+        hours = [timedelta(hours=h) for h in range(HOURS_PER_DAY)]
+        for meter_id, day, kwh in db.execute(select(D.meter_id, D.day, D.energy_kwh).where(
+            D.meter_id.in_(meter_ids),
+            D.day > start - DAY,
+            D.day <= end
+        )):
+            # The spread hours are bounded like raw readings, so a partial first or last day counts partially
+            rows.extend(Reading(meter_id, day + h, kwh / HOURS_PER_DAY) for h in hours if start <= day + h <= end)
+
+    archived = cold_archive.overlapping(start, end)
+    if archived:
+        bounds = [(as_datetime(m), as_datetime(add_months(m, 1))) for m in archived]
+        # Only raw readings replace archived ones; in an archived month they are the few late arrivals
+        live = {tuple(r) for r in db.execute(select(R.meter_id, R.timestamp).where(
+            R.meter_id.in_(meter_ids),
+            R.timestamp >= start,
+            R.timestamp <= end,
+            or_(*((R.timestamp >= lo) & (R.timestamp < hi) for lo, hi in bounds))
+        ))}
+        for month in archived:
+            month_file = cold_archive.open(month)
+            if month_file is None:  # removed since the listing
+                continue
+            for meter_id in meter_ids:
+                timestamps, energies = month_file.columns(meter_id, start, end)
+                archived_rows = map(Reading._make, zip(repeat(meter_id), timestamps, energies))
+                if live:
+                    archived_rows = (r for r in archived_rows if (meter_id, r.timestamp) not in live)
+                rows.extend(archived_rows)
+    return rows
@@ -0,0 +1,116 @@
+"""Cumulative register ingest: turn register values into interval energy per meter.
+
+A batch is grouped by meter and merged, in timestamp order, with the stored registers it touches:
+the last one before the batch, any in its time range, and the first one after it. All of those come
+back from one query. Each reading's interval energy is its register minus the previous one:
+- a register that went down near the top of its range rolled over (GREENVOLT_REGISTER_ROLLOVER_KWH);
+- any other decrease, or a reading flagged ``reset``, is a replaced meter counting up from zero;
+- a meter's first reading only sets the baseline.
+A reading that arrives late also re-derives the stored reading right after it.
+"""
+import os
+from collections import defaultdict
+from datetime import datetime
+from typing import Iterable
+
+from sqlalchemy import func, select, union_all
+from sqlalchemy.orm import Session
+
+from greenvolt_api.ingest import DUPLICATE_POLICY, upsert
+from greenvolt_api.late_data import late_windows, mark_late
+from greenvolt_api.models import MeterRegisterReading, SmartMeterReading
+
+# Register capacity: a 6-digit kWh register wraps from 999999.x back to 0
+ROLLOVER_KWH = float(os.getenv("GREENVOLT_REGISTER_ROLLOVER_KWH", "1000000"))
+# A wrap-around only counts as rollover if it implies less than this much energy in one interval
+MAX_ROLLOVER_INTERVAL_KWH = float(os.getenv("GREENVOLT_REGISTER_MAX_INTERVAL_KWH", "1000"))
+
+
+def interval_energy(previous: float, current: float, reset: bool) -> tuple[float, str]:
+    """(energy since the previous register, how it was derived)."""
+    if reset:
+        return current, "reset"
+    if current >= previous:
+        return current - previous, "delta"
+    wrapped = current + ROLLOVER_KWH - previous
+    if wrapped <= MAX_ROLLOVER_INTERVAL_KWH:
+        return wrapped, "rollover"
+    # Dropped far below the previous value without a flag: a replaced meter that started at zero
+    return current, "inferred_reset"
+
+
+def derive_intervals(series: list[tuple[datetime, float, bool, bool]]) -> list[tuple[datetime, float, str]]:
+    """Interval rows for one meter.
+
+    ``series`` is (timestamp, register_kwh, reset, is_new), sorted by timestamp. Intervals are
+    produced for new readings and for a stored reading whose predecessor is new.
+    """
+    intervals = []
+    for i in range(1, len(series)):
+        ts, register, reset, is_new = series[i]
+        if is_new or series[i - 1][3]:
+            energy, kind = interval_energy(series[i - 1][1], register, reset)
+            intervals.append((ts, round(energy, 6), kind))
+    # The very first reading can only be a baseline, unless it's a reset
+    if series and series[0][3] and series[0][2]:
+        intervals.insert(0, (series[0][0], series[0][1], "reset"))
+    return intervals
+
+
+def _neighbours(db: Session, meter_ids: list[int], start: datetime, end: datetime):
+    """Stored registers around [start, end] for the meters: last before, all inside, first after."""
+    R = MeterRegisterReading
+    columns = (R.meter_id, R.timestamp, R.register_kwh, R.reset)
+    before = select(*columns, func.row_number().over(partition_by=R.meter_id, order_by=R.timestamp.desc()).label("rn")) \
+        .where(R.meter_id.in_(meter_ids), R.timestamp < start).subquery()
+    after = select(*columns, func.row_number().over(partition_by=R.meter_id, order_by=R.timestamp.asc()).label("rn")) \
+        .where(R.meter_id.in_(meter_ids), R.timestamp > end).subquery()
+    inside = select(*columns).where(R.meter_id.in_(meter_ids), R.timestamp >= start, R.timestamp <= end)
+    query = union_all(
+        select(before.c.meter_id, before.c.timestamp, before.c.register_kwh, before.c.reset).where(before.c.rn == 1),
+        inside,
+        select(after.c.meter_id, after.c.timestamp, after.c.register_kwh, after.c.reset).where(after.c.rn == 1),
+    )
+    return db.execute(query).all()
+
+
+def ingest_registers(db: Session, readings: Iterable, policy: str = DUPLICATE_POLICY) -> dict:
+    """Store register readings and their derived interval energy; the caller commits."""
+    incoming = defaultdict(dict)  # meter -> {timestamp: (register, reset)}
+    for r in readings:
+        incoming[r.meter_id][r.timestamp] = (r.register_kwh, r.reset)
+    if not incoming:
+        return {"accepted": 0, "intervals": 0}
+
+    start = min(min(ts) for ts in incoming.values())
+    end = max(max(ts) for ts in incoming.values())
+    stored = defaultdict(dict)
+    for meter_id, ts, register, reset in _neighbours(db, list(incoming), start, end):
+        stored[meter_id][ts] = (register, bool(reset))
+
+    counts = defaultdict(int)
+    register_rows, interval_rows = [], []
+    for meter_id, new in incoming.items():
+        merged = {ts: (*value, False) for ts, value in stored[meter_id].items()}
+        for ts, value in new.items():
+            if ts in merged and policy == "ignore":
+                counts["duplicates"] += 1  # a replay; the stored register stays authoritative
+                continue
+            merged[ts] = (*value, True)
+            register_rows.append({"meter_id": meter_id, "timestamp": ts, "register_kwh": value[0], "reset": value[1]})
+
+        series = [(ts, *merged[ts]) for ts in sorted(merged)]
+        for ts, energy, kind in derive_intervals(series):
+            counts[kind] += 1
+            interval_rows.append({"meter_id": meter_id, "timestamp": ts, "energy_kwh": energy})
+        counts["baselines"] += sum(1 for i, s in enumerate(series) if s[3] and i == 0 and not s[2])
+
+    dialect = db.get_bind().dialect.name
+    if register_rows:
+        db.execute(upsert(dialect, MeterRegisterReading, policy="overwrite"), register_rows)
+    if interval_rows:
+        # Derived rows always take the newest derivation
+        db.execute(upsert(dialect, SmartMeterReading, policy="overwrite"), interval_rows)
+        mark_late(db, late_windows((r["meter_id"], r["timestamp"]) for r in interval_rows))
+
+    return {"accepted": len(register_rows), "intervals": len(interval_rows), **counts}
@@ -0,0 +1,34 @@
+from typing import Any, Optional
+
+from fastapi import Response
+from fastapi.responses import JSONResponse
+
+try:
+    import orjson
+except ImportError:  # fall back to the stdlib encoder
+    orjson = None
+
+
+class FastJSONResponse(JSONResponse):
+    """JSONResponse rendered with orjson when it is installed.
+
+    orjson encodes datetimes/dates as ISO 8601 like FastAPI's encoder does, so the
+    payload is unchanged; it is just several times faster on large lists of dicts.
+    """
+
+    def render(self, content: Any) -> bytes:
+        if orjson is None:
+            return super().render(content)
+        return orjson.dumps(content, option=orjson.OPT_NON_STR_KEYS)
+
+
+def fast_json(content: Any, response: Optional[Response] = None) -> FastJSONResponse:
+    """Encode content directly, skipping FastAPI's jsonable_encoder pass over large payloads.
+
+    Headers set on the injected ``response`` (e.g. ETag) are carried over, since FastAPI
+    only merges them into responses it builds itself.
+    """
+    headers = dict(response.headers) if response is not None else None
+    if headers:
+        headers.pop("content-length", None)
+    return FastJSONResponse(content, headers=headers)
@@ -0,0 +1,169 @@
+"""Retention: fold aged raw readings into hourly (and optionally daily) usage, then delete them.
+
+    python -m greenvolt_api.retention --dry-run
+    python -m greenvolt_api.retention --meters-per-batch 50 --sleep 0.05
+
+Readings older than GREENVOLT_RETENTION_RAW_DAYS (default 396, about 13 months) are summed per
+(meter, hour) into ``hourly_meter_usage``. With GREENVOLT_RETENTION_HOURLY_DAYS set, hourly rows
+older than that are summed per (meter, day) into ``daily_meter_usage``. Each batch covers one month
+of one meter-id range and is its own transaction: insert the sums, delete the source rows, and bump
+the data versions of the meters folded. Every kWh is therefore in exactly one table at any time.
+Compaction loses the (meter, timestamp) key a replayed reading would be de-duplicated against, so
+ingest refuses readings older than the raw horizon (see ``check_raw_horizon``); an hour that has been
+folded never receives raw readings again. Billing and analytics read all tiers through
+greenvolt_api.readings_source.
+"""
+import argparse
+import os
+import time
+from datetime import datetime, timedelta
+from typing import Optional
+
+from sqlalchemy import delete, func, select
+from sqlalchemy.orm import Session
+
+from greenvolt_api.billing import as_datetime, hour_floor
+from greenvolt_api.database import SessionLocal
+from greenvolt_api.models import DailyMeterUsage, HourlyMeterUsage, SmartMeterReading
+from greenvolt_api.partitions import add_months, month_start, months_between
+from greenvolt_api.versions import bump_versions, meter_data_scopes
+
+RAW_RETENTION_DAYS = int(os.getenv("GREENVOLT_RETENTION_RAW_DAYS", "396"))
+HOURLY_RETENTION_DAYS = int(os.getenv("GREENVOLT_RETENTION_HOURLY_DAYS", "0"))  # 0 keeps hourly rows forever
+
+
+def raw_horizon(now: Optional[datetime] = None) -> datetime:
+    """Raw readings before this hour get compacted into hourly usage."""
+    return hour_floor((now or datetime.utcnow()) - timedelta(days=RAW_RETENTION_DAYS))
+
+
+def check_raw_horizon(timestamps, now: Optional[datetime] = None) -> Optional[datetime]:
+    """The raw horizon if any timestamp lies before it, else None.
+
+    Ingest refuses such readings: their hour may already be folded into hourly usage, where a
+    replay could no longer be told apart from new energy and would be counted twice.
+    """
+    horizon = raw_horizon(now)
+    return horizon if any(ts < horizon for ts in timestamps) else None
+
+
+def hourly_horizon(now: Optional[datetime] = None) -> Optional[datetime]:
+    """Hourly usage before this day gets compacted into daily usage; None when disabled."""
+    if not HOURLY_RETENTION_DAYS:
+        return None
+    return as_datetime(((now or datetime.utcnow()) - timedelta(days=HOURLY_RETENTION_DAYS)).date())
+
+
+def _truncate(column, unit: str, dialect: str):
+    if dialect == "sqlite":
+        # Same text format SQLAlchemy stores DateTime in, so the result compares and loads like one
+        pattern = "%Y-%m-%d %H:00:00.000000" if unit == "hour" else "%Y-%m-%d 00:00:00.000000"
+        return func.strftime(pattern, column)
+    return func.date_trunc(unit, column)
+
+
+def _fold(db: Session, source, source_ts, target, target_ts_name: str, unit: str,
+          meter_lo: int, meter_hi: int, start: datetime, end: datetime, count_expr) -> list[int]:
+    """Sum one (meter range, time range) of ``source`` into ``target`` and delete it.
+
+    Returns the meter_id of every folded row.
+    """
+    dialect = db.get_bind().dialect.name
+    if dialect == "postgresql":
+        from sqlalchemy.dialects.postgresql import insert
+    else:
+        from sqlalchemy.dialects.sqlite import insert
+
+    in_batch = (source.meter_id >= meter_lo, source.meter_id < meter_hi, source_ts >= start, source_ts < end)
+    period = _truncate(source_ts, unit, dialect)
+    sums = select(source.meter_id, period, func.sum(source.energy_kwh), count_expr) \
+        .where(*in_batch).group_by(source.meter_id, period)
+    # Only rows written past ingest (seeding, restores) can meet a (meter, period) compacted before;
+    # they are new energy, so their sums are added on
+    stmt = insert(target).from_select(["meter_id", target_ts_name, "energy_kwh", "reading_count"], sums)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=["meter_id", target_ts_name],
+        set_={"energy_kwh": target.energy_kwh + stmt.excluded.energy_kwh,
+              "reading_count": target.reading_count + stmt.excluded.reading_count}
+    )
+    db.execute(stmt)
+    return db.execute(delete(source).where(*in_batch).returning(source.meter_id)).scalars().all()
+
+
+def _batches(db: Session, model, ts_column, before: datetime, meters_per_batch: int):
+    bounds = db.query(func.min(model.meter_id), func.max(model.meter_id), func.min(ts_column)) \
+        .filter(ts_column < before).first()
+    db.rollback()
+    if bounds[0] is None:
+        return
+    oldest = bounds[2]
+    if isinstance(oldest, str):  # SQLite hands back text for MIN() over a DateTime
+        oldest = datetime.fromisoformat(oldest)
+    for month in months_between(month_start(oldest), before.date()):
+        start = as_datetime(month)
+        end = min(as_datetime(add_months(month, 1)), before)
+        for lo in range(bounds[0], bounds[1] + 1, meters_per_batch):
+            yield lo, lo + meters_per_batch, start, end
+
+
+def compact(session_factory=SessionLocal, now: Optional[datetime] = None, meters_per_batch: int = 50,
+            sleep: float = 0.0, log=print) -> dict:
+    """Run both compaction tiers; returns the number of source rows folded per tier."""
+    folded = {"raw": 0, "hourly": 0}
+    tiers = [("raw", SmartMeterReading, SmartMeterReading.timestamp, HourlyMeterUsage, "hour", "hour",
+              raw_horizon(now), func.count())]
+    if hourly_horizon(now) is not None:
+        tiers.append(("hourly", HourlyMeterUsage, HourlyMeterUsage.hour, DailyMeterUsage, "day", "day",
+                      hourly_horizon(now), func.sum(HourlyMeterUsage.reading_count)))
+
+    db = session_factory()
+    try:
+        for name, source, source_ts, target, target_ts, unit, before, count_expr in tiers:
+            for lo, hi, start, end in _batches(db, source, source_ts, before, meters_per_batch):
+                meters = _fold(db, source, source_ts, target, target_ts, unit, lo, hi, start, end, count_expr)
+                if meters:
+                    # Totals are unchanged, but these meters' detailed responses now show coarser rows
+                    bump_versions(db, *meter_data_scopes(db, meters))
+                db.commit()
+                if meters:
+                    folded[name] += len(meters)
+                    log(f"{name}: meters {lo}-{hi - 1}, {start:%Y-%m}: folded {len(meters)} rows")
+                if sleep:
+                    time.sleep(sleep)
+    finally:
+        db.close()
+    return folded
+
+
+def pending(session_factory=SessionLocal, now: Optional[datetime] = None) -> dict:
+    db = session_factory()
+    try:
+        counts = {"raw": db.query(func.count()).select_from(SmartMeterReading)
+                  .filter(SmartMeterReading.timestamp < raw_horizon(now)).scalar()}
+        if hourly_horizon(now) is not None:
+            counts["hourly"] = db.query(func.count()).select_from(HourlyMeterUsage) \
+                .filter(HourlyMeterUsage.hour < hourly_horizon(now)).scalar()
+        return counts
+    finally:
+        db.close()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Compact aged readings into hourly/daily usage.")
+    parser.add_argument("--meters-per-batch", type=int, default=50)
+    parser.add_argument("--sleep", type=float, default=0.0, help="Pause between batches, in seconds")
+    parser.add_argument("--dry-run", action="store_true", help="Only count the rows due for compaction")
+    args = parser.parse_args(argv)
+
+    print(f"Raw readings kept after {raw_horizon():%Y-%m-%d %H:00}"
+          + (f", hourly usage after {hourly_horizon():%Y-%m-%d}" if hourly_horizon() else ""))
+    if args.dry_run:
+        for tier, count in pending().items():
+            print(f"{tier}: {count} rows due")
+        return
+    folded = compact(meters_per_batch=args.meters_per_batch, sleep=args.sleep)
+    print("✅ Folded " + ", ".join(f"{count} {tier} rows" for tier, count in folded.items()))
+
+
+if __name__ == "__main__":
+    main()
@@ -1,6 +1,16 @@
-from pydantic import BaseModel, EmailStr
-from datetime import datetime
-from typing import Optional
+from pydantic import AfterValidator, BaseModel, EmailStr, TypeAdapter
+from datetime import date, datetime, timezone
+from typing import Annotated, Optional
+
+
+def naive_utc(value: datetime) -> datetime:
+    """Stored timestamps are naive UTC; an aware input is converted, a naive one is taken as UTC."""
+    if value.tzinfo is None:
+        return value
+    return value.astimezone(timezone.utc).replace(tzinfo=None)
+
+# Every incoming instant, so nothing downstream compares aware and naive datetimes
+UtcDateTime = Annotated[datetime, AfterValidator(naive_utc)]
 
 class UserCreate(BaseModel):
     name: str
@@ -24,16 +34,22 @@ class SmartMeterCreate(BaseModel):
 class ReadingCreate(BaseModel):
     meter_id: int
     energy_kwh: float
-    timestamp: Optional[datetime] = None  # Optional custom timestamp
+    timestamp: Optional[UtcDateTime] = None  # Optional custom timestamp
+
+class RegisterReadingCreate(BaseModel):
+    meter_id: int
+    timestamp: UtcDateTime
+    register_kwh: float  # Cumulative register value, not interval energy
+    reset: bool = False  # Device replaced: the register restarted from zero before this reading
 
 class PricingCreate(BaseModel):
-    date: datetime
+    date: UtcDateTime
     price_per_kwh: float
 
 class EVChargingCreate(BaseModel):
     user_id: int
-    start_time: Optional[datetime] = None
-    end_time: Optional[datetime] = None
+    start_time: Optional[UtcDateTime] = None
+    end_time: Optional[UtcDateTime] = None
     energy_kwh: float
 
 class BillingLineItem(BaseModel):
@@ -43,29 +59,49 @@ class BillingLineItem(BaseModel):
     price_per_kwh: float
     cost: float
 
+class DailyBilling(BaseModel):
+    date: date
+    kwh: float
+    cost: float
+    co2_avoided_kg: Optional[float] = None
+
+class HourlyBillingEntry(BaseModel):
+    timestamp: datetime
+    kwh: float
+    cost: float
+
 class BillingBreakdown(BaseModel):
     user_id: int
-    start: datetime
-    end: datetime
+    start_date: date
+    end_date: date
     total_kwh: float
     total_cost: float
-    missing_rate_hours: int
-    items: list[BillingLineItem]
+    co2_avoided_kg: Optional[float] = None
+    missing_rate_hours: int  # hours with readings but no price; billed at 0
+    daily_breakdown: list[DailyBilling]
+    items: list[BillingLineItem]  # one per (meter, hour)
+
+class HourlyBillingBreakdown(BillingBreakdown):
+    hourly_breakdown: list[HourlyBillingEntry]  # one per reading
+
+# One pydantic-core pass over the whole payload instead of a model instance per line item
+BILLING_BREAKDOWN = TypeAdapter(BillingBreakdown)
+HOURLY_BILLING_BREAKDOWN = TypeAdapter(HourlyBillingBreakdown)
 
 class SmartMeterDataCreate(BaseModel):
     user_id: int
-    timestamp: datetime
+    timestamp: UtcDateTime
     consumption_kwh: float
 
 class BulkPricingCreate(BaseModel):
-    date: datetime  # The exact hour
+    date: UtcDateTime  # The exact hour
     price_per_kwh: float
 
 
 class ConsumptionCreate(BaseModel):
     user_id: int
     smart_meter_id: int
-    timestamp: datetime
+    timestamp: UtcDateTime
     energy_kwh: float
 
 
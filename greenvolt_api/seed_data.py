@@ -1,57 +1,277 @@
-from datetime import datetime
-from greenvolt_api.database import SessionLocal
-from greenvolt_api.models import User, SmartMeter, Consumption, Pricing, EVChargingSession
+"""Deterministic synthetic dataset generator.
+
+    python -m greenvolt_api.seed_data --users 1000 --meters-per-user 2 --days 30 --resolution 15min
+
+The same arguments (including --seed) always produce the same rows. Readings are streamed
+in chunks through the driver's bulk path (executemany on SQLite, COPY on Postgres), so
+datasets of 100M readings fit in constant memory.
+"""
+import argparse
+import io
+import math
+import os
+import random
+import time
+from datetime import date, datetime, timedelta
+
+from sqlalchemy import func
+
+from greenvolt_api.cache import result_cache
+from greenvolt_api.cold_archive import cold_archive
+from greenvolt_api.database import SessionLocal, engine
+from greenvolt_api.jwt import get_password_hash
+from greenvolt_api.migrate import upgrade
+from greenvolt_api.models import (
+    Consumption, DailyMeterUsage, DataVersion, DirtyWindow, EVChargingSession, HourlyMeterUsage, Invoice,
+    InvoiceLineItem, MeterRegisterReading, Pricing, SmartMeter, SmartMeterData, SmartMeterReading, User
+)
+from greenvolt_api.versions import PRICING_SCOPE, bump_versions, meter_scope, user_scope
+
+RESOLUTIONS = {"15min": 15, "hourly": 60}
+LOCATIONS = ["Berlin", "Hamburg", "Munich", "Cologne", "Frankfurt", "Stuttgart", "Leipzig", "Dresden"]
+DEFAULT_PASSWORD = "password"  # every generated user can log in with this
+CHUNK_ROWS = 200_000
+SQLITE_DATETIME = "%Y-%m-%d %H:%M:%S.%f"  # what SQLAlchemy's SQLite DateTime stores and compares against
+# Children before parents, so --reset never trips a foreign key
+RESET_ORDER = (InvoiceLineItem, Invoice, DirtyWindow, HourlyMeterUsage, DailyMeterUsage, MeterRegisterReading,
+               EVChargingSession, Consumption, SmartMeterReading, SmartMeterData, Pricing, SmartMeter, User)
+VERSION_BATCH = 5000  # scopes per bump_versions statement, well under SQLite's bound-parameter limit
+# Tables loaded with explicit ids; their Postgres sequences have to catch up afterwards
+EXPLICIT_ID_TABLES = ("users", "smart_meters")
+
+# Relative household load per hour of day: night trough, morning and evening peaks
+HOURLY_SHAPE = [0.45, 0.4, 0.38, 0.37, 0.38, 0.45, 0.7, 1.0, 0.95, 0.75, 0.65, 0.65,
+                0.7, 0.65, 0.6, 0.65, 0.8, 1.1, 1.35, 1.4, 1.25, 1.0, 0.75, 0.55]
+
+
+class BulkWriter:
+    """Append rows to one table through the fastest path the driver offers."""
+
+    def __init__(self, raw_conn, dialect: str, table: str, columns: list[str]):
+        self.raw_conn = raw_conn
+        self.dialect = dialect
+        self.table = table
+        self.columns = columns
+        self.rows = []
+        self.written = 0
+
+    def add(self, row: tuple) -> None:
+        self.rows.append(row)
+        if len(self.rows) >= CHUNK_ROWS:
+            self.flush()
+
+    def flush(self) -> None:
+        if not self.rows:
+            return
+        cursor = self.raw_conn.cursor()
+        try:
+            if self.dialect == "postgresql":
+                buf = io.StringIO()
+                for row in self.rows:
+                    buf.write("\t".join("\\N" if v is None else str(v) for v in row) + "\n")
+                buf.seek(0)
+                cursor.copy_expert(f"COPY {self.table} ({', '.join(self.columns)}) FROM STDIN", buf)
+            else:
+                placeholders = ", ".join("?" for _ in self.columns)
+                cursor.executemany(
+                    f"INSERT INTO {self.table} ({', '.join(self.columns)}) VALUES ({placeholders})", self.rows
+                )
+        finally:
+            cursor.close()
+        self.raw_conn.commit()
+        self.written += len(self.rows)
+        self.rows = []
+
+
+def format_ts(dt: datetime, dialect: str) -> str:
+    return dt.strftime(SQLITE_DATETIME) if dialect == "sqlite" else dt.isoformat(sep=" ")
+
+
+def tariff(hour: datetime, rng: random.Random) -> float:
+    """Time-of-use price: cheap nights, expensive evening peak, a little daily noise."""
+    base = 0.28 + 0.03 * math.sin(hour.timetuple().tm_yday / 365 * 2 * math.pi)  # seasonal swing
+    if 17 <= hour.hour < 21:
+        base += 0.12
+    elif hour.hour < 6:
+        base -= 0.1
+    if hour.weekday() >= 5:
+        base -= 0.03
+    return round(base + rng.uniform(-0.02, 0.02), 4)
+
+
+def generate(users: int, meters_per_user: int, start: date, days: int, resolution: str,
+             seed: int = 42, ev_share: float = 0.3, ev_sessions_per_week: float = 3.0,
+             with_consumption: bool = False, reset: bool = False) -> dict:
+    upgrade(engine, log=lambda _: None)
+    dialect = engine.dialect.name
+    step = timedelta(minutes=RESOLUTIONS[resolution])
+    slots_per_hour = 60 // RESOLUTIONS[resolution]
+    start_dt = datetime.combine(start, datetime.min.time())
+    end_dt = start_dt + timedelta(days=days)
+    hours = [start_dt + timedelta(hours=h) for h in range(days * 24)]
 
-def seed():
     db = SessionLocal()
+    try:
+        if reset:
+            for model in RESET_ORDER:
+                db.query(model).delete()
+            # Versions keep counting: restarted counters would hand out (scope, version) pairs that
+            # other workers' caches and clients' ETags still hold for the deleted data
+            db.query(DataVersion).update({DataVersion.version: DataVersion.version + 1}, synchronize_session=False)
+            db.commit()
+            result_cache.clear()
+            # Archived months belong to the deleted meters; reseeded meters reuse their ids
+            for path in cold_archive.months().values():
+                os.remove(path)
+        user_offset = db.query(func.max(User.id)).scalar() or 0
+        meter_offset = db.query(func.max(SmartMeter.id)).scalar() or 0
+        priced_hours = {d for (d,) in db.query(Pricing.date).filter(Pricing.date >= start_dt, Pricing.date < end_dt)}
+    finally:
+        db.close()
+
+    password_hash = get_password_hash(DEFAULT_PASSWORD)  # bcrypt once, shared by every user
+    rng = random.Random(seed)
+    prices = {h: tariff(h, rng) for h in hours}
+
+    raw = engine.raw_connection()
+    raw.detach()  # the load settings below must not leak back into the pool
+    try:
+        if dialect == "sqlite":
+            # Bulk load: the data can be regenerated, so skip fsyncs and the rollback journal
+            cursor = raw.cursor()
+            cursor.execute("PRAGMA synchronous = OFF")
+            cursor.execute("PRAGMA journal_mode = MEMORY")
+            cursor.close()
+
+        pricing = BulkWriter(raw, dialect, "pricing", ["date", "price_per_kwh"])
+        for h in hours:
+            if h not in priced_hours:
+                pricing.add((format_ts(h, dialect), prices[h]))
+        pricing.flush()
+
+        user_rows = BulkWriter(raw, dialect, "users", ["id", "name", "email", "password"])
+        meter_rows = BulkWriter(raw, dialect, "smart_meters", ["id", "serial_number", "location", "installation_date", "user_id"])
+        installed = format_ts(start_dt - timedelta(days=365), dialect)
+        for u in range(user_offset + 1, user_offset + users + 1):
+            user_rows.add((u, f"User {u}", f"user{u}@greenvolt.test", password_hash))
+            for m in range(meters_per_user):
+                meter_id = meter_offset + (u - user_offset - 1) * meters_per_user + m + 1
+                meter_rows.add((meter_id, f"SM-{meter_id:08d}", LOCATIONS[meter_id % len(LOCATIONS)], installed, u))
+        user_rows.flush()
+        meter_rows.flush()
+
+        # Timestamps are formatted once and shared by every meter
+        slots = []
+        t = start_dt
+        while t < end_dt:
+            slots.append((format_ts(t, dialect), t.hour, (t - start_dt).days, format_ts(t.replace(minute=0), dialect)))
+            t += step
+
+        readings = BulkWriter(raw, dialect, "smart_meter_readings", ["meter_id", "timestamp", "energy_kwh"])
+        consumption = BulkWriter(raw, dialect, "consumptions", ["user_id", "smart_meter_id", "timestamp", "energy_kwh"])
+        for u in range(user_offset + 1, user_offset + users + 1):
+            for m in range(meters_per_user):
+                meter_id = meter_offset + (u - user_offset - 1) * meters_per_user + m + 1
+                # Per-meter stream so a meter's data doesn't depend on how many others are generated
+                meter_rng = random.Random(f"{seed}:{meter_id}")
+                daily_kwh = meter_rng.uniform(4.0, 18.0)
+                scale = daily_kwh / sum(HOURLY_SHAPE) / slots_per_hour
+                shape = [s * scale for s in HOURLY_SHAPE]
+                day_factors = [meter_rng.uniform(0.8, 1.2) for _ in range(days)]
+                rand = meter_rng.random
+                hour_total = 0.0
+                for i, (ts, hour, day, hour_ts) in enumerate(slots):
+                    kwh = round(shape[hour] * day_factors[day] * (0.7 + 0.6 * rand()), 4)
+                    readings.add((meter_id, ts, kwh))
+                    if with_consumption:
+                        hour_total += kwh
+                        if (i + 1) % slots_per_hour == 0:
+                            consumption.add((u, meter_id, hour_ts, round(hour_total, 4)))
+                            hour_total = 0.0
+        readings.flush()
+        consumption.flush()
+
+        ev = BulkWriter(raw, dialect, "ev_charging_sessions", ["user_id", "start_time", "end_time", "energy_kwh", "cost"])
+        ev_rng = random.Random(f"{seed}:ev")
+        for u in range(user_offset + 1, user_offset + users + 1):
+            if ev_rng.random() >= ev_share:
+                continue
+            for _ in range(int(days / 7 * ev_sessions_per_week)):
+                session_start = start_dt + timedelta(days=ev_rng.randrange(days), hours=ev_rng.choice([17, 18, 19, 20, 21, 22]),
+                                                     minutes=ev_rng.randrange(60))
+                duration = timedelta(minutes=ev_rng.randrange(90, 360))
+                energy = round(ev_rng.uniform(5.0, 40.0), 2)
+                # Same even split across hour buckets as the EV endpoint
+                cost, cursor = 0.0, session_start.replace(minute=0)
+                while cursor < session_start + duration:
+                    overlap = min(cursor + timedelta(hours=1), session_start + duration) - max(cursor, session_start)
+                    cost += energy * (overlap / duration) * prices.get(cursor, 0.0)
+                    cursor += timedelta(hours=1)
+                ev.add((u, format_ts(session_start, dialect), format_ts(session_start + duration, dialect), energy, round(cost, 6)))
+        ev.flush()
+
+        if dialect == "postgresql":
+            cursor = raw.cursor()
+            for table in EXPLICIT_ID_TABLES:
+                # Otherwise the next POST /users/ or /meters/ draws an id the load already used
+                cursor.execute(f"SELECT setval(pg_get_serial_sequence('{table}', 'id'), "
+                               f"COALESCE(MAX(id), 1), MAX(id) IS NOT NULL) FROM {table}")
+            cursor.close()
+            raw.commit()
+    finally:
+        raw.close()
+
+    # Rows went in underneath the ORM; a pricing bump retires every cached bill and summary
+    scopes = [PRICING_SCOPE]
+    if reset:
+        # Ids are reused from 1, and scopes the old data never bumped are still at the version they had
+        scopes += [user_scope(u) for u in range(user_offset + 1, user_offset + users + 1)]
+        scopes += [meter_scope(m) for m in range(meter_offset + 1, meter_offset + users * meters_per_user + 1)]
+    db = SessionLocal()
+    try:
+        for i in range(0, len(scopes), VERSION_BATCH):
+            bump_versions(db, *scopes[i:i + VERSION_BATCH])
+        db.commit()
+    finally:
+        db.close()
+
+    return {
+        "users": users,
+        "meters": users * meters_per_user,
+        "readings": readings.written,
+        "consumption_rows": consumption.written,
+        "pricing_hours": pricing.written,
+        "ev_sessions": ev.written
+    }
+
+
+def seed():
+    """Small default dataset for local development."""
+    return generate(users=5, meters_per_user=1, start=date.today() - timedelta(days=7), days=7, resolution="hourly")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Generate a deterministic synthetic GreenVolt dataset.")
+    parser.add_argument("--users", type=int, default=5)
+    parser.add_argument("--meters-per-user", type=int, default=1)
+    parser.add_argument("--start", type=date.fromisoformat, default=date.today() - timedelta(days=7),
+                        help="First day of readings (YYYY-MM-DD)")
+    parser.add_argument("--days", type=int, default=7)
+    parser.add_argument("--resolution", choices=sorted(RESOLUTIONS), default="hourly")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--ev-share", type=float, default=0.3, help="Fraction of users with an EV")
+    parser.add_argument("--ev-sessions-per-week", type=float, default=3.0)
+    parser.add_argument("--consumption", action="store_true", help="Also write hourly totals to consumptions")
+    parser.add_argument("--reset", action="store_true", help="Delete all existing data (users, meters, readings, prices, invoices, archived months, ...) first")
+    args = parser.parse_args(argv)
+
+    t0 = time.perf_counter()
+    counts = generate(args.users, args.meters_per_user, args.start, args.days, args.resolution, seed=args.seed,
+                      ev_share=args.ev_share, ev_sessions_per_week=args.ev_sessions_per_week,
+                      with_consumption=args.consumption, reset=args.reset)
+    elapsed = time.perf_counter() - t0
+    print(f"✅ Generated {counts} in {elapsed:.1f}s ({counts['readings'] / max(elapsed, 1e-9):,.0f} readings/s)")
 
-    # # --- Clear existing data (optional, comment if you don’t want reset each time) ---
-    # db.query(EVChargingSession).delete()
-    # db.query(Consumption).delete()
-    # db.query(Pricing).delete()
-    # db.query(SmartMeter).delete()
-    # db.query(User).delete()
-    # db.commit()
-
-    # --- Create a User ---
-    user = User(name="Alice", email="alice@example.com", password="secure123")
-    db.add(user)
-    db.commit()
-    db.refresh(user)
-
-    # --- Create a Smart Meter ---
-    meter = SmartMeter(serial_number="SM-001", location="Berlin", user_id=user.id)
-    db.add(meter)
-    db.commit()
-    db.refresh(meter)
-
-    # --- Add Consumption Data (2 hours) ---
-    ts1 = datetime(2025, 8, 15, 10, 0, 0)
-    ts2 = datetime(2025, 8, 15, 11, 0, 0)
-
-    c1 = Consumption(user_id=user.id, smart_meter_id=meter.id, timestamp=ts1, energy_kwh=5.2)
-    c2 = Consumption(user_id=user.id, smart_meter_id=meter.id, timestamp=ts2, energy_kwh=3.8)
-    db.add_all([c1, c2])
-    db.commit()
-
-    # --- Add Pricing Data ---
-    p1 = Pricing(date=ts1, price_per_kwh=0.25)
-    p2 = Pricing(date=ts2, price_per_kwh=0.30)
-    db.add_all([p1, p2])
-    db.commit()
-
-    # --- Add EV Charging Session ---
-    ev = EVChargingSession(
-        user_id=user.id,
-        start_time=datetime(2025, 8, 15, 9, 0, 0),
-        end_time=datetime(2025, 8, 15, 11, 0, 0),
-        energy_kwh=12.5,
-        cost=3.5
-    )
-    db.add(ev)
-    db.commit()
-
-    print("✅ Database seeded with test data!")
 
 if __name__ == "__main__":
-    seed()
+    main()
@@ -0,0 +1,135 @@
+import json
+import logging
+import os
+import threading
+import time
+
+from greenvolt_api.instrumentation import add_query_listener, current_stats
+
+logger = logging.getLogger("greenvolt.slow_query")
+
+# GREENVOLT_SLOW_QUERY_MS <= 0 disables the log
+SLOW_QUERY_MS = float(os.getenv("GREENVOLT_SLOW_QUERY_MS", "200"))
+# At most this many slow-query records per minute; the rest are counted and reported with the next record
+MAX_RECORDS_PER_MINUTE = int(os.getenv("GREENVOLT_SLOW_QUERY_PER_MINUTE", "60"))
+# The same statement is EXPLAINed at most once per this many seconds
+EXPLAIN_INTERVAL_SECONDS = float(os.getenv("GREENVOLT_SLOW_QUERY_EXPLAIN_INTERVAL", "300"))
+MAX_PARAM_CHARS = 2000
+
+
+class RateLimiter:
+    """Token bucket refilled continuously at ``per_minute`` tokens per minute."""
+
+    def __init__(self, per_minute: int):
+        self.capacity = float(per_minute)
+        self.tokens = float(per_minute)
+        self.updated = time.monotonic()
+        self.suppressed = 0
+        self._lock = threading.Lock()
+
+    def acquire(self) -> tuple[bool, int]:
+        """(allowed, records suppressed since the last allowed one)."""
+        with self._lock:
+            now = time.monotonic()
+            self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.capacity / 60)
+            self.updated = now
+            if self.tokens < 1:
+                self.suppressed += 1
+                return False, 0
+            self.tokens -= 1
+            suppressed, self.suppressed = self.suppressed, 0
+            return True, suppressed
+
+
+_limiter = RateLimiter(MAX_RECORDS_PER_MINUTE)
+_last_explained: dict[str, float] = {}
+_explain_lock = threading.Lock()
+
+
+def _should_explain(statement: str) -> bool:
+    if not statement.lstrip().upper().startswith(("SELECT", "WITH")):
+        return False
+    now = time.monotonic()
+    with _explain_lock:
+        last = _last_explained.get(statement)
+        if last is not None and now - last < EXPLAIN_INTERVAL_SECONDS:
+            return False
+        if len(_last_explained) > 10_000:  # IN (...) lists make many distinct texts
+            _last_explained.clear()
+        _last_explained[statement] = now
+        return True
+
+
+def explain(conn, cursor, statement: str, parameters):
+    """Plan for a statement that just ran, fetched on a fresh DBAPI cursor of the same connection.
+
+    Raw DBAPI cursors don't fire engine events, so this never recurses into the slow-query log.
+    On Postgres the EXPLAIN runs inside a savepoint: a failing statement would otherwise abort the
+    request's transaction and fail everything it runs afterwards.
+    """
+    dialect = conn.dialect.name
+    if dialect == "sqlite":
+        prefix = "EXPLAIN QUERY PLAN "
+    elif dialect == "postgresql":
+        prefix = "EXPLAIN "
+    else:
+        return None
+
+    dbapi_conn = cursor.connection
+    # Outside a transaction (autocommit) a failure aborts nothing, and SAVEPOINT is not allowed
+    savepoint = dialect == "postgresql" and not getattr(dbapi_conn, "autocommit", False)
+    explain_cursor = dbapi_conn.cursor()
+    try:
+        if savepoint:
+            explain_cursor.execute("SAVEPOINT greenvolt_explain")
+        try:
+            explain_cursor.execute(prefix + statement, parameters)
+            rows = explain_cursor.fetchall()
+        except Exception as e:  # never let diagnostics break the request
+            if savepoint:
+                explain_cursor.execute("ROLLBACK TO SAVEPOINT greenvolt_explain")
+            return f"EXPLAIN failed: {e}"
+        finally:
+            if savepoint:
+                explain_cursor.execute("RELEASE SAVEPOINT greenvolt_explain")
+    finally:
+        explain_cursor.close()
+
+    if dialect == "sqlite":
+        # (id, parent, notused, detail)
+        return [row[-1] for row in rows]
+    return [row[0] for row in rows]
+
+
+def _format_parameters(parameters, executemany: bool):
+    if executemany:
+        return {"batches": len(parameters), "first": repr(parameters[0])[:MAX_PARAM_CHARS] if parameters else None}
+    return repr(parameters)[:MAX_PARAM_CHARS]
+
+
+def log_slow_query(conn, cursor, statement, parameters, executemany, elapsed) -> None:
+    if elapsed * 1000 < SLOW_QUERY_MS:
+        return
+    allowed, suppressed = _limiter.acquire()
+    if not allowed:
+        return
+
+    stats = current_stats.get()
+    record = {
+        "event": "slow_query",
+        "duration_ms": round(elapsed * 1000, 2),
+        "threshold_ms": SLOW_QUERY_MS,
+        "statement": statement,
+        "parameters": _format_parameters(parameters, executemany),
+        "method": stats.method if stats else None,
+        "route": stats.route if stats else None,
+        "suppressed_since_last": suppressed
+    }
+    if not executemany and _should_explain(statement):
+        record["plan"] = explain(conn, cursor, statement, parameters)
+    logger.warning(json.dumps(record, default=str))
+
+
+def install_slow_query_log() -> None:
+    if SLOW_QUERY_MS > 0:
+        add_query_listener(log_slow_query)
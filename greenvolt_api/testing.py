@@ -0,0 +1,18 @@
+"""Pytest helpers. Enable with ``pytest_plugins = ["greenvolt_api.testing"]`` in a conftest."""
+import pytest
+
+from greenvolt_api.instrumentation import assert_max_queries
+
+
+@pytest.fixture
+def query_budget():
+    """Fail the test when a request made inside the block exceeds its query budget.
+
+        def test_bill(client, query_budget):
+            with query_budget(6):
+                client.get("/billing/1", params=...)
+    """
+    def budget(limit: int):
+        return assert_max_queries(limit)
+
+    return budget
@@ -0,0 +1,59 @@
+from sqlalchemy.orm import Session
+
+from greenvolt_api.models import DataVersion, SmartMeter
+
+PRICING_SCOPE = "pricing"
+METERS_SCOPE = "meters"  # bumped when a meter or its user is deleted; invalidates the ownership maps
+ARCHIVE_SCOPE = "archive"  # bumped when readings move to the cold archive; startup then expects its files
+
+
+def user_scope(user_id: int) -> str:
+    return f"user:{user_id}"
+
+
+def meter_scope(meter_id: int) -> str:
+    return f"meter:{meter_id}"
+
+
+def meter_data_scopes(db: Session, meter_ids) -> list[str]:
+    """Scopes to bump when stored readings of these meters change: each meter and its owner."""
+    meter_ids = set(meter_ids)
+    if not meter_ids:
+        return []
+    owners = {u for (u,) in db.query(SmartMeter.user_id).filter(SmartMeter.id.in_(meter_ids)) if u is not None}
+    return [meter_scope(m) for m in meter_ids] + [user_scope(u) for u in owners]
+
+
+def bump_versions(db: Session, *scopes: str) -> None:
+    """Increment the data version of each scope inside the caller's transaction."""
+    scopes = sorted(set(scopes))  # stable lock order, and Postgres rejects duplicate conflict targets
+    if not scopes:
+        return
+
+    dialect = db.get_bind().dialect.name
+    if dialect == "postgresql":
+        from sqlalchemy.dialects.postgresql import insert
+    elif dialect == "sqlite":
+        from sqlalchemy.dialects.sqlite import insert
+    else:
+        for scope in scopes:
+            updated = db.query(DataVersion).filter(DataVersion.scope == scope).update(
+                {DataVersion.version: DataVersion.version + 1}, synchronize_session=False
+            )
+            if not updated:
+                db.add(DataVersion(scope=scope, version=1))
+        db.flush()
+        return
+
+    stmt = insert(DataVersion).values([{"scope": s, "version": 1} for s in scopes])
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[DataVersion.scope],
+        set_={"version": DataVersion.version + 1}
+    )
+    db.execute(stmt)
+
+
+def get_versions(db: Session, *scopes: str) -> tuple[int, ...]:
+    """Current version of each scope, in order. Scopes never written are at version 0."""
+    rows = dict(db.query(DataVersion.scope, DataVersion.version).filter(DataVersion.scope.in_(scopes)).all())
+    return tuple(rows.get(s, 0) for s in scopes)
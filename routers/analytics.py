@@ -1,10 +1,14 @@
 from datetime import datetime, date
 
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Request, Response
 from sqlalchemy import func
 
+from greenvolt_api.cache import cache_key, result_cache
 from greenvolt_api.database import get_db
-from greenvolt_api.models import User, Pricing, SmartMeterReading, EVChargingSession
+from greenvolt_api.etag import conditional_response, make_etag
+from greenvolt_api.models import User, Pricing, EVChargingSession
+from greenvolt_api.readings_source import load_readings
+from greenvolt_api.versions import PRICING_SCOPE, get_versions, user_scope
 from routers.users import get_current_user
 from sqlalchemy.orm import Session
 
@@ -31,12 +35,24 @@ def analytics_summary(
     user_id: int,
     start: date,
     end: date,
+    request: Request,
+    response: Response,
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_user)
 ):
     if current_user.id != user_id:
         raise HTTPException(status_code=403, detail="Not authorized")
 
+    versions = get_versions(db, user_scope(user_id), PRICING_SCOPE)
+    not_modified = conditional_response(request, response, make_etag("analytics", user_id, start, end, *versions))
+    if not_modified:
+        return not_modified
+
+    key = cache_key("analytics", user_id, start, end, versions)
+    return result_cache.get_or_compute(key, lambda: compute_summary(db, user_id, start, end))
+
+
+def compute_summary(db: Session, user_id: int, start: date, end: date) -> dict:
     user = db.query(User).filter(User.id == user_id).first()
     if not user:
         raise HTTPException(status_code=404, detail="User not found")
@@ -57,12 +73,9 @@ def analytics_summary(
             "co2_offset_kg": 0.0
         }
 
-    # Readings in range
-    readings = db.query(SmartMeterReading).filter(
-        SmartMeterReading.meter_id.in_(meter_ids),
-        SmartMeterReading.timestamp >= datetime.combine(start, datetime.min.time()),
-        SmartMeterReading.timestamp <= datetime.combine(end,   datetime.max.time())
-    ).all()
+    # Readings in range, raw or compacted
+    readings = load_readings(db, meter_ids, datetime.combine(start, datetime.min.time()),
+                             datetime.combine(end, datetime.max.time()))
 
     # EV kWh in range (simple inclusion by start_time)
     ev_kwh = db.query(func.sum(EVChargingSession.energy_kwh)).filter(
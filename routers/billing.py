@@ -1,23 +1,50 @@
-from collections import defaultdict
 from datetime import date
 
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Request, Response
 
+from greenvolt_api.billing import (
+    as_datetime, bill_summary, find_invoice, hour_floor, hourly_line_items, load_rates, missing_rate_hours
+)
+from greenvolt_api.cache import cache_key, result_cache
 from greenvolt_api.database import get_db
-from greenvolt_api.models import SmartMeter, User, Pricing, SmartMeterReading
+from greenvolt_api.etag import conditional_response, make_etag
+from greenvolt_api.responses import fast_json
+from greenvolt_api.models import SmartMeter, User
+from greenvolt_api.readings_source import load_readings
+from greenvolt_api.schemas import BillingBreakdown, HOURLY_BILLING_BREAKDOWN, HourlyBillingBreakdown
+from greenvolt_api.versions import PRICING_SCOPE, get_versions, user_scope
 from routers.users import get_current_user
 from sqlalchemy.orm import Session
 
 router = APIRouter()
 
-@router.get("/{user_id}")
+@router.get("/{user_id}", response_model=BillingBreakdown)
 def calculate_bill_with_breakdown(
     user_id: int,
     start: date,
     end: date,
+    request: Request,
+    response: Response,
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_user)
 ):
+    versions = get_versions(db, user_scope(user_id), PRICING_SCOPE)
+    not_modified = conditional_response(request, response, make_etag("bill", user_id, start, end, *versions))
+    if not_modified:
+        return not_modified
+
+    key = cache_key("bill", user_id, start, end, versions)
+    # Validated once while it is built; encode directly rather than validating it again
+    return fast_json(result_cache.get_or_compute(key, lambda: compute_bill(db, user_id, start, end)), response)
+
+
+def compute_bill(db: Session, user_id: int, start: date, end: date) -> dict:
+    # Closed periods are billed by the billing run; serve the stored invoice unless late readings
+    # made it stale, until the late-data pass has corrected it
+    invoice = find_invoice(db, user_id, start, end)
+    if invoice and not invoice.stale:
+        return bill_summary(user_id, start, end, invoice.line_items)
+
     # Get user's meters
     meters = db.query(SmartMeter).filter(SmartMeter.user_id == user_id).all()
     if not meters:
@@ -25,69 +52,38 @@ def calculate_bill_with_breakdown(
 
     meter_ids = [m.id for m in meters]
 
-    # Get readings in date range
-    readings = db.query(SmartMeterReading).filter(
-        SmartMeterReading.meter_id.in_(meter_ids),
-        SmartMeterReading.timestamp >= start,
-        SmartMeterReading.timestamp <= end
-    ).all()
+    # Get readings in date range; bind datetimes like the billing run does, so the live bill
+    # covers the same instants as a stored invoice (SQLite compares a bare date as text)
+    start_dt, end_dt = as_datetime(start), as_datetime(end)
+    readings = load_readings(db, meter_ids, start_dt, end_dt)
 
     if not readings:
-        return {
-            "user_id": user_id,
-            "total_kwh": 0,
-            "total_cost": 0,
-            "co2_avoided_kg": 0,
-            "daily_breakdown": []
-        }
+        return bill_summary(user_id, start, end, [])
 
-    total_kwh = 0
-    total_cost = 0
-    daily_data = defaultdict(lambda: {"kwh": 0, "cost": 0})
-
-    EMISSIONS_FACTOR_KG_PER_KWH = 0.4
-
-    for reading in readings:
-        # Round timestamp to hour for matching pricing
-        rate = db.query(Pricing).filter(
-            Pricing.date == reading.timestamp.replace(minute=0, second=0, microsecond=0)
-        ).first()
-        price = rate.price_per_kwh if rate else 0
-
-        day = reading.timestamp.date()
-        daily_data[day]["kwh"] += reading.energy_kwh
-        daily_data[day]["cost"] += reading.energy_kwh * price
-
-        total_kwh += reading.energy_kwh
-        total_cost += reading.energy_kwh * price
-
-    daily_breakdown = [
-        {
-            "date": day.isoformat(),
-            "kwh": round(data["kwh"], 2),
-            "cost": round(data["cost"], 2),
-            "co2_avoided_kg": round(data["kwh"] * EMISSIONS_FACTOR_KG_PER_KWH, 2)
-        }
-        for day, data in sorted(daily_data.items())
-    ]
-
-    return {
-        "user_id": user_id,
-        "start_date": start,
-        "end_date": end,
-        "total_kwh": round(total_kwh, 2),
-        "total_cost": round(total_cost, 2),
-        "co2_avoided_kg": round(total_kwh * EMISSIONS_FACTOR_KG_PER_KWH, 2),
-        "daily_breakdown": daily_breakdown
-    }
+    # One pricing query for the whole range instead of one per reading
+    rates = load_rates(db, start_dt, end_dt)
+    return bill_summary(user_id, start, end, hourly_line_items(readings, rates))
 
 
 
-@router.get("/{user_id}/detailed_hourly")
+@router.get("/{user_id}/detailed_hourly", response_model=HourlyBillingBreakdown)
 def calculate_hourly_bill(user_id: int,
                           start: date, end: date,
+                          request: Request,
+                          response: Response,
                           db: Session = Depends(get_db),
                           current_user: User = Depends(get_current_user)):
+    versions = get_versions(db, user_scope(user_id), PRICING_SCOPE)
+    not_modified = conditional_response(request, response, make_etag("bill_hourly", user_id, start, end, *versions))
+    if not_modified:
+        return not_modified
+
+    key = cache_key("bill_hourly", user_id, start, end, versions)
+    # One entry per reading: encode directly rather than through jsonable_encoder
+    return fast_json(result_cache.get_or_compute(key, lambda: compute_hourly_bill(db, user_id, start, end)), response)
+
+
+def compute_hourly_bill(db: Session, user_id: int, start: date, end: date) -> dict:
     # Get all user's meters
     meters = db.query(SmartMeter).filter(SmartMeter.user_id == user_id).all()
     if not meters:
@@ -96,55 +92,47 @@ def calculate_hourly_bill(user_id: int,
     meter_ids = [m.id for m in meters]
 
     # Get all readings in the date range
-    readings = db.query(SmartMeterReading).filter(
-        SmartMeterReading.meter_id.in_(meter_ids),
-        SmartMeterReading.timestamp >= start,
-        SmartMeterReading.timestamp <= end
-    ).all()
-
-    if not readings:
-        return {"user_id": user_id, "total_kwh": 0, "total_cost": 0, "daily_breakdown": [], "hourly_breakdown": []}
+    start_dt, end_dt = as_datetime(start), as_datetime(end)
+    readings = load_readings(db, meter_ids, start_dt, end_dt)
+    rates = load_rates(db, start_dt, end_dt) if readings else {}
 
     daily_breakdown = {}
     hourly_breakdown = []
     total_kwh = 0
     total_cost = 0
 
-    for reading in readings:
+    for meter_id, timestamp, energy_kwh in readings:
         # Hourly cost
-        rate = db.query(Pricing).filter(
-            Pricing.date == reading.timestamp.replace(minute=0, second=0, microsecond=0)
-        ).first()
-        price = rate.price_per_kwh if rate else 0
-        cost = reading.energy_kwh * price
+        price = rates.get(hour_floor(timestamp), 0)
+        cost = energy_kwh * price
 
-        total_kwh += reading.energy_kwh
+        total_kwh += energy_kwh
         total_cost += cost
 
         # Daily aggregation
-        day_str = reading.timestamp.date().isoformat()
-        if day_str not in daily_breakdown:
-            daily_breakdown[day_str] = {"kwh": 0, "cost": 0}
-        daily_breakdown[day_str]["kwh"] += reading.energy_kwh
-        daily_breakdown[day_str]["cost"] += cost
+        day = timestamp.date()
+        if day not in daily_breakdown:
+            daily_breakdown[day] = {"kwh": 0, "cost": 0}
+        daily_breakdown[day]["kwh"] += energy_kwh
+        daily_breakdown[day]["cost"] += cost
 
         # Hourly entry
-        hourly_breakdown.append({
-            "timestamp": reading.timestamp.isoformat(),
-            "kwh": reading.energy_kwh,
-            "cost": round(cost, 2)
-        })
+        hourly_breakdown.append({"timestamp": timestamp, "kwh": energy_kwh, "cost": round(cost, 2)})
 
     # Convert daily breakdown to a sorted list
     daily_breakdown_list = [{"date": k, "kwh": v["kwh"], "cost": round(v["cost"], 2)}
                             for k, v in sorted(daily_breakdown.items())]
 
-    return {
+    items = hourly_line_items(readings, rates)
+    breakdown = HOURLY_BILLING_BREAKDOWN.validate_python({
         "user_id": user_id,
         "start_date": start,
         "end_date": end,
         "total_kwh": total_kwh,
         "total_cost": round(total_cost, 2),
+        "missing_rate_hours": missing_rate_hours((i["timestamp"] for i in items), rates),
         "daily_breakdown": daily_breakdown_list,
+        "items": items,
         "hourly_breakdown": hourly_breakdown
-    }
\ No newline at end of file
+    })
+    return HOURLY_BILLING_BREAKDOWN.dump_python(breakdown, exclude_none=True)
@@ -6,8 +6,13 @@ from datetime import datetime
 from sqlalchemy.orm import Session
 
 from greenvolt_api.database import get_db
-from greenvolt_api.models import SmartMeter, User, Consumption
+from greenvolt_api.hot_cache import meter_owners
+from greenvolt_api.ingest import unique_rows, upsert
+from greenvolt_api.ingest_buffer import buffered_response, ingest_buffer
+from greenvolt_api.metrics import INGEST_ROWS
+from greenvolt_api.models import User, Consumption
 from greenvolt_api.schemas import ConsumptionOut, ConsumptionCreate
+from greenvolt_api.versions import bump_versions, user_scope
 
 router = APIRouter()
 
@@ -15,25 +20,29 @@ router = APIRouter()
 
 @router.post("/", response_model=ConsumptionOut)
 def create_consumption(consumption: ConsumptionCreate, db: Session = Depends(get_db)):
-    user = db.query(User).filter(User.id == consumption.user_id).first()
-    if not user:
-        raise HTTPException(status_code=404, detail="User not found")
-
-    meter = db.query(SmartMeter).filter(SmartMeter.id == consumption.smart_meter_id,
-                                        SmartMeter.user_id == consumption.user_id).first()
-    if not meter:
+    if meter_owners.owner(db, consumption.smart_meter_id) != consumption.user_id:
         raise HTTPException(status_code=404, detail="Smart meter not found for this user")
 
-    new_consumption = Consumption(
-        user_id=consumption.user_id,
-        smart_meter_id=consumption.smart_meter_id,
-        timestamp=consumption.timestamp,
-        energy_kwh=consumption.energy_kwh
-    )
-    db.add(new_consumption)
+    row = {"user_id": consumption.user_id, "smart_meter_id": consumption.smart_meter_id,
+           "timestamp": consumption.timestamp, "energy_kwh": consumption.energy_kwh}
+    if ingest_buffer.running:
+        return buffered_response("consumption", row, (user_scope(consumption.user_id),))
+
+    stmt = upsert(db.get_bind().dialect.name, Consumption).values(**row).returning(Consumption.id)
+    consumption_id = db.execute(stmt).scalar()
+    if consumption_id is None:
+        # Replayed (meter, timestamp) under the "ignore" policy: answer with the stored row
+        stored = db.query(Consumption).filter(
+            Consumption.smart_meter_id == consumption.smart_meter_id,
+            Consumption.timestamp == consumption.timestamp
+        ).first()
+        db.rollback()
+        return stored
+
+    bump_versions(db, user_scope(consumption.user_id))
     db.commit()
-    db.refresh(new_consumption)
-    return new_consumption
+    INGEST_ROWS.inc(("consumption",))
+    return {"id": consumption_id, **row}
 
 
 @router.get("/{user_id}", response_model=List[ConsumptionOut])
@@ -61,22 +70,30 @@ def bulk_consumption_upload(consumptions: List[ConsumptionCreate], db: Session =
     if not consumptions:
         raise HTTPException(status_code=400, detail="Empty consumption list")
 
-    results = []
-    for c in consumptions:
-        new_record = Consumption(
-            user_id=c.user_id,
-            smart_meter_id=c.smart_meter_id,
-            timestamp=c.timestamp,
-            energy_kwh=c.energy_kwh
-        )
-        db.add(new_record)
-        db.commit()
-        db.refresh(new_record)
-        results.append({
-            "id": new_record.id,
-            "timestamp": new_record.timestamp,
-            "energy_kwh": new_record.energy_kwh
+    # Every (user, meter) pair in one lookup: the ownership map, plus one query for meters it hasn't seen
+    owners = meter_owners.owners_of(db, {c.smart_meter_id for c in consumptions})
+    invalid = [
+        {"index": i, "user_id": c.user_id, "smart_meter_id": c.smart_meter_id}
+        for i, c in enumerate(consumptions) if owners.get(c.smart_meter_id) != c.user_id
+    ]
+    if invalid:
+        raise HTTPException(status_code=422, detail={
+            "message": "Smart meter not found for this user",
+            "invalid_count": len(invalid),
+            "rows": invalid[:100]
         })
 
-    return {"uploaded_count": len(results), "details": results}
+    # One multi-row upsert; rows that replay a stored (meter, timestamp) come back only when overwritten
+    rows = unique_rows(Consumption, [c.model_dump() for c in consumptions])
+    stmt = upsert(db.get_bind().dialect.name, Consumption).returning(
+        Consumption.id, Consumption.timestamp, Consumption.energy_kwh
+    )
+    results = [row._asdict() for row in db.execute(stmt, rows)]
+
+    if results:
+        bump_versions(db, *(user_scope(c.user_id) for c in consumptions))
+    db.commit()
+    INGEST_ROWS.inc(("consumption",), len(results))
+
+    return {"uploaded_count": len(results), "duplicates": len(consumptions) - len(results), "details": results}
 
@@ -1,8 +1,10 @@
 from datetime import datetime, timedelta, date
 from greenvolt_api.schemas import EVChargingCreate
 from sqlalchemy.orm import Session
-from greenvolt_api.models import User, Pricing, EVChargingSession
+from greenvolt_api.models import User, EVChargingSession
 from greenvolt_api.database import get_db
+from greenvolt_api.hot_cache import day_prices
+from greenvolt_api.versions import bump_versions, user_scope
 from routers.users import get_current_user
 from fastapi import APIRouter, Depends, HTTPException
 
@@ -12,11 +14,6 @@ router = APIRouter()
 def hour_floor(dt: datetime) -> datetime:
     return dt.replace(minute=0, second=0, microsecond=0)
 
-def get_rate_for_hour(db: Session, dt: datetime) -> float:
-    """Return price for the hour starting at dt (floored to the hour). Missing rate -> 0."""
-    hour = hour_floor(dt)
-    rate = db.query(Pricing).filter(Pricing.date == hour).first()
-    return rate.price_per_kwh if rate else 0.0
 
 
 
@@ -38,6 +35,8 @@ def create_ev_charging_session(session: EVChargingCreate,
     duration_sec = (end_time - start_time).total_seconds()
     energy_total = session.energy_kwh
     cost_total = 0.0
+    # One lookup for the whole session; sessions within today come from the warm price cache
+    rates = day_prices.rates(db, start_time, end_time)
 
     # Iterate hour by hour over the interval
     cursor = hour_floor(start_time)
@@ -55,7 +54,7 @@ def create_ev_charging_session(session: EVChargingCreate,
         seg_sec = max(0.0, (seg_end - seg_start).total_seconds())
         if seg_sec > 0 and duration_sec > 0:
             seg_energy = energy_total * (seg_sec / duration_sec)
-            price = get_rate_for_hour(db, cursor)  # price for this hour
+            price = rates.get(cursor, 0.0)  # price for this hour; missing rate -> 0
             cost_total += seg_energy * price
         cursor = next_hour
 
@@ -68,6 +67,7 @@ def create_ev_charging_session(session: EVChargingCreate,
     )
 
     db.add(new_session)
+    bump_versions(db, user_scope(session.user_id))
     db.commit()
     db.refresh(new_session)
 
@@ -0,0 +1,22 @@
+from fastapi import APIRouter
+
+from greenvolt_api.health import readiness
+from greenvolt_api.responses import FastJSONResponse
+
+router = APIRouter()
+
+
+@router.get("/live")
+async def liveness():
+    """The process is up and serving requests; says nothing about its dependencies.
+
+    Runs on the event loop, so it still answers while every threadpool worker is busy.
+    """
+    return {"status": "alive"}
+
+
+@router.get("/ready")
+def readiness_check():
+    """200 when every critical probe passes, 503 otherwise, so load balancers can steer traffic away."""
+    ready, report = readiness()
+    return FastJSONResponse(report, status_code=200 if ready else 503, headers={"Cache-Control": "no-store"})
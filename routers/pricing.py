@@ -3,7 +3,9 @@ from greenvolt_api.schemas import BulkPricingCreate
 from routers.users import get_current_user
 from sqlalchemy.orm import Session
 from greenvolt_api.database import get_db
+from greenvolt_api.metrics import INGEST_ROWS
 from greenvolt_api.models import Pricing, User
+from greenvolt_api.versions import PRICING_SCOPE, bump_versions
 from typing import List
 
 router = APIRouter()
@@ -31,4 +33,9 @@ def bulk_pricing_upload(prices: List[BulkPricingCreate],
             db.refresh(new_rate)
             results.append({"id": new_rate.id, "date": new_rate.date, "price_per_kwh": new_rate.price_per_kwh, "status": "added"})
 
+    # New rates change every user's bills and analytics
+    bump_versions(db, PRICING_SCOPE)
+    db.commit()
+    INGEST_ROWS.inc(("pricing",), len(results))
+
     return {"uploaded_count": len(results), "details": results}
@@ -1,13 +1,26 @@
-from fastapi import APIRouter, Depends, HTTPException
-from datetime import datetime, date
+from typing import List
+
+from fastapi import APIRouter, Depends, HTTPException, Request, Response
+from datetime import datetime, date, timedelta
 
 from sqlalchemy import func
 from sqlalchemy.orm import Session
 
 from greenvolt_api.database import get_db
+from greenvolt_api.etag import conditional_response, make_etag
+from greenvolt_api.gaps import INTERVAL_MINUTES, find_gaps
+from greenvolt_api.hot_cache import meter_owners
+from greenvolt_api.ingest import upsert
+from greenvolt_api.ingest_buffer import buffered_response, ingest_buffer
+from greenvolt_api.late_data import late_windows, mark_late
+from greenvolt_api.registers import ingest_registers
+from greenvolt_api.metrics import INGEST_ROWS
+from greenvolt_api.responses import fast_json
+from greenvolt_api.retention import check_raw_horizon
 from greenvolt_api.models import SmartMeter, SmartMeterReading, User
+from greenvolt_api.versions import bump_versions, get_versions, meter_scope, user_scope
 from routers.users import get_current_user
-from greenvolt_api.schemas import ReadingCreate
+from greenvolt_api.schemas import ReadingCreate, RegisterReadingCreate
 
 router = APIRouter()
 
@@ -15,38 +28,116 @@ router = APIRouter()
 def create_reading(reading: ReadingCreate,
                    db: Session = Depends(get_db),
                    current_user: User = Depends(get_current_user)):
-    meter = db.query(SmartMeter).filter(SmartMeter.id == reading.meter_id).first()
-    if not meter:
+    owner_id = meter_owners.owner(db, reading.meter_id)
+    if owner_id is None:
         raise HTTPException(status_code=404, detail="Smart meter not found")
 
-    new_reading = SmartMeterReading(
-        meter_id=reading.meter_id,
-        energy_kwh=reading.energy_kwh,
-        timestamp=reading.timestamp or datetime.utcnow()
-    )
-
-    db.add(new_reading)
+    timestamp = reading.timestamp or datetime.utcnow()
+    horizon = check_raw_horizon([timestamp])
+    if horizon is not None:
+        raise HTTPException(status_code=422, detail=f"Readings before {horizon} are past raw retention")
+    row = {"meter_id": reading.meter_id, "energy_kwh": reading.energy_kwh, "timestamp": timestamp}
+    if ingest_buffer.running:
+        return buffered_response("reading", row, (user_scope(owner_id), meter_scope(reading.meter_id)))
+
+    stmt = upsert(db.get_bind().dialect.name, SmartMeterReading).values(**row).returning(SmartMeterReading.id)
+    reading_id = db.execute(stmt).scalar()
+    if reading_id is None:
+        # Replay of a stored reading under the "ignore" policy: nothing changed, nothing to invalidate
+        stored = db.query(SmartMeterReading.id, SmartMeterReading.energy_kwh).filter(
+            SmartMeterReading.meter_id == reading.meter_id,
+            SmartMeterReading.timestamp == timestamp
+        ).first()
+        db.rollback()
+        return {"id": stored.id, "meter_id": reading.meter_id, "energy_kwh": stored.energy_kwh,
+                "timestamp": timestamp, "duplicate": True}
+
+    mark_late(db, late_windows([(reading.meter_id, timestamp)]), {reading.meter_id: owner_id})
+    bump_versions(db, user_scope(owner_id), meter_scope(reading.meter_id))
     db.commit()
-    db.refresh(new_reading)
-
-    return {
-        "id": new_reading.id,
-        "meter_id": new_reading.meter_id,
-        "energy_kwh": new_reading.energy_kwh,
-        "timestamp": new_reading.timestamp
-    }
+    INGEST_ROWS.inc(("reading",))
+
+    return {"id": reading_id, **row}
+
+
+@router.post("/register/bulk/")
+def ingest_register_readings(readings: List[RegisterReadingCreate],
+                             db: Session = Depends(get_db),
+                             current_user: User = Depends(get_current_user)):
+    """Cumulative register values; interval energy is derived per meter and stored as readings."""
+    if not readings:
+        raise HTTPException(status_code=400, detail="Empty register list")
+
+    meter_ids = {r.meter_id for r in readings}
+    owners = meter_owners.owners_of(db, meter_ids)
+    unknown = sorted(meter_ids - owners.keys())
+    if unknown:
+        raise HTTPException(status_code=422, detail={"message": "Smart meter not found", "meter_ids": unknown[:100]})
+    horizon = check_raw_horizon(r.timestamp for r in readings)
+    if horizon is not None:
+        raise HTTPException(status_code=422, detail=f"Readings before {horizon} are past raw retention")
+
+    result = ingest_registers(db, readings)
+    if result["intervals"]:
+        bump_versions(db, *(user_scope(owners[m]) for m in meter_ids), *(meter_scope(m) for m in meter_ids))
+    db.commit()
+    INGEST_ROWS.inc(("register",), result["accepted"])
+    return result
 
 
 @router.get("/{meter_id}")
 def get_meter_readings(meter_id: int,
+                       request: Request,
+                       response: Response,
                        db: Session = Depends(get_db),
                        current_user: User = Depends(get_current_user)):
     meter = db.query(SmartMeter).filter(SmartMeter.id == meter_id).first()
     if not meter:
         raise HTTPException(status_code=404, detail="Smart meter not found")
 
-    readings = db.query(SmartMeterReading).filter(SmartMeterReading.meter_id == meter_id).all()
-    return readings
+    versions = get_versions(db, meter_scope(meter_id))
+    not_modified = conditional_response(request, response, make_etag("readings", meter_id, *versions))
+    if not_modified:
+        return not_modified
+
+    # Plain rows instead of ORM objects: no identity-map bookkeeping, and they encode directly
+    readings = db.query(
+        SmartMeterReading.id,
+        SmartMeterReading.meter_id,
+        SmartMeterReading.timestamp,
+        SmartMeterReading.energy_kwh,
+        SmartMeterReading.is_estimated
+    ).filter(SmartMeterReading.meter_id == meter_id).all()
+    return fast_json([row._asdict() for row in readings], response)
+
+
+@router.get("/{meter_id}/gaps")
+def get_meter_gaps(meter_id: int,
+                   start: date,
+                   end: date,
+                   request: Request,
+                   response: Response,
+                   interval_minutes: float = INTERVAL_MINUTES,
+                   db: Session = Depends(get_db),
+                   current_user: User = Depends(get_current_user)):
+    """Missing intervals and completeness for the days start..end (inclusive)."""
+    if interval_minutes <= 0:
+        raise HTTPException(status_code=422, detail="interval_minutes must be positive")
+    meter = db.query(SmartMeter).filter(SmartMeter.id == meter_id).first()
+    if not meter:
+        raise HTTPException(status_code=404, detail="Smart meter not found")
+
+    versions = get_versions(db, meter_scope(meter_id))
+    not_modified = conditional_response(request, response,
+                                        make_etag("gaps", meter_id, start, end, interval_minutes, *versions))
+    if not_modified:
+        return not_modified
+
+    report = find_gaps(db, [meter_id], datetime.combine(start, datetime.min.time()),
+                       datetime.combine(end + timedelta(days=1), datetime.min.time()),
+                       timedelta(minutes=interval_minutes))[meter_id]
+    report["gaps"] = [g.to_dict() for g in report["gaps"]]
+    return report
 
 
 @router.get("/{meter_id}/daily")
@@ -59,9 +150,12 @@ def get_daily_energy(meter_id: int,
         raise HTTPException(status_code=404, detail="Smart meter not found")
 
     today = date.today()
+    # A plain range, not date(timestamp): it uses the index and prunes to one partition
+    day_start = datetime.combine(today, datetime.min.time())
     total_kwh = db.query(func.sum(SmartMeterReading.energy_kwh)).filter(
         SmartMeterReading.meter_id == meter_id,
-        func.date(SmartMeterReading.timestamp) == today
+        SmartMeterReading.timestamp >= day_start,
+        SmartMeterReading.timestamp < day_start + timedelta(days=1)
     ).scalar()
 
     return {
@@ -82,10 +176,11 @@ def get_monthly_energy(meter_id: int,
     today = date.today()
     first_of_month = date(today.year, today.month, 1)
 
+    # Datetime bounds: a bare date compares as text on SQLite and cut off today's readings
     total_kwh = db.query(func.sum(SmartMeterReading.energy_kwh)).filter(
         SmartMeterReading.meter_id == meter_id,
-        SmartMeterReading.timestamp >= first_of_month,
-        SmartMeterReading.timestamp <= today
+        SmartMeterReading.timestamp >= datetime.combine(first_of_month, datetime.min.time()),
+        SmartMeterReading.timestamp < datetime.combine(today + timedelta(days=1), datetime.min.time())
     ).scalar()
 
     return {
@@ -3,8 +3,14 @@ from datetime import datetime
 from fastapi import APIRouter, Depends, HTTPException
 
 from greenvolt_api.database import get_db
-from greenvolt_api.models import SmartMeter, User, SmartMeterData
+from greenvolt_api.hot_cache import meter_owners
+from greenvolt_api.ingest_buffer import buffered_response, ingest_buffer
+from greenvolt_api.metrics import INGEST_ROWS
+from greenvolt_api.models import (
+    Consumption, DailyMeterUsage, HourlyMeterUsage, InvoiceLineItem, SmartMeter, SmartMeterData, SmartMeterReading, User
+)
 from greenvolt_api.schemas import SmartMeterCreate, SmartMeterDataCreate
+from greenvolt_api.versions import METERS_SCOPE, bump_versions, meter_scope, user_scope
 from routers.users import get_current_user
 from sqlalchemy.orm import Session
 
@@ -25,11 +31,38 @@ def create_smart_meter(smart_meter: SmartMeterCreate,
         user_id=smart_meter.user_id
     )
     db.add(new_meter)
+    bump_versions(db, user_scope(smart_meter.user_id))
     db.commit()
     db.refresh(new_meter)
+    meter_owners.add(new_meter.id, new_meter.user_id)
 
     return {"id": new_meter.id, "serial_number": new_meter.serial_number, "location": new_meter.location}
 
+
+@router.delete("/{meter_id}")
+def delete_smart_meter(meter_id: int,
+                       db: Session = Depends(get_db),
+                       current_user: User = Depends(get_current_user)):
+    meter = db.query(SmartMeter).filter(SmartMeter.id == meter_id).first()
+    if not meter:
+        raise HTTPException(status_code=404, detail="Smart meter not found")
+    if meter.user_id != current_user.id:
+        raise HTTPException(status_code=403, detail="Not authorized")
+
+    # Readings and invoices are billing history; a meter that has any is kept
+    for column in (SmartMeterReading.meter_id, HourlyMeterUsage.meter_id, DailyMeterUsage.meter_id,
+                   Consumption.smart_meter_id, InvoiceLineItem.meter_id):
+        if db.query(column).filter(column == meter_id).first() is not None:
+            raise HTTPException(status_code=409, detail="Smart meter has recorded data and cannot be deleted")
+
+    user_id = meter.user_id
+    db.delete(meter)
+    bump_versions(db, user_scope(user_id), meter_scope(meter_id), METERS_SCOPE)
+    db.commit()
+    meter_owners.discard(meter_id)
+
+    return {"message": f"Smart meter {meter_id} deleted successfully"}
+
 @router.get("/smartmeters/{user_id}")
 def get_user_smart_meters(user_id: int,
                           db: Session = Depends(get_db),
@@ -50,6 +83,10 @@ def upload_smart_meter_data(data: SmartMeterDataCreate,
     if not user:
         raise HTTPException(status_code=404, detail="User not found")
 
+    if ingest_buffer.running:
+        row = {"user_id": data.user_id, "timestamp": data.timestamp, "consumption_kwh": data.consumption_kwh}
+        return buffered_response("meter_data", row, (user_scope(data.user_id),))
+
     # Create new record
     new_record = SmartMeterData(
         user_id=data.user_id,
@@ -57,8 +94,10 @@ def upload_smart_meter_data(data: SmartMeterDataCreate,
         consumption_kwh=data.consumption_kwh
     )
     db.add(new_record)
+    bump_versions(db, user_scope(data.user_id))
     db.commit()
     db.refresh(new_record)
+    INGEST_ROWS.inc(("meter_data",))
 
     return {
         "id": new_record.id,
@@ -2,10 +2,11 @@ from fastapi import APIRouter, HTTPException, Depends
 from sqlalchemy.orm import Session
 
 from greenvolt_api.database import get_db
+from greenvolt_api.hot_cache import meter_owners
 from greenvolt_api.schemas import UserCreate, UserUpdate
-from greenvolt_api.jwt import get_password_hash, oauth2_scheme, SECRET_KEY, ALGORITHM
-from jose import JWTError, jwt
-from greenvolt_api.models import User
+from greenvolt_api.jwt import decode_access_token, get_password_hash, oauth2_scheme
+from greenvolt_api.models import SmartMeter, User
+from greenvolt_api.versions import METERS_SCOPE, bump_versions, meter_scope, user_scope
 
 router = APIRouter()
 
@@ -14,12 +15,11 @@ def get_current_user(token: str = Depends(oauth2_scheme), db: Session = Depends(
     credentials_exception = HTTPException(
         status_code=401, detail="Could not validate credentials"
     )
-    try:
-        payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
-        user_id: str = payload.get("sub")
-        if user_id is None:
-            raise credentials_exception
-    except JWTError:
+    payload = decode_access_token(token)
+    if payload is None:
+        raise credentials_exception
+    user_id: str = payload.get("sub")
+    if user_id is None:
         raise credentials_exception
 
     user = db.query(User).filter(User.id == int(user_id)).first()
@@ -89,8 +89,13 @@ def delete_user(user_id: int,
     if not user:
         raise HTTPException(status_code=404, detail="User not found")
 
+    # The user's meters stay, unassigned; every worker's ownership map has to forget the old owner
+    meter_ids = [m for (m,) in db.query(SmartMeter.id).filter(SmartMeter.user_id == user_id)]
     db.delete(user)
+    bump_versions(db, user_scope(user_id), *(meter_scope(m) for m in meter_ids), METERS_SCOPE)
     db.commit()
+    for meter_id in meter_ids:
+        meter_owners.discard(meter_id)
     return {"message": f"User {user_id} deleted successfully"}
 
 
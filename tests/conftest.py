@@ -0,0 +1,78 @@
+import os
+import subprocess
+import sys
+import tempfile
+from datetime import date
+
+# Point the app at a scratch database before anything imports greenvolt_api.database
+_scratch = tempfile.mkdtemp(prefix="greenvolt-tests-")
+os.environ["DATABASE_URL"] = "sqlite:///" + os.path.join(_scratch, "test.db")
+os.environ["GREENVOLT_COLD_ARCHIVE_DIR"] = os.path.join(_scratch, "cold_archive")
+os.environ.setdefault("GREENVOLT_LATE_DATA_INTERVAL", "0")
+
+import pytest
+from fastapi.testclient import TestClient
+
+pytest_plugins = ["greenvolt_api.testing"]
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+SEED_START = date(2025, 8, 1)
+SEED_DAYS = 3
+
+
+@pytest.fixture(scope="session")
+def seeded():
+    from greenvolt_api.seed_data import generate
+
+    # Two users with one meter each, hourly readings and prices for SEED_DAYS days
+    return generate(users=2, meters_per_user=1, start=SEED_START, days=SEED_DAYS, resolution="hourly")
+
+
+@pytest.fixture(scope="session")
+def client(seeded):
+    from greenvolt_api.main import app
+
+    with TestClient(app) as c:
+        yield c
+
+
+@pytest.fixture
+def auth():
+    from greenvolt_api.jwt import create_access_token
+
+    return {"Authorization": "Bearer " + create_access_token({"sub": "1"})}
+
+
+@pytest.fixture(scope="session")
+def postgres_engine():
+    """Engine for GREENVOLT_TEST_POSTGRES_URL; tests needing Postgres are skipped without it."""
+    url = os.getenv("GREENVOLT_TEST_POSTGRES_URL")
+    if not url:
+        pytest.skip("GREENVOLT_TEST_POSTGRES_URL is not set")
+    from sqlalchemy import create_engine
+
+    engine = create_engine(url)
+    yield engine
+    engine.dispose()
+
+
+def run_against(database_url: str, script: str) -> str:
+    """Run ``script`` in a fresh interpreter whose app points at ``database_url``; returns its stdout."""
+    env = dict(os.environ, DATABASE_URL=database_url)
+    result = subprocess.run([sys.executable, "-c", script], env=env, cwd=ROOT, capture_output=True, text=True)
+    assert result.returncode == 0, result.stderr
+    return result.stdout
+
+
+@pytest.fixture
+def postgres_database(postgres_engine, request):
+    """URL of an empty Postgres database, created for this test and dropped after it."""
+    from sqlalchemy import text
+
+    name = "greenvolt_test_" + request.node.name.lower()[:40]
+    with postgres_engine.connect().execution_options(isolation_level="AUTOCOMMIT") as conn:
+        conn.execute(text(f"DROP DATABASE IF EXISTS {name}"))
+        conn.execute(text(f"CREATE DATABASE {name}"))
+    yield postgres_engine.url.set(database=name).render_as_string(hide_password=False)
+    with postgres_engine.connect().execution_options(isolation_level="AUTOCOMMIT") as conn:
+        conn.execute(text(f"DROP DATABASE IF EXISTS {name} WITH (FORCE)"))
@@ -0,0 +1,71 @@
+import os
+import tempfile
+
+from tests.conftest import run_against
+
+# Without GREENVOLT_COLD_ARCHIVE_DIR, so the default location is what gets exercised
+ARCHIVE_THEN_LOSE_FILES = """
+import os
+os.environ.pop("GREENVOLT_COLD_ARCHIVE_DIR")
+import shutil
+from datetime import date
+from greenvolt_api.cold_archive import archive_month, check_archive, cold_archive
+from greenvolt_api.database import SessionLocal, engine
+from greenvolt_api.seed_data import generate
+from greenvolt_api.versions import get_versions
+
+generate(users=1, meters_per_user=1, start=date(2025, 8, 1), days=1, resolution="hourly")
+print("next to db", cold_archive.directory == os.path.join(os.path.dirname(engine.url.database), "cold_archive"))
+db = SessionLocal()
+before = get_versions(db, "meter:1", "user:1", "pricing")
+db.close()
+print("archived", archive_month(date(2025, 8, 1)))
+db = SessionLocal()
+after = get_versions(db, "meter:1", "user:1", "pricing")
+db.close()
+print("bumped", [a - b for a, b in zip(after, before)])
+print("warning", check_archive())
+shutil.rmtree(cold_archive.directory)
+print("warning", check_archive())
+"""
+
+
+def test_archive_beside_database_and_warn_when_files_are_missing():
+    output = run_against("sqlite:///" + os.path.join(tempfile.mkdtemp(), "archive.db"), ARCHIVE_THEN_LOSE_FILES)
+    assert "next to db True" in output
+    assert "archived 24" in output
+    assert "bumped [1, 1, 0]" in output
+    assert "warning None" in output
+    assert "holds no archive files" in output
+
+
+# A late 05:30 reading for the archived month is compacted into the 05:00 hour row
+LATE_READING_COMPACTED = """
+from datetime import date, datetime
+from greenvolt_api.cold_archive import archive_month, cold_archive
+from greenvolt_api.database import SessionLocal
+from greenvolt_api.models import SmartMeterReading
+from greenvolt_api.readings_source import load_readings
+from greenvolt_api.retention import compact
+from greenvolt_api.seed_data import generate
+
+generate(users=1, meters_per_user=1, start=date(2025, 8, 1), days=1, resolution="hourly")
+day = (datetime(2025, 8, 1), datetime(2025, 8, 1, 23))
+db = SessionLocal()
+before = sum(r.energy_kwh for r in load_readings(db, [1], *day))
+archive_month(date(2025, 8, 1))
+db.add(SmartMeterReading(meter_id=1, timestamp=datetime(2025, 8, 1, 5, 30), energy_kwh=1.0))
+db.commit()
+compact(log=lambda _: None)
+print("added", round(sum(r.energy_kwh for r in load_readings(db, [1], *day)) - before, 6))
+db.close()
+
+generate(users=1, meters_per_user=1, start=date(2025, 9, 1), days=1, resolution="hourly", reset=True)
+print("months", list(cold_archive.months()))
+"""
+
+
+def test_compacted_rows_add_to_archived_readings_and_reset_clears_the_archive():
+    output = run_against("sqlite:///" + os.path.join(tempfile.mkdtemp(), "late.db"), LATE_READING_COMPACTED)
+    assert "added 1.0" in output
+    assert "months []" in output
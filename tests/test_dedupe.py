@@ -0,0 +1,29 @@
+from datetime import datetime
+
+from sqlalchemy import create_engine, insert, text
+
+from greenvolt_api.database import Base
+from greenvolt_api.dedupe import dedupe
+from greenvolt_api.models import DataVersion, SmartMeter, SmartMeterReading, User
+
+
+def test_dedupe_bumps_the_meters_it_touched(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'dupes.db'}")
+    Base.metadata.create_all(engine, tables=[t.__table__ for t in (User, SmartMeter, SmartMeterReading, DataVersion)])
+    ts = datetime(2025, 8, 1, 10)
+    with engine.begin() as conn:
+        # As before migration 0003: no unique key yet
+        conn.execute(text("DROP INDEX ux_readings_meter_timestamp"))
+        conn.execute(insert(User), [{"id": 7, "name": "A", "email": "a@x", "password": "x"}])
+        conn.execute(insert(SmartMeter), [{"id": 1, "serial_number": "SM-1", "location": "Berlin", "user_id": 7},
+                                          {"id": 2, "serial_number": "SM-2", "location": "Berlin", "user_id": 7}])
+        conn.execute(insert(SmartMeterReading), [{"meter_id": 1, "timestamp": ts, "energy_kwh": kwh} for kwh in (1, 2)]
+                     + [{"meter_id": 2, "timestamp": ts, "energy_kwh": 3}])
+
+    with engine.connect().execution_options(isolation_level="AUTOCOMMIT") as conn:
+        assert dedupe(conn, ["readings"], log=lambda _: None) == 1
+        versions = dict(conn.execute(text("SELECT scope, version FROM data_versions")).all())
+        kept = conn.execute(text("SELECT energy_kwh FROM smart_meter_readings WHERE meter_id = 1")).scalar()
+
+    assert versions == {"meter:1": 1, "user:7": 1}
+    assert kept == 2  # the newest row wins
@@ -0,0 +1,24 @@
+from greenvolt_api import etag
+from tests.conftest import SEED_START
+
+BILL = {"start": str(SEED_START), "end": "2025-08-02"}
+
+
+def test_each_content_coding_gets_its_own_etag(client, auth):
+    plain = client.get("/billing/1", params=BILL, headers={**auth, "Accept-Encoding": "identity"})
+    zipped = client.get("/billing/1", params=BILL, headers={**auth, "Accept-Encoding": "gzip"})
+    assert zipped.headers["content-encoding"] == "gzip"
+    assert zipped.headers["etag"] == plain.headers["etag"][:-1] + '-gzip"'
+
+    # A client revalidates with the tag it holds and gets that tag back
+    for held, encoding in ((zipped.headers["etag"], "gzip"), (plain.headers["etag"], "identity")):
+        response = client.get("/billing/1", params=BILL,
+                              headers={**auth, "Accept-Encoding": encoding, "If-None-Match": held})
+        assert response.status_code == 304
+        assert response.headers["etag"] == held
+
+
+def test_response_format_is_part_of_the_etag(monkeypatch):
+    before = etag.make_etag("bill", 1, 3)
+    monkeypatch.setattr(etag, "RESPONSE_FORMAT", etag.RESPONSE_FORMAT + 1)
+    assert etag.make_etag("bill", 1, 3) != before
@@ -0,0 +1,28 @@
+from datetime import datetime, timedelta
+
+from greenvolt_api.database import SessionLocal
+from greenvolt_api.gaps import find_gaps
+from greenvolt_api.retention import RAW_RETENTION_DAYS
+
+
+def test_slots_before_the_raw_horizon_are_compacted_not_missing(seeded):
+    # The horizon falls on the second seeded day: the first is compacted, the second raw and complete
+    now = datetime(2025, 8, 2) + timedelta(days=RAW_RETENTION_DAYS)
+    db = SessionLocal()
+    try:
+        report = find_gaps(db, [2], datetime(2025, 8, 1), datetime(2025, 8, 3), timedelta(hours=1), now=now)[2]
+    finally:
+        db.close()
+    assert report["compacted"] == 24
+    assert report["expected"] == 24
+    assert report["present"] == 24
+    assert report["gaps"] == []
+    assert report["completeness"] == 1.0
+
+
+def test_gap_endpoint_reports_compacted_range(client, auth):
+    report = client.get("/readings/1/gaps", params={"start": "2025-08-01", "end": "2025-08-01"}, headers=auth).json()
+    assert report["compacted"] == 96
+    assert report["expected"] == 0
+    assert report["missing"] == 0
+    assert report["gaps"] == []
@@ -0,0 +1,19 @@
+import threading
+
+import anyio.to_thread
+
+
+def test_liveness_answers_while_the_threadpool_is_exhausted(client):
+    limiter = client.portal.call(anyio.to_thread.current_default_thread_limiter)
+    borrowers = [object() for _ in range(int(limiter.total_tokens))]
+    for borrower in borrowers:
+        client.portal.call(limiter.acquire_on_behalf_of, borrower)
+    try:
+        responses = []
+        probe = threading.Thread(target=lambda: responses.append(client.get("/health/live")), daemon=True)
+        probe.start()
+        probe.join(timeout=5)
+        assert responses and responses[0].status_code == 200
+    finally:
+        for borrower in borrowers:
+            client.portal.call(limiter.release_on_behalf_of, borrower)
@@ -0,0 +1,29 @@
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+
+from benchmarks.bench_import_time import DEFAULT_FORBID, run_probe
+from tests.conftest import ROOT
+
+# Same default as `python -m benchmarks.bench_import_time`; raise it on slow CI machines
+BUDGET_MS = float(os.getenv("GREENVOLT_IMPORT_BUDGET_MS", "1200"))
+
+
+def cold_env() -> dict:
+    return dict(os.environ, DATABASE_URL="sqlite:///" + os.path.join(tempfile.mkdtemp(), "cold.db"))
+
+
+def test_import_stays_under_budget():
+    env = cold_env()
+    run_probe(env, ROOT)  # compile bytecode once so every timed run starts from the same state
+    import_ms = statistics.median(run_probe(env, ROOT)["import"] for _ in range(3)) * 1000
+    assert import_ms < BUDGET_MS, f"import greenvolt_api.main took {import_ms:.0f} ms, budget {BUDGET_MS:.0f} ms"
+
+
+def test_heavy_modules_load_lazily():
+    out = subprocess.run([sys.executable, "-c", "import sys, greenvolt_api.main; print(' '.join(sys.modules))"],
+                         env=cold_env(), cwd=ROOT, capture_output=True, text=True, check=True)
+    loaded = set(out.stdout.split())
+    assert not loaded & set(DEFAULT_FORBID.split(","))
@@ -0,0 +1,77 @@
+from datetime import datetime, timedelta
+
+from sqlalchemy.exc import OperationalError
+
+from greenvolt_api.database import SessionLocal
+from greenvolt_api.ingest_buffer import IngestBuffer
+from greenvolt_api.models import SmartMeterReading
+
+# Far from the seeded range, and in the future so no row counts as late
+BASE = datetime(2030, 1, 1)
+
+
+def reading(meter_id: int, minutes: int, timestamp=None) -> tuple:
+    row = {"meter_id": meter_id, "timestamp": timestamp or BASE + timedelta(minutes=minutes), "energy_kwh": 0.25}
+    return "reading", row, ()
+
+
+def stored(meter_id: int, start: datetime, end: datetime) -> int:
+    db = SessionLocal()
+    try:
+        return db.query(SmartMeterReading).filter(
+            SmartMeterReading.meter_id == meter_id,
+            SmartMeterReading.timestamp >= start,
+            SmartMeterReading.timestamp < end
+        ).count()
+    finally:
+        db.close()
+
+
+def drain(buffer: IngestBuffer, items: list) -> None:
+    buffer.start()
+    for item in items:
+        assert buffer.offer(*item)
+    buffer.close(timeout=10)
+    assert buffer.depth() == 0
+
+
+def test_bad_row_is_dead_lettered_and_the_rest_committed(seeded):
+    buffer = IngestBuffer(flush_rows=8, flush_ms=10)
+    items = [reading(1, 15 * k) for k in range(10)]
+    items.insert(3, reading(1, 0, timestamp="not a timestamp"))
+    drain(buffer, items)
+
+    assert buffer.dead_lettered == 1
+    assert buffer.flushed == 10
+    assert stored(1, BASE, BASE + timedelta(days=1)) == 10
+
+
+def test_transient_failure_retries_the_batch(seeded):
+    calls = []
+
+    def flaky_session():
+        calls.append(1)
+        if len(calls) == 1:
+            raise OperationalError("SELECT 1", {}, Exception("connection lost"))
+        return SessionLocal()
+
+    start = BASE + timedelta(days=7)
+    buffer = IngestBuffer(flush_rows=8, flush_ms=10, session_factory=flaky_session)
+    drain(buffer, [reading(2, 15 * k + 7 * 24 * 60) for k in range(5)])
+
+    assert len(calls) >= 2
+    assert buffer.dead_lettered == 0
+    assert stored(2, start, start + timedelta(days=1)) == 5
+
+
+def test_reading_past_raw_retention_is_dead_lettered(seeded):
+    start = BASE + timedelta(days=14)
+    buffer = IngestBuffer(flush_rows=8, flush_ms=10)
+    items = [reading(1, 15 * k + 14 * 24 * 60) for k in range(4)]
+    items.append(reading(1, 0, timestamp=datetime(2020, 1, 1)))
+    drain(buffer, items)
+
+    assert buffer.dead_lettered == 1
+    assert "past raw retention" in buffer.last_error
+    assert stored(1, start, start + timedelta(days=1)) == 4
+    assert stored(1, datetime(2020, 1, 1), datetime(2020, 1, 2)) == 0
@@ -0,0 +1,35 @@
+from datetime import datetime, timedelta
+
+from greenvolt_api.database import SessionLocal
+from greenvolt_api.models import MeterRegisterReading, SmartMeterReading
+
+
+def stored_at(model, meter_id: int, timestamp: datetime) -> int:
+    db = SessionLocal()
+    try:
+        return db.query(model).filter(model.meter_id == meter_id, model.timestamp == timestamp).count()
+    finally:
+        db.close()
+
+
+# Old enough to count as late, so the late-data check sees the timestamps too, yet inside raw retention
+DAY = datetime.combine(datetime.utcnow().date() - timedelta(days=2), datetime.min.time())
+
+
+def test_aware_reading_is_stored_as_naive_utc(client, auth):
+    response = client.post("/readings/", json={"meter_id": 1, "energy_kwh": 0.3,
+                                               "timestamp": f"{DAY:%Y-%m-%d}T10:15:00+02:00"}, headers=auth)
+    assert response.status_code == 200, response.text
+    assert response.json()["timestamp"] == f"{DAY:%Y-%m-%d}T08:15:00"
+    assert stored_at(SmartMeterReading, 1, DAY.replace(hour=8, minute=15)) == 1
+
+
+def test_aware_register_readings_are_stored_as_naive_utc(client, auth):
+    response = client.post("/readings/register/bulk/", json=[
+        {"meter_id": 2, "timestamp": f"{DAY:%Y-%m-%d}T00:00:00Z", "register_kwh": 100.0},
+        {"meter_id": 2, "timestamp": f"{DAY:%Y-%m-%d}T02:00:00+01:00", "register_kwh": 100.5},
+    ], headers=auth)
+    assert response.status_code == 200, response.text
+    assert response.json()["intervals"] == 1
+    assert stored_at(MeterRegisterReading, 2, DAY.replace(hour=1)) == 1
+    assert stored_at(SmartMeterReading, 2, DAY.replace(hour=1)) == 1
@@ -0,0 +1,40 @@
+import os
+import tempfile
+
+from tests.conftest import run_against
+
+# The 05:00 price arrives only after the billing run; the stored invoice still billed that hour at 0
+PRICE_AFTER_BILLING = """
+from datetime import date, datetime
+from fastapi.testclient import TestClient
+from greenvolt_api.billing_run import run_billing
+from greenvolt_api.database import SessionLocal
+from greenvolt_api.jwt import create_access_token
+from greenvolt_api.main import app
+from greenvolt_api.models import Pricing
+from greenvolt_api.seed_data import generate
+from greenvolt_api.versions import PRICING_SCOPE, bump_versions
+
+generate(users=1, meters_per_user=1, start=date(2025, 8, 1), days=1, resolution="hourly")
+hour = datetime(2025, 8, 1, 5)
+db = SessionLocal()
+db.query(Pricing).filter(Pricing.date == hour).delete()
+db.commit()
+run_billing(date(2025, 8, 1), date(2025, 8, 2))
+db.add(Pricing(date=hour, price_per_kwh=0.3))
+bump_versions(db, PRICING_SCOPE)
+db.commit()
+db.close()
+
+auth = {"Authorization": "Bearer " + create_access_token({"sub": "1"})}
+with TestClient(app) as client:
+    bill = client.get("/billing/1", params={"start": "2025-08-01", "end": "2025-08-02"}, headers=auth).json()
+print("missing", bill["missing_rate_hours"])
+print("zero cost", [i["cost"] for i in bill["items"] if i["timestamp"] == "2025-08-01T05:00:00"])
+"""
+
+
+def test_stored_invoice_reports_missing_rates_it_was_billed_with():
+    output = run_against("sqlite:///" + os.path.join(tempfile.mkdtemp(), "invoices.db"), PRICE_AFTER_BILLING)
+    assert "missing 1" in output
+    assert "zero cost [0.0]" in output
@@ -0,0 +1,28 @@
+from greenvolt_api import hot_cache
+from greenvolt_api.database import SessionLocal
+from greenvolt_api.hot_cache import MeterOwners
+
+
+def test_deleting_a_user_drops_them_as_owner_in_every_worker(client, auth, monkeypatch):
+    user_id = client.post("/users/", json={"name": "Leaving", "email": "leaving@example.com",
+                                           "password": "x"}).json()["id"]
+    meter_id = client.post("/meters/", json={"serial_number": "SM-leaving", "location": "Berlin",
+                                             "user_id": user_id}, headers=auth).json()["id"]
+
+    # Another worker's map, loaded while the user still owned the meter
+    db = SessionLocal()
+    try:
+        other_worker = MeterOwners()
+        other_worker.load(db)
+        assert other_worker.owner(db, meter_id) == user_id
+
+        assert client.delete(f"/users/users/{user_id}", headers=auth).status_code == 200
+        monkeypatch.setattr(hot_cache, "OWNER_MAP_REVALIDATE_SECONDS", 0)
+        db.rollback()
+        assert other_worker.owner(db, meter_id) is None
+    finally:
+        db.close()
+
+    response = client.post("/consumption/", json={"user_id": user_id, "smart_meter_id": meter_id,
+                                                  "timestamp": "2030-01-01T00:00:00", "energy_kwh": 1.0})
+    assert response.status_code == 404
@@ -0,0 +1,27 @@
+import threading
+
+from greenvolt_api.metrics import Counter, Histogram
+
+
+def run_threads(target, count: int) -> None:
+    for _ in range(count):
+        thread = threading.Thread(target=target)
+        thread.start()
+        thread.join()
+
+
+def test_shards_of_finished_threads_are_folded():
+    counter = Counter("test_counter_total", "Test counter.", ("kind",))
+    histogram = Histogram("test_seconds", "Test histogram.", buckets=(0.1, 1.0))
+    counter.inc(("main",))
+
+    def work():
+        counter.inc(("thread",), 2)
+        histogram.observe(0.5)
+
+    run_threads(work, 50)
+    assert len(counter._shards) == 1  # the main thread's
+    assert len(histogram._shards) == 0
+    assert counter.values() == {("main",): 1.0, ("thread",): 100.0}
+    assert 'test_seconds_bucket{le="1.0"} 50' in histogram.render()
+    assert "test_seconds_count 50" in histogram.render()
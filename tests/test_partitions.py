@@ -0,0 +1,30 @@
+from tests.conftest import run_against
+
+# The seeded August lands in DEFAULT until its partition is created, as on a live database
+SEED_THEN_DETACH = """
+from datetime import date
+from sqlalchemy import text
+from greenvolt_api.database import engine
+from greenvolt_api.partitions import create_partition, detach_month
+from greenvolt_api.seed_data import generate
+
+generate(users=1, meters_per_user=1, start=date(2025, 8, 1), days=1, resolution="hourly")
+with engine.begin() as conn:
+    for table in ("smart_meter_readings", "consumptions"):
+        create_partition(conn, table, date(2025, 8, 1))
+print("detach", detach_month(engine, "smart_meter_readings", date(2025, 8, 1)))
+print("again", detach_month(engine, "smart_meter_readings", date(2025, 8, 1)))
+with engine.connect() as conn:
+    print("live", conn.execute(text("SELECT COUNT(*) FROM smart_meter_readings")).scalar())
+    print("kept", conn.execute(text("SELECT COUNT(*) FROM smart_meter_readings_y2025m08")).scalar())
+print("drop", detach_month(engine, "consumptions", date(2025, 8, 1), drop=True))
+"""
+
+
+def test_detach_with_default_partition_on_postgres(postgres_database):
+    output = run_against(postgres_database, SEED_THEN_DETACH)
+    assert "detach table smart_meter_readings_y2025m08" in output
+    assert "again no partition" in output
+    assert "live 0" in output
+    assert "kept 24" in output
+    assert "drop dropped" in output
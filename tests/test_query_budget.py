@@ -0,0 +1,16 @@
+import pytest
+
+from tests.conftest import SEED_START
+
+
+def test_bill_within_budget(client, auth, query_budget):
+    with query_budget(6):
+        response = client.get("/billing/1", params={"start": str(SEED_START), "end": "2025-08-02"}, headers=auth)
+    assert response.status_code == 200
+
+
+def test_over_budget_fails(client, auth, query_budget):
+    # A different range than above, so the request is not answered from the result cache
+    with pytest.raises(AssertionError, match=r"GET /billing/1: \d+ queries \(budget 1\)"):
+        with query_budget(1):
+            client.get("/billing/1", params={"start": str(SEED_START), "end": "2025-08-03"}, headers=auth)
@@ -0,0 +1,42 @@
+import os
+import tempfile
+
+from tests.conftest import run_against
+
+# August 2025 is past the default raw horizon (396 days) from today on
+COMPACT_THEN_RESEND = """
+from datetime import date
+from fastapi.testclient import TestClient
+from greenvolt_api.database import SessionLocal
+from greenvolt_api.jwt import create_access_token
+from greenvolt_api.main import app
+from greenvolt_api.models import HourlyMeterUsage
+from greenvolt_api.retention import compact
+from greenvolt_api.seed_data import generate
+from greenvolt_api.versions import get_versions
+
+generate(users=1, meters_per_user=1, start=date(2025, 8, 1), days=1, resolution="hourly")
+db = SessionLocal()
+before = get_versions(db, "meter:1", "user:1", "pricing")
+db.close()
+print("folded", compact(log=lambda _: None)["raw"])
+db = SessionLocal()
+after = get_versions(db, "meter:1", "user:1", "pricing")
+print("bumped", [a - b for a, b in zip(after, before)])
+
+auth = {"Authorization": "Bearer " + create_access_token({"sub": "1"})}
+with TestClient(app) as client:
+    response = client.post("/readings/", json={"meter_id": 1, "energy_kwh": 5.0,
+                                               "timestamp": "2025-08-01T05:00:00"}, headers=auth)
+print("resend", response.status_code)
+compact(log=lambda _: None)
+print("hours", db.query(HourlyMeterUsage).filter(HourlyMeterUsage.energy_kwh >= 5.0).count())
+"""
+
+
+def test_compaction_bumps_meter_scopes_and_refuses_resends():
+    output = run_against("sqlite:///" + os.path.join(tempfile.mkdtemp(), "retention.db"), COMPACT_THEN_RESEND)
+    assert "folded 24" in output
+    assert "bumped [1, 1, 0]" in output
+    assert "resend 422" in output
+    assert "hours 0" in output
@@ -0,0 +1,43 @@
+import os
+import tempfile
+
+from tests.conftest import run_against
+
+RESEED_THEN_CREATE = """
+from datetime import date
+from greenvolt_api.billing_run import run_billing
+from greenvolt_api.database import SessionLocal
+from greenvolt_api.models import DataVersion, Invoice, SmartMeter, User
+from greenvolt_api.seed_data import generate
+
+generate(users=2, meters_per_user=1, start=date(2025, 8, 1), days=1, resolution="hourly")
+run_billing(date(2025, 8, 1), date(2025, 8, 2))
+generate(users=2, meters_per_user=1, start=date(2025, 8, 1), days=1, resolution="hourly", reset=True)
+
+db = SessionLocal()
+print("invoices", db.query(Invoice).count())
+print("versions", dict(db.query(DataVersion.scope, DataVersion.version).order_by(DataVersion.scope)))
+# Ids come from the table's sequence, as they do for POST /users/ and /meters/
+user = User(name="New", email="new@greenvolt.test", password="x")
+db.add(user)
+db.flush()
+meter = SmartMeter(serial_number="SM-new", location="Berlin", user_id=user.id)
+db.add(meter)
+db.commit()
+print("ids", user.id, meter.id)
+"""
+
+
+def check(output: str) -> None:
+    assert "invoices 0" in output
+    # Counters carry on past the reset: every scope moves past anything cached before it
+    assert "versions {'meter:1': 1, 'meter:2': 1, 'pricing': 3, 'user:1': 3, 'user:2': 3}" in output
+    assert "ids 3 3" in output
+
+
+def test_reset_and_new_rows_on_sqlite():
+    check(run_against("sqlite:///" + os.path.join(tempfile.mkdtemp(), "seed.db"), RESEED_THEN_CREATE))
+
+
+def test_reset_and_new_rows_on_postgres(postgres_database):
+    check(run_against(postgres_database, RESEED_THEN_CREATE))
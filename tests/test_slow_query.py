@@ -0,0 +1,20 @@
+from sqlalchemy import text
+
+from greenvolt_api.database import engine
+from greenvolt_api.slow_query import explain
+
+
+def test_explain_returns_sqlite_plan(seeded):
+    with engine.connect() as conn:
+        cursor = conn.connection.dbapi_connection.cursor()
+        plan = explain(conn, cursor, "SELECT * FROM smart_meter_readings WHERE meter_id = ?", (1,))
+    assert any("ux_readings_meter_timestamp" in line for line in plan)
+
+
+def test_failed_explain_keeps_postgres_transaction_usable(postgres_engine):
+    with postgres_engine.connect() as conn:
+        conn.execute(text("SELECT 1"))  # the request's transaction is open
+        cursor = conn.connection.dbapi_connection.cursor()
+        plan = explain(conn, cursor, "SELECT * FROM no_such_table", {})
+        assert plan.startswith("EXPLAIN failed")
+        assert conn.execute(text("SELECT 2")).scalar() == 2